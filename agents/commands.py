@@ -0,0 +1,79 @@
+import re
+import shutil
+import subprocess
+from functools import lru_cache
+from typing import List, Optional
+
+# Fenced blocks Raju uses for commands Babu Bhaiya should run verbatim.
+SHELL_FENCE = re.compile(r"```[ \t]*(bash|sh|shell|console|zsh)[ \t]*\n(.*?)```", re.DOTALL | re.IGNORECASE)
+PROMPT_LINE = re.compile(r"^\s*\$ (.+)$", re.MULTILINE)
+HEREDOC = re.compile(r"<<-?\s*['\"]?\w+")
+
+
+@lru_cache(maxsize=256)
+def _incomplete(text: str) -> bool:
+    """Whether ``text`` is an unfinished shell command, e.g. a ``for`` loop still waiting for ``done``.
+
+    Asks ``bash -n`` (parse without running); genuine syntax errors count as
+    complete so that they fail on their own instead of swallowing the
+    lines after them. Without bash only trailing backslashes continue a line.
+    """
+    if text.rstrip("\n").endswith("\\"):
+        return True
+    bash = shutil.which("bash")
+    if not bash:
+        return False
+    try:
+        check = subprocess.run([bash, "-n"], input=text, capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+    if "delimited by end-of-file" in check.stderr:
+        return True  # a heredoc still waiting for its delimiter (only a warning, bash -n exits 0)
+    return check.returncode != 0 and ("unexpected end of file" in check.stderr or "unexpected EOF" in check.stderr)
+
+
+def _split_block(block: str, prompts_only: bool) -> List[str]:
+    """Split a shell block into logical commands.
+
+    Lines are kept together until they form a complete command, so loops,
+    conditionals, functions, heredocs and backslash continuations stay
+    whole; everything else runs one line at a time, stopping at the first
+    failure.
+    """
+    if prompts_only:
+        return [line.strip() for line in PROMPT_LINE.findall(block)]
+    if HEREDOC.search(block) and not shutil.which("bash"):
+        return [block.strip()] if block.strip() else []
+
+    commands, pending = [], ""
+    for line in block.split("\n"):
+        stripped = line.strip()
+        if not pending and (not stripped or stripped.startswith("#")):
+            continue
+        if not pending and stripped.startswith("$ "):
+            line = stripped = stripped[2:]
+        pending += (line if pending else stripped) + "\n"
+        if _incomplete(pending):
+            continue
+        commands.append(pending.strip())
+        pending = ""
+    if pending.strip():
+        commands.append(pending.strip())
+    return commands
+
+
+def extract_commands(text: str) -> Optional[List[str]]:
+    """Commands spelled out in ``text`` as fenced shell blocks or ``$ `` lines.
+
+    Returns ``None`` when the text has no structured commands, in which case
+    the instructions are ambiguous and need an LLM to interpret them.
+    """
+    commands: List[str] = []
+    for language, block in SHELL_FENCE.findall(text or ""):
+        commands.extend(_split_block(block, prompts_only=language.lower() == "console"))
+    if not commands:
+        # Prompt lines outside fences only count when there is nothing else to go on;
+        # lines inside other fences (code listings, output) are ignored.
+        prose = re.sub(r"```.*?```", "", text or "", flags=re.DOTALL)
+        commands = [line.strip() for line in PROMPT_LINE.findall(prose)]
+    return commands or None
@@ -0,0 +1,153 @@
+import hashlib
+import os
+import platform
+import shutil
+import sys
+import threading
+from typing import Any, Dict, Optional, Tuple
+from agents.executor import get_command_executor, get_workspace
+from agents.shell import get_shell_session, persistent_shell_supported
+
+# Variables that change which tools resolve or how they behave. The probe is
+# recomputed only when one of these differs from the cached fingerprint.
+RELEVANT_ENV_VARS = (
+    "PATH", "VIRTUAL_ENV", "CONDA_PREFIX", "CONDA_DEFAULT_ENV", "PYTHONPATH",
+    "PYTHONHOME", "NODE_PATH", "NVM_BIN", "JAVA_HOME", "GOPATH", "GOROOT",
+    "CARGO_HOME", "SHELL", "LANG",
+)
+
+# Tool name -> arguments that print its version.
+COMMON_TOOLS = {
+    "git": ["--version"],
+    "python": ["--version"],
+    "python3": ["--version"],
+    "pip": ["--version"],
+    "pip3": ["--version"],
+    "node": ["--version"],
+    "npm": ["--version"],
+    "docker": ["--version"],
+    "kubectl": ["version", "--client"],
+    "java": ["-version"],
+    "javac": ["-version"],
+    "gcc": ["--version"],
+    "make": ["--version"],
+    "cmake": ["--version"],
+    "curl": ["--version"],
+    "wget": ["--version"],
+}
+
+SECRET_MARKERS = ("KEY", "TOKEN", "SECRET", "PASSWORD", "PASSWD", "CREDENTIAL", "AUTH")
+
+
+def mask_environment(env: Dict[str, str]) -> Dict[str, str]:
+    """Hide values of variables that look like credentials."""
+    return {
+        name: "****" if any(marker in name.upper() for marker in SECRET_MARKERS) else value
+        for name, value in sorted(env.items())
+    }
+
+
+class EnvironmentProbe:
+    """Caches what the execution environment looks like, per session.
+
+    A probe is keyed by a fingerprint of ``RELEVANT_ENV_VARS``; activating a
+    virtualenv or editing PATH in the session shell changes the fingerprint
+    and triggers a new probe. Tool versions are cached by resolved executable
+    path, so only tools whose location changed are run again, and those runs
+    happen concurrently on the command executor.
+    """
+
+    def __init__(self, tools: Optional[Dict[str, list]] = None, version_timeout: float = 5):
+        self.tools = tools or COMMON_TOOLS
+        self.version_timeout = version_timeout
+        self._probes: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._versions: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(env: Dict[str, str]) -> str:
+        relevant = "\0".join(f"{name}={env.get(name, '')}" for name in RELEVANT_ENV_VARS)
+        return hashlib.sha1(relevant.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def session_environment(session_id: Optional[str] = None) -> Dict[str, str]:
+        """Return the environment commands in this session actually see."""
+        if not (session_id and persistent_shell_supported()):
+            return dict(os.environ)
+        result = get_shell_session(session_id, cwd=get_workspace(session_id).cwd).run("env", timeout=5)
+        if not result.success:
+            return dict(os.environ)
+        env = {}
+        for line in result.stdout.splitlines():
+            name, sep, value = line.partition("=")
+            if sep and name.isidentifier():
+                env[name] = value
+        return env
+
+    def _tool_versions(self, paths: Dict[str, str]) -> Dict[str, str]:
+        pending = {}
+        for tool, path in paths.items():
+            if path not in self._versions:
+                pending[tool] = get_command_executor().submit(
+                    [path, *self.tools[tool]], shell=False, timeout=self.version_timeout
+                )
+        for tool, future in pending.items():
+            result = future.result()
+            lines = (result.stdout or result.stderr).strip().splitlines()
+            self._versions[paths[tool]] = lines[0].strip()[:80] if lines else "unknown"
+        return {tool: self._versions[path] for tool, path in paths.items()}
+
+    def probe(self, session_id: Optional[str] = None, refresh: bool = False) -> Dict[str, Any]:
+        """Return the full probe for a session, recomputing it only when stale."""
+        env = self.session_environment(session_id)
+        key = session_id or ""
+        fingerprint = self.fingerprint(env)
+        with self._lock:
+            cached = self._probes.get(key)
+            if cached and cached[0] == fingerprint and not refresh:
+                return cached[1]
+            if refresh:
+                self._versions.clear()
+
+            search_path = env.get("PATH", os.defpath)
+            paths = {}
+            for tool in self.tools:
+                path = shutil.which(tool, path=search_path)
+                if path:
+                    paths[tool] = path
+
+            info = {
+                "Operating System": platform.system(),
+                "OS Release": platform.release(),
+                "OS Version": platform.version(),
+                "Architecture": platform.architecture()[0],
+                "Machine": platform.machine(),
+                "Python Version": sys.version,
+                "Virtual Environment": env.get("VIRTUAL_ENV") or env.get("CONDA_PREFIX"),
+                "Tool Paths": paths,
+                "Tool Versions": self._tool_versions(paths),
+                "Environment Variables": mask_environment(env),
+            }
+            self._probes[key] = (fingerprint, info)
+            return info
+
+    def invalidate(self, session_id: Optional[str] = None):
+        with self._lock:
+            self._probes.pop(session_id or "", None)
+
+    def summary(self, session_id: Optional[str] = None, detailed: bool = False) -> Dict[str, Any]:
+        """Compact view for prompts; ``detailed`` returns the whole probe."""
+        info = dict(self.probe(session_id))
+        info["Current Working Directory"] = get_workspace(session_id).cwd
+        if detailed:
+            return info
+        return {
+            "Operating System": f"{info['Operating System']} {info['OS Release']} ({info['Machine']})",
+            "Python Version": info["Python Version"].split()[0],
+            "Current Working Directory": info["Current Working Directory"],
+            "Virtual Environment": info["Virtual Environment"],
+            "Available Commands": info["Tool Versions"],
+        }
+
+
+environment_probe = EnvironmentProbe()
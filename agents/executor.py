@@ -0,0 +1,168 @@
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Union
+from agents.shell import CommandResult
+from config.settings import settings
+
+DEFAULT_SESSION = "default"
+
+# ***************** Session workspaces *****************
+
+class Workspace:
+    """Working-directory state owned by a single session.
+
+    Tools resolve relative paths against ``cwd`` and pass it explicitly to
+    subprocesses, so sessions never touch the process-wide working directory.
+    """
+
+    def __init__(self, session_id: str, root: str):
+        self.session_id = session_id
+        self.root = os.path.abspath(root)
+        self.cwd = self.root
+        os.makedirs(self.root, exist_ok=True)
+
+    def resolve(self, path: Optional[str] = None) -> str:
+        """Return ``path`` as an absolute path relative to the workspace cwd."""
+        if not path:
+            return self.cwd
+        return os.path.normpath(os.path.join(self.cwd, os.path.expanduser(path)))
+
+    def change_directory(self, path: str) -> str:
+        target = self.resolve(path)
+        if not os.path.isdir(target):
+            raise NotADirectoryError(f"Directory '{path}' does not exist or is not a directory")
+        self.cwd = target
+        return self.cwd
+
+
+_workspaces: Dict[str, Workspace] = {}
+_workspaces_lock = threading.Lock()
+
+
+def get_workspace(session_id: Optional[str] = None) -> Workspace:
+    """Return the workspace for a session, creating it on first use.
+
+    With ``ISOLATE_SESSION_WORKSPACES`` enabled every session gets its own
+    directory under ``WORKSPACE_ROOT``; otherwise sessions share the root but
+    still track their own current directory.
+    """
+    session_id = session_id or DEFAULT_SESSION
+    with _workspaces_lock:
+        workspace = _workspaces.get(session_id)
+        if workspace is None:
+            root = settings.WORKSPACE_ROOT
+            if settings.ISOLATE_SESSION_WORKSPACES and session_id != DEFAULT_SESSION:
+                root = os.path.join(root, session_id)
+            workspace = Workspace(session_id, root)
+            _workspaces[session_id] = workspace
+        return workspace
+
+
+def release_workspace(session_id: str) -> Optional[Workspace]:
+    """Forget a session's workspace state (files on disk are kept) and return it, if any."""
+    with _workspaces_lock:
+        return _workspaces.pop(session_id, None)
+
+
+# ***************** Command executor *****************
+
+class CommandExecutor:
+    """Runs one-shot commands on a bounded thread pool with an explicit cwd."""
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="herapheri-cmd")
+
+    def run(
+        self,
+        command: Union[str, Sequence[str]],
+        cwd: Optional[str] = None,
+        timeout: Optional[float] = 30,
+        capture_output: bool = True,
+        shell: bool = True,
+        env: Optional[Dict[str, str]] = None,
+    ) -> CommandResult:
+        """Run a single command in the calling thread."""
+        display = command if isinstance(command, str) else " ".join(command)
+        start = time.monotonic()
+        try:
+            completed = subprocess.run(
+                command,
+                shell=shell,
+                capture_output=capture_output,
+                text=True,
+                timeout=timeout,
+                cwd=cwd,
+                env=env,
+            )
+        except subprocess.TimeoutExpired as e:
+            return CommandResult(
+                command=display,
+                exit_code=None,
+                stdout=_decode(e.stdout),
+                stderr=_decode(e.stderr),
+                duration=time.monotonic() - start,
+                cwd=cwd,
+                timed_out=True,
+            )
+        except FileNotFoundError:
+            return CommandResult(
+                command=display,
+                exit_code=127,
+                stderr=f"Command '{display}' not found. Make sure the command/program is installed and in PATH",
+                duration=time.monotonic() - start,
+                cwd=cwd,
+            )
+        except PermissionError:
+            return CommandResult(
+                command=display,
+                exit_code=126,
+                stderr=f"Permission denied when executing '{display}'",
+                duration=time.monotonic() - start,
+                cwd=cwd,
+            )
+
+        return CommandResult(
+            command=display,
+            exit_code=completed.returncode,
+            stdout=completed.stdout or "",
+            stderr=completed.stderr or "",
+            duration=time.monotonic() - start,
+            cwd=cwd,
+        )
+
+    def submit(self, command: Union[str, Sequence[str]], **kwargs) -> Future:
+        """Schedule a command on the pool and return its future."""
+        return self._pool.submit(self.run, command, **kwargs)
+
+    def run_many(self, commands: Sequence[str], **kwargs) -> List[CommandResult]:
+        """Run independent commands in parallel; results keep the input order."""
+        futures = [self.submit(command, **kwargs) for command in commands]
+        return [future.result() for future in futures]
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _decode(output) -> str:
+    if output is None:
+        return ""
+    if isinstance(output, bytes):
+        return output.decode("utf-8", errors="replace")
+    return output
+
+
+_executor: Optional[CommandExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_command_executor() -> CommandExecutor:
+    """Return the process-wide executor sized by ``MAX_PARALLEL_COMMANDS``."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = CommandExecutor(max_workers=settings.MAX_PARALLEL_COMMANDS)
+        return _executor
@@ -1,9 +1,21 @@
-from typing import Dict, Any, Literal
+from typing import Dict, Any, Literal, Optional
 from langgraph.graph import StateGraph, END
+from langchain_core.messages import AIMessage, HumanMessage
+import time
 from database.storage import ConversationStorage
-from database.models import Conversation
+from database.checkpoint import DuckDBCheckpointSaver
+from database.models import Conversation, NodeMetric
+from database.plans import PlanMatch
+from llms.factory import LLMFactory
+from llms.cassette import Cassette
 import uuid
-from agents.state import HeraPheriState
+from agents.state import GraphState, HeraPheriState
+from agents.memory import MemoryTracker, truncate_middle
+from agents.shell import close_shell_session
+from agents.executor import release_workspace
+from agents.search import release_search_index
+from agents.retry import RetryStats, backoff_delay
+from config.settings import settings
 from agents.nodes import (
     ShyamPlannerNode,
     TaskPlannerNode,
@@ -12,18 +24,44 @@ from agents.nodes import (
     BabuBhiyaNode,
 )
 
+NODE_KEYS = ("shyam_planner", "task_planner", "raju_coder", "shyam_reviewer", "babu_bhaiya")
+
+
+def parse_node_models(spec: str) -> Dict[str, str]:
+    """Parse "task_planner=groq/llama-3.1-8b-instant,raju_coder=openai/gpt-4o" into {node: model spec}."""
+    node_models = {}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        node, _, model = item.partition("=")
+        node = node.strip()
+        if node not in NODE_KEYS:
+            raise ValueError(f"Unknown node '{node}' in node models. Available: {list(NODE_KEYS)}")
+        node_models[node] = model.strip()
+    return node_models
+
+
 class HeraPheriGraph(StateGraph):
-    def __init__(self, llm_provider: str = "groq", session_id: str = None):
+    def __init__(self, llm_provider: str = "groq", session_id: str = None, model: str = None,
+                 node_models: Dict[str, str] = None, cassette: Cassette = None, memory: MemoryTracker = None):
         self.llm_provider = llm_provider
+        self.model = model
+        # Per-node overrides from settings, then from the caller (e.g. --node-model)
+        self.node_models = {**parse_node_models(settings.NODE_MODELS), **(node_models or {})}
         self.session_id = session_id or uuid.uuid4().hex
         self.storage = ConversationStorage()
+        self.checkpointer = DuckDBCheckpointSaver(self.storage.conn, keep_last=settings.CHECKPOINT_HISTORY)
+        self.cassette = cassette
+        self.memory = memory
+        self.recall_nodes = {node.strip() for node in settings.RECALL_NODES.split(",") if node.strip()}
+        if cassette:
+            cassette.record_meta(session_id=self.session_id, llm_provider=llm_provider, model=model,
+                                 node_models=self.node_models)
         
         # Init nodes
-        self.planning_node = ShyamPlannerNode(llm_provider=self.llm_provider)
-        self.task_planner_node = TaskPlannerNode(llm_provider=self.llm_provider)
-        self.raju_coder_node = RajuCoderNode(llm_provider=self.llm_provider)
-        self.shyam_reviewer_node = ShyamReviewerNode(llm_provider=self.llm_provider)
-        self.babu_bhiya_node = BabuBhiyaNode(llm_provider=self.llm_provider)
+        self.planning_node = ShyamPlannerNode(**self._node_llm("shyam_planner"), session_id=self.session_id, cassette=cassette)
+        self.task_planner_node = TaskPlannerNode(**self._node_llm("task_planner"), cassette=cassette)
+        self.raju_coder_node = RajuCoderNode(**self._node_llm("raju_coder"), session_id=self.session_id, cassette=cassette)
+        self.shyam_reviewer_node = ShyamReviewerNode(**self._node_llm("shyam_reviewer"), session_id=self.session_id, cassette=cassette)
+        self.babu_bhiya_node = BabuBhiyaNode(**self._node_llm("babu_bhaiya"), session_id=self.session_id, cassette=cassette)
         
         # Build graph
         self.graph = self._build_graph()
@@ -31,14 +69,14 @@ class HeraPheriGraph(StateGraph):
     def _build_graph(self) -> StateGraph:
         """Build the state graph for HeraPheri agents."""
         
-        graph = StateGraph(dict)
+        graph = StateGraph(GraphState)
         
         # Add all nodes
         graph.add_node("Shyam Planner", self._planner_node_wrapper)
         graph.add_node("Raju coder", self._raju_coder_node_wrapper)
         graph.add_node("Shyam Review", self._shyam_reviewer_node_wrapper)
         graph.add_node("Babu Bhaiya", self._babu_bhaiya_node_wrapper)
-        graph.add_node("Task Remaining", lambda state: state)
+        graph.add_node("Task Remaining", self._task_remaining_node)
         
         graph.add_edge("Shyam Planner", "Task Remaining")
         graph.add_edge("Shyam Review", "Raju coder")
@@ -46,7 +84,7 @@ class HeraPheriGraph(StateGraph):
         
         graph.add_conditional_edges(
             "Task Remaining",
-            self._task_remaining_node,
+            self._task_remaining_routing,
             {
                 "__else__": "Raju coder",
                 "END": END
@@ -58,22 +96,124 @@ class HeraPheriGraph(StateGraph):
             self._babu_bhaiya_routing,
             {
                 "Success": "Task Remaining",
-                "Error": "Shyam Review"
+                "Error": "Shyam Review",
+                "Skip": "Task Remaining",
+                "Abort": END
             }
         )
         graph.set_entry_point("Shyam Planner")
         
-        return graph.compile()
+        # State is checkpointed after every node so an interrupted run can be resumed
+        return graph.compile(checkpointer=self.checkpointer)
+    
+    def _node_llm(self, key: str) -> Dict[str, Any]:
+        """Provider and model for a node: its override if configured, else the session's."""
+        if key in self.node_models:
+            provider, model = LLMFactory.parse_model_spec(self.node_models[key], self.llm_provider)
+            return {"llm_provider": provider, "model": model}
+        return {"llm_provider": self.llm_provider, "model": self.model}
+    
+    def _run_node(self, node_type: str, node, agent_state: HeraPheriState) -> Dict[str, Any]:
+        """Run a node and record its latency and token usage.
+
+        The result always has ``output`` and ``success``: a node that failed
+        returns its error as ``response``/``error`` instead, which becomes
+        the output.
+        """
+        node.usage.reset()
+        started = time.perf_counter()
+        if self.memory:
+            with self.memory.measure(node_type):
+                result = node.process(agent_state)
+        else:
+            result = node.process(agent_state)
+        usage = node.usage.snapshot()
+        self.storage.save_metric(NodeMetric(
+            session_id=self.session_id,
+            node_type=node_type,
+            model=LLMFactory.model_label(node.llm),
+            latency=time.perf_counter() - started,
+            success=bool(result.get('success')),
+            **usage
+        ))
+        output = result.get('output')
+        if output is None:
+            output = result.get('response') or result.get('error') or ''
+        return {**result, "output": str(output), "success": bool(result.get('success'))}
+    
+    @staticmethod
+    def _capped(text: str) -> str:
+        """Text as kept in graph state, and so in every checkpoint: at most MAX_STATE_CHARS."""
+        return truncate_middle(text, settings.MAX_STATE_CHARS)
+    
+    def _node_state(self, state: GraphState) -> HeraPheriState:
+        return HeraPheriState.from_graph_state(state, self.llm_provider, self.session_id)
+    
+    def _recall(self, key: str, agent_state: HeraPheriState):
+        """Give the node the most relevant steps of earlier sessions, if it is one of RECALL_NODES."""
+        query = agent_state.agent_input
+        if key not in self.recall_nodes or not query:
+            return
+        if self.cassette and self.cassette.replaying and not self.cassette.remaining().get("recall/recall"):
+            return  # recorded without recall
+        fetch = lambda: self.storage.index.context(
+            query, k=settings.RECALL_TOP_K, max_tokens=settings.RECALL_MAX_TOKENS, exclude_session=self.session_id
+        )
+        try:
+            if self.cassette:
+                agent_state.context = self.cassette.channel("recall").call("recall", {"node": key, "query": query}, fetch)
+            else:
+                agent_state.context = fetch()
+        except Exception:
+            agent_state.context = ""  # recall is best effort; the node runs without it
     
-    def _planner_node_wrapper(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    def _find_plan(self, task: str) -> Optional[PlanMatch]:
+        """An earlier plan for a near-duplicate of ``task``, for the planner to adapt."""
+        if not settings.PLAN_REUSE or not task:
+            return None
+        if self.cassette and self.cassette.replaying and not self.cassette.remaining().get("plans/match"):
+            return None  # recorded without plan reuse
+        fetch = lambda: self.storage.plans.find(task, settings.PLAN_REUSE_THRESHOLD)
+        try:
+            if self.cassette:
+                return self.cassette.channel("plans").call(
+                    "match", {"task": task}, fetch,
+                    encode=lambda match: match.to_dict() if match else None,
+                    decode=lambda data: PlanMatch.from_dict(data) if data else None,
+                )
+            return fetch()
+        except Exception:
+            return None  # plan from scratch
+    
+    def _update(self, node_type: str, result: Dict[str, Any], response: str = None,
+                agent_input: str = None) -> GraphState:
+        """State update for a node run: its output, success, and entries for the message and tool logs."""
+        output = result['output']
+        response = output if response is None else response
+        limit = settings.STATE_LOG_CHARS
+        return {
+            "agent_input": self._capped(output if agent_input is None else agent_input),
+            "response": self._capped(response),
+            "node_type": node_type,
+            "success": result['success'],
+            "messages": [AIMessage(content=truncate_middle(response, limit), name=node_type)],
+            "tool_results": [
+                {**entry, "node_type": node_type, "output": truncate_middle(entry["output"], limit)}
+                for entry in result.get('tool_results', [])
+            ],
+        }
+    
+    def _planner_node_wrapper(self, state: GraphState) -> GraphState:
         """Wrapper of planner node"""
-        agent_state = HeraPheriState()
-        agent_state.task = state['task']
+        agent_state = self._node_state(state)
         agent_state.agent_input = state['task']
-        agent_state.llm_provider = self.llm_provider
-        agent_state.session_id = self.session_id
+        match = self._find_plan(agent_state.task)
+        if match:
+            agent_state.template_task, agent_state.template_plan = match.task, match.plan
+        else:
+            self._recall("shyam_planner", agent_state)
         
-        result = self.planning_node.process(agent_state)
+        result = self._run_node("ShyamPlannerNode", self.planning_node, agent_state)
         
         conversation = Conversation(
             session_id=self.session_id,
@@ -87,28 +227,31 @@ class HeraPheriGraph(StateGraph):
         
         self.storage.create(conversation)
         
+        plan_id = ""
+        if result['success'] and result['output']:
+            plan_id = self.storage.plans.add(self.session_id, agent_state.task, result['output'], reused_from=match) or ""
+        
         return {
-            **state,
-            "agent_input": result['output'],
-            "response": result['output'],
-            "node_type": "ShyamPlannerNode",
-            "success": result['success'],
+            **self._update("ShyamPlannerNode", result),
+            "plan": self._capped(result['output']),
+            "plan_id": plan_id,
+            "plan_reuse": {"plan_id": match.plan_id, "task": match.task, "similarity": match.similarity} if match else {},
         }
         
-    def _raju_coder_node_wrapper(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    def _raju_coder_node_wrapper(self, state: GraphState) -> GraphState:
         """Wrapper for Raju Coder Node"""
-        agent_state = HeraPheriState()
-        agent_state.agent_input = state.get('agent_input', '')
-        agent_state.llm_provider = self.llm_provider
-        agent_state.session_id = self.session_id
+        agent_state = self._node_state(state)
+        self._recall("raju_coder", agent_state)
         
-        result = self.raju_coder_node.process(agent_state)
+        # Nodes overwrite agent_input with their output, so keep what they were given for the log
+        node_input = agent_state.agent_input
+        result = self._run_node("RajuCoderNode", self.raju_coder_node, agent_state)
         
         conversation = Conversation(
             session_id=self.session_id,
             node_type="RajuCoderNode",
             messages=[
-                f"Input: {agent_state.agent_input}",
+                f"Input: {node_input}",
                 f"Output: {result['output']}"
             ],
             llm_provider=self.llm_provider
@@ -116,28 +259,21 @@ class HeraPheriGraph(StateGraph):
         
         self.storage.create(conversation)
         
-        return {
-            **state,
-            "agent_input": result['output'],
-            "response": result['output'],
-            "node_type": "RajuCoderNode",
-            "success": result['success'],
-        }
+        return self._update("RajuCoderNode", result)
         
-    def _shyam_reviewer_node_wrapper(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    def _shyam_reviewer_node_wrapper(self, state: GraphState) -> GraphState:
         """Wrapper for Shyam Reviewer Node"""
-        agent_state = HeraPheriState()
-        agent_state.agent_input = state.get('agent_input', '')
-        agent_state.llm_provider = self.llm_provider
-        agent_state.session_id = self.session_id
+        agent_state = self._node_state(state)
+        self._recall("shyam_reviewer", agent_state)
         
-        result = self.shyam_reviewer_node.process(agent_state)
+        node_input = agent_state.agent_input
+        result = self._run_node("ShyamReviewerNode", self.shyam_reviewer_node, agent_state)
         
         conversation = Conversation(
             session_id=self.session_id,
             node_type="ShyamReviewerNode",
             messages=[
-                f"Input: {agent_state.agent_input}",
+                f"Input: {node_input}",
                 f"Output: {result['output']}"
             ],
             llm_provider=self.llm_provider
@@ -145,28 +281,21 @@ class HeraPheriGraph(StateGraph):
         
         self.storage.create(conversation)
         
-        return {
-            **state,
-            "agent_input": result['output'],
-            "response": result['output'],
-            "node_type": "ShyamReviewerNode",
-            "success": result['success'],
-        }
+        return self._update("ShyamReviewerNode", result)
         
-    def _babu_bhaiya_node_wrapper(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    def _babu_bhaiya_node_wrapper(self, state: GraphState) -> GraphState:
         """Wrapper for Babu Bhaiya Node"""
-        agent_state = HeraPheriState()
-        agent_state.agent_input = state.get('agent_input', '')
-        agent_state.llm_provider = self.llm_provider
-        agent_state.session_id = self.session_id
+        agent_state = self._node_state(state)
+        self._recall("babu_bhaiya", agent_state)
         
-        result = self.babu_bhiya_node.process(agent_state)
+        node_input = agent_state.agent_input
+        result = self._run_node("BabuBhiyaNode", self.babu_bhiya_node, agent_state)
         
         conversation = Conversation(
             session_id=self.session_id,
             node_type="BabuBhiyaNode",
             messages=[
-                f"Input: {agent_state.agent_input}",
+                f"Input: {node_input}",
                 f"Output: {result['output']}"
             ],
             llm_provider=self.llm_provider
@@ -174,64 +303,150 @@ class HeraPheriGraph(StateGraph):
         
         self.storage.create(conversation)
         
+        output = result['output']
+        agent_input = output
+        stats = RetryStats.from_state(state)
+        if result['success']:
+            stats.record_success()
+        else:
+            stats.record_failure(output, settings.MAX_TASK_RETRIES, settings.MAX_IDENTICAL_FAILURES)
+            if not stats.exhausted:
+                delay = backoff_delay(stats.task_attempts, settings.RETRY_BACKOFF_BASE, settings.RETRY_BACKOFF_MAX)
+                time.sleep(delay)
+                stats.backoff_seconds += delay
+            elif settings.ON_RETRY_EXHAUSTED == "skip":
+                attempts = stats.task_attempts
+                stats.start_next_task()
+                agent_input = (
+                    f"The current task was skipped after {attempts} failed attempts. "
+                    f"Continue with the next task.\n\nLast error:\n{output}"
+                )
+            else:
+                stats.outcome = "aborted"
+                output = (
+                    f"Stopped after {stats.task_attempts} failed attempts "
+                    f"({stats.identical_failures} identical in a row).\n\n{output}"
+                )
+        
         return {
-            **state,
-            "agent_input": result['output'],
-            "response": result['output'],
-            "node_type": "BabuBhiyaNode",
-            "success": result['success'],
+            **self._update("BabuBhiyaNode", result, response=output, agent_input=agent_input),
+            "retry_stats": stats.to_dict(),
         }
         
-    def _babu_bhaiya_routing(self, state: Dict[str, Any]) -> Literal["Success", "Error"]:
-        """Route based on Babu Bhaiya node success/failure"""
-        return "Success" if state.get('success', False) else "Error"
+    def _babu_bhaiya_routing(self, state: GraphState) -> Literal["Success", "Error", "Skip", "Abort"]:
+        """Route based on Babu Bhaiya node success/failure and the retry budget"""
+        if state.get('success', False):
+            return "Success"
+        if RetryStats.from_state(state).exhausted:
+            return "Skip" if settings.ON_RETRY_EXHAUSTED == "skip" else "Abort"
+        return "Error"
         
-    def _task_remaining_node(self, state: Dict[str, Any]) -> Literal["__else__", "END"]:
-        """Determine if there are more tasks remaining."""
-        agent_state = HeraPheriState()
-        agent_state.agent_input = state.get('agent_input', '')
-        agent_state.llm_provider = self.llm_provider
-        agent_state.session_id = self.session_id
+    def _task_remaining_node(self, state: GraphState) -> GraphState:
+        """Ask the task planner whether there are more tasks remaining."""
+        agent_state = self._node_state(state)
+        self._recall("task_planner", agent_state)
         
-        result = self.task_planner_node.process(agent_state)
+        node_input = agent_state.agent_input
+        result = self._run_node("TaskPlannerNode", self.task_planner_node, agent_state)
         
         # Check if any completion phrases are in the output
         completion_phrases = ['all tasks are completed', 'end', 'sucessfully completed all the tasks']
-        # Fix: Access the output correctly from the result dictionary
-        output_text = result.get('output', '')
+        output_text = result['output']
         output_lower = output_text.lower()
         
-        if any(phrase in output_lower for phrase in completion_phrases):
-            return "END"
-        else:
-            conversation = Conversation(
-                session_id=self.session_id,
-                node_type="TaskPlannerNode",
-                messages=[
-                    f"Input: {agent_state.agent_input}",
-                    f"Output: {output_text}"  # Use the extracted output_text
-                ],
-                llm_provider=self.llm_provider
-            )
-            self.storage.create(conversation)
-            
-            # Update state for next node
-            state.update({
-                "agent_input": output_text,  # Use the extracted output_text
-                "response": output_text,     # Use the extracted output_text
-                "node_type": "TaskPlannerNode",
-                "success": result.get('success', False),  # Use .get() for safety
-            })
-            
-            return "__else__"
-                
+        if result['success'] and any(phrase in output_lower for phrase in completion_phrases):
+            return {"tasks_completed": True}
+        
+        conversation = Conversation(
+            session_id=self.session_id,
+            node_type="TaskPlannerNode",
+            messages=[
+                f"Input: {node_input}",
+                f"Output: {output_text}"
+            ],
+            llm_provider=self.llm_provider
+        )
+        self.storage.create(conversation)
+        
+        return {
+            **self._update("TaskPlannerNode", result),
+            "current_task": self._capped(output_text),
+            "tasks_completed": False,
+        }
+        
+    def _task_remaining_routing(self, state: GraphState) -> Literal["__else__", "END"]:
+        """Route to END once the task planner reports all tasks done."""
+        return "END" if state.get('tasks_completed') else "__else__"
+    
+    @property
+    def _config(self) -> Dict[str, Any]:
+        # The retry budget bounds the fix loop, so the recursion limit only caps the number of tasks.
+        return {
+            "configurable": {"thread_id": self.session_id},
+            "recursion_limit": settings.GRAPH_RECURSION_LIMIT,
+        }
+    
+    def _invoke(self, graph_input: Optional[GraphState]) -> Dict[str, Any]:
+        return self._finish(self.graph.invoke(graph_input, self._config, durability=settings.CHECKPOINT_DURABILITY))
+    
+    def _finish(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        stats = RetryStats.from_state(result)
+        if stats.outcome == "running":
+            stats.outcome = "completed"
+        result["retry_stats"] = stats.to_dict()
+        if result.get("plan_id"):
+            # Plans of aborted sessions are not offered for reuse
+            self.storage.plans.set_outcome(result["plan_id"], stats.outcome)
+        return result
+    
+    def pending_node(self) -> Optional[str]:
+        """Name of the node an interrupted run would continue with, if any."""
+        snapshot = self.graph.get_state(self._config)
+        return snapshot.next[0] if snapshot.next else None
+    
+    def resume(self) -> Dict[str, Any]:
+        """Continue an interrupted run from its last completed node."""
+        if not self.pending_node():
+            raise ValueError(f"Session {self.session_id} has no interrupted run to resume")
+        return self._invoke(None)
         
     def process_input(self, initial_state: str) -> Dict[str, Any]:
         """Process the initial input through the state graph."""
-        initial_input = {
+        # The thread keeps its message and tool logs; everything tied to one request starts over.
+        initial_input: GraphState = {
             "task": initial_state,
             "session_id": self.session_id,
+            "messages": [HumanMessage(content=truncate_middle(initial_state, settings.STATE_LOG_CHARS))],
+            "plan": "",
+            "plan_id": "",
+            "plan_reuse": {},
+            "current_task": "",
+            "agent_input": "",
+            "response": "",
+            "node_type": "",
+            "success": False,
+            "tasks_completed": False,
+            "retry_stats": RetryStats().to_dict(),
         }
+        if self.cassette:
+            self.cassette.record_input(initial_state)
         
-        result = self.graph.invoke(initial_input)
-        return result
\ No newline at end of file
+        return self._invoke(initial_input)
+    
+    def close(self, release_session: bool = True):
+        """Close the storage and cassette and drop the compiled graph.
+        
+        With ``release_session`` the session's shell, workspace state and
+        search index are released too; keep them when the same session
+        continues in a new graph (e.g. after switching provider).
+        """
+        if release_session:
+            close_shell_session(self.session_id)
+            workspace = release_workspace(self.session_id)
+            if workspace:
+                release_search_index(workspace.root)
+        if self.cassette:
+            self.cassette.close()
+        self.checkpointer.close()
+        self.storage.close()
+        self.graph = None
@@ -0,0 +1,115 @@
+import os
+import threading
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+
+def truncate_middle(text: str, limit: int) -> str:
+    """Keep the head and tail of ``text`` within ``limit`` characters.
+
+    Errors usually show up at the end of an output and context at the
+    start, so the middle is what gets dropped.
+    """
+    if not isinstance(text, str) or limit <= 0 or len(text) <= limit:
+        return text
+    marker = f"\n... [{len(text) - limit} characters truncated] ...\n"
+    head = max(0, (limit - len(marker)) // 2)
+    tail = max(0, limit - len(marker) - head)
+    return text[:head] + marker + (text[-tail:] if tail else "")
+
+
+def rss_bytes() -> Optional[int]:
+    """Resident set size of this process, if the platform exposes it."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        # ru_maxrss is the peak, in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+    except (ImportError, AttributeError):
+        return None
+
+
+@dataclass
+class NodeMemory:
+    node_type: str
+    retained: int          # traced bytes still allocated after the node, relative to before
+    peak: int              # highest traced bytes during the node, relative to before
+    rss: Optional[int]
+    top: List[str] = field(default_factory=list)  # source lines whose allocations grew the most
+
+
+class MemoryTracker:
+    """tracemalloc snapshots around each node run.
+
+    Snapshots are expensive, so this is only enabled on request
+    (``--trace-memory``). Records are kept in a bounded history.
+    """
+
+    def __init__(self, top: int = 5, history: int = 500):
+        self.top = top
+        self.records: Deque[NodeMemory] = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._started_tracing = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+
+    @contextmanager
+    def measure(self, node_type: str) -> Iterator[None]:
+        if not tracemalloc.is_tracing():
+            yield
+            return
+        with self._lock:
+            before = self._snapshot()
+            start, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            with self._lock:
+                current, peak = tracemalloc.get_traced_memory()
+                growth = self._snapshot().compare_to(before, "lineno")[:self.top]
+                self.records.append(NodeMemory(
+                    node_type=node_type,
+                    retained=current - start,
+                    peak=max(0, peak - start),
+                    rss=rss_bytes(),
+                    top=[str(stat) for stat in growth if stat.size_diff > 0],
+                ))
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Per node: runs, total and mean retained bytes, and the largest peak."""
+        with self._lock:
+            records = list(self.records)
+        nodes: Dict[str, Dict[str, Any]] = {}
+        for record in records:
+            node = nodes.setdefault(record.node_type, {"node_type": record.node_type, "runs": 0,
+                                                       "retained": 0, "max_peak": 0})
+            node["runs"] += 1
+            node["retained"] += record.retained
+            node["max_peak"] = max(node["max_peak"], record.peak)
+        for node in nodes.values():
+            node["mean_retained"] = node["retained"] / node["runs"]
+        return sorted(nodes.values(), key=lambda node: node["retained"], reverse=True)
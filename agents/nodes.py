@@ -1,24 +1,52 @@
 from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain.prompts import ChatPromptTemplate
-from typing import Dict, Any
+from langchain_core.messages import SystemMessage
+from typing import Dict, Any, List, Tuple
 from llms.factory import LLMFactory
+from llms.usage import TokenUsageCallback
+from llms.cassette import Cassette
 from agents.state import HeraPheriState, Prompts
-from tools.shyam_node_tools import WebSearchTool
+from agents.commands import extract_commands
+from agents.tool import run_terminal_command
+from agents.shell import CommandResult
+from config.settings import settings
+from tools.shyam_node_tools import WebSearchTool, ProjectTreeTool
 
 from tools.task_node_tools import LoadMarkdownTool, SaveMarkdownTool
-from tools.raju_node_tools import CreateFileTool, UpdateFileTool
-from tools.babu_bhaiya_node_tools import TerminalCmdNodeTool, SystemInfoNodeTool, ChangeDirectoryNodeTool
+from tools.raju_node_tools import CreateFileTool, UpdateFileTool, WriteFilesTool, ApplyPatchTool, SearchReplaceTool, ReplaceLinesTool
+from tools.workspace_tools import CodeSearchTool, ReadFileTool, FileOutlineTool, SymbolSourceTool
+from tools.babu_bhaiya_node_tools import TerminalCmdNodeTool, SystemInfoNodeTool, ChangeDirectoryNodeTool, ParallelCmdNodeTool
+
+def tool_results(steps) -> List[Dict[str, Any]]:
+    """The tool calls of an agent run, from AgentExecutor's intermediate steps."""
+    return [{"tool": action.tool, "input": action.tool_input, "output": str(observation)} for action, observation in steps]
+
+
+def recall_messages(state: HeraPheriState) -> List[SystemMessage]:
+    """Steps recalled from earlier sessions, as a system message after the node's own prompt."""
+    if not state.context:
+        return []
+    return [SystemMessage(content=f"Relevant steps from earlier sessions, for reference only:\n\n{state.context}")]
+
 
 # Agents Nodes
 class ShyamPlannerNode:
-    def __init__(self, llm_provider: str = "groq"):
+    def __init__(self, llm_provider: str = "groq", session_id: str = None, model: str = None, cassette: Cassette = None):
         self.llm_provider = llm_provider
-        self.llm = LLMFactory.create_llm(llm_provider)
-        self.tools = [WebSearchTool(), SaveMarkdownTool()]
+        self.session_id = session_id
+        self.model = model
+        self.usage = TokenUsageCallback()
+        # Records or replays this node's LLM calls and tool results
+        self.cassette = cassette.channel("ShyamPlannerNode") if cassette else None
+        self.llm = LLMFactory.create_llm(llm_provider, model, callbacks=[self.usage], cassette=self.cassette)
+        self.tools = [WebSearchTool(), SaveMarkdownTool(), ProjectTreeTool(session_id=session_id)]
+        if self.cassette:
+            self.tools = self.cassette.wrap_tools(self.tools)
         
         self.prompt = ChatPromptTemplate.from_messages(
             [
                 ("system", Prompts.plannernode),
+                ("placeholder", "{context}"),
                 ("human", "{input}"),
                 ("placeholder", "{agent_scratchpad}")
             ]
@@ -32,14 +60,43 @@ class ShyamPlannerNode:
             agent=self.agent,
             tools=self.tools,
             verbose=True,
-            handle_parsing_errors=True
+            handle_parsing_errors=True,
+            return_intermediate_steps=True
+        )
+        
+        # Adapting an earlier plan needs no research: no web search, one short prompt
+        self.adapt_tools = [tool for tool in self.tools if tool.name != "web_search"]
+        self.adapt_prompt = ChatPromptTemplate.from_messages(
+            [
+                ("system", Prompts.planadaptnode),
+                ("human", "{input}"),
+                ("placeholder", "{agent_scratchpad}")
+            ]
+        )
+        self.adapt_executor = AgentExecutor(
+            agent=create_tool_calling_agent(llm=self.llm, tools=self.adapt_tools, prompt=self.adapt_prompt),
+            tools=self.adapt_tools,
+            verbose=True,
+            handle_parsing_errors=True,
+            return_intermediate_steps=True
         )
+        
     def process(self, state: HeraPheriState) -> Dict[str, Any]:
         """Process the state for ShyamPlannerNode."""
         try:
-            response = self.agent_executor.invoke({
-                "input": state.task,
-            })
+            if state.template_plan:
+                response = self.adapt_executor.invoke({
+                    "input": (
+                        f"New task:\n{state.task}\n\n"
+                        f"Earlier task:\n{state.template_task}\n\n"
+                        f"Plan written for the earlier task:\n{state.template_plan}"
+                    ),
+                })
+            else:
+                response = self.agent_executor.invoke({
+                    "input": state.task,
+                    "context": recall_messages(state),
+                })
             state.agent_output = response['output']
             
             state.node_type = "ShyamPlannerNode"
@@ -47,7 +104,8 @@ class ShyamPlannerNode:
             return {
                 "state": state,
                 "output": response['output'],
-                "success": True
+                "success": True,
+                "tool_results": tool_results(response.get('intermediate_steps', []))
             }
         except Exception as e:
             state.agent_output = f"Error in ShyamPlannerNode: {str(e)}"
@@ -60,14 +118,20 @@ class ShyamPlannerNode:
             }
     
 class TaskPlannerNode:
-    def __init__(self, llm_provider: str = "groq"):
+    def __init__(self, llm_provider: str = "groq", model: str = None, cassette: Cassette = None):
         self.llm_provider = llm_provider
-        self.llm = LLMFactory.create_llm(llm_provider)
+        self.model = model
+        self.usage = TokenUsageCallback()
+        self.cassette = cassette.channel("TaskPlannerNode") if cassette else None
+        self.llm = LLMFactory.create_llm(llm_provider, model, callbacks=[self.usage], cassette=self.cassette)
         self.tools = [LoadMarkdownTool(), SaveMarkdownTool()]
+        if self.cassette:
+            self.tools = self.cassette.wrap_tools(self.tools)
         
         self.prompt = ChatPromptTemplate.from_messages(
             [
                 ("system", Prompts.taskplannernode),
+                ("placeholder", "{context}"),
                 ("human", "{input}"),
                 ("placeholder", "{agent_scratchpad}")
             ]
@@ -81,7 +145,8 @@ class TaskPlannerNode:
             agent=self.agent,
             tools=self.tools,
             verbose=True,
-            handle_parsing_errors=True
+            handle_parsing_errors=True,
+            return_intermediate_steps=True
         )
         
     def process(self, state: HeraPheriState) -> Dict[str, Any]:
@@ -89,6 +154,7 @@ class TaskPlannerNode:
         try:
             response = self.agent_executor.invoke({
                 "input": state.agent_input,
+                "context": recall_messages(state),
             })
             state.agent_output = response['output']
             state.agent_input = state.agent_output
@@ -97,7 +163,8 @@ class TaskPlannerNode:
             return {
                 "state": state,
                 "output": response['output'],
-                "success": True
+                "success": True,
+                "tool_results": tool_results(response.get('intermediate_steps', []))
             }
         except Exception as e:
             state.agent_output = f"Error in TaskPlannerNode: {str(e)}"
@@ -110,14 +177,32 @@ class TaskPlannerNode:
             }
     
 class RajuCoderNode:
-    def __init__(self, llm_provider: str = "groq"):
+    def __init__(self, llm_provider: str = "groq", session_id: str = None, model: str = None, cassette: Cassette = None):
         self.llm_provider = llm_provider
-        self.llm = LLMFactory.create_llm(llm_provider)
-        self.tools = [CreateFileTool(), UpdateFileTool()]
+        self.session_id = session_id
+        self.model = model
+        self.usage = TokenUsageCallback()
+        self.cassette = cassette.channel("RajuCoderNode") if cassette else None
+        self.llm = LLMFactory.create_llm(llm_provider, model, callbacks=[self.usage], cassette=self.cassette)
+        self.tools = [
+            CreateFileTool(session_id=session_id),
+            UpdateFileTool(session_id=session_id),
+            WriteFilesTool(session_id=session_id),
+            ApplyPatchTool(session_id=session_id),
+            SearchReplaceTool(session_id=session_id),
+            ReplaceLinesTool(session_id=session_id),
+            CodeSearchTool(session_id=session_id),
+            ReadFileTool(session_id=session_id),
+            FileOutlineTool(session_id=session_id),
+            SymbolSourceTool(session_id=session_id),
+        ]
+        if self.cassette:
+            self.tools = self.cassette.wrap_tools(self.tools)
         
         self.prompt = ChatPromptTemplate.from_messages(
             [
                 ("system", Prompts.rajucodernode),
+                ("placeholder", "{context}"),
                 ("human", "{input}"),
                 ("placeholder", "{agent_scratchpad}")
             ]
@@ -131,7 +216,8 @@ class RajuCoderNode:
             agent=self.agent,
             tools=self.tools,
             verbose=True,
-            handle_parsing_errors=True
+            handle_parsing_errors=True,
+            return_intermediate_steps=True
         )
         
     def process(self, state: HeraPheriState) -> Dict[str, Any]:
@@ -139,6 +225,7 @@ class RajuCoderNode:
         try:
             response = self.agent_executor.invoke({
                 "input": state.agent_input,
+                "context": recall_messages(state),
             })
             state.agent_output = response['output']
             state.agent_input = state.agent_output
@@ -147,7 +234,8 @@ class RajuCoderNode:
             return {
                 "state": state,
                 "output": response['output'],
-                "success": True
+                "success": True,
+                "tool_results": tool_results(response.get('intermediate_steps', []))
             }
         except Exception as e:
             state.agent_output = f"Error in RajuCoderNode: {str(e)}"
@@ -160,14 +248,26 @@ class RajuCoderNode:
             }
     
 class ShyamReviewerNode:
-    def __init__(self, llm_provider: str = "groq"):
+    def __init__(self, llm_provider: str = "groq", session_id: str = None, model: str = None, cassette: Cassette = None):
         self.llm_provider = llm_provider
-        self.llm = LLMFactory.create_llm(llm_provider)
-        self.tools = [WebSearchTool()]
+        self.session_id = session_id
+        self.model = model
+        self.usage = TokenUsageCallback()
+        self.cassette = cassette.channel("ShyamReviewerNode") if cassette else None
+        self.llm = LLMFactory.create_llm(llm_provider, model, callbacks=[self.usage], cassette=self.cassette)
+        self.tools = [
+            WebSearchTool(),
+            CodeSearchTool(session_id=session_id),
+            ReadFileTool(session_id=session_id),
+            SymbolSourceTool(session_id=session_id),
+        ]
+        if self.cassette:
+            self.tools = self.cassette.wrap_tools(self.tools)
         
         self.prompt = ChatPromptTemplate.from_messages(
             [
                 ("system", Prompts.shyamreviewernode),
+                ("placeholder", "{context}"),
                 ("human", "{input}"),
                 ("placeholder", "{agent_scratchpad}")
             ]
@@ -181,7 +281,8 @@ class ShyamReviewerNode:
             agent=self.agent,
             tools=self.tools,
             verbose=True,
-            handle_parsing_errors=True
+            handle_parsing_errors=True,
+            return_intermediate_steps=True
         )
         
     def process(self, state: HeraPheriState) -> Dict[str, Any]:
@@ -189,6 +290,7 @@ class ShyamReviewerNode:
         try:
             response = self.agent_executor.invoke({
                 "input": state.agent_input,
+                "context": recall_messages(state),
             })
             state.agent_output = response['output']
             state.agent_input = state.agent_output
@@ -197,7 +299,8 @@ class ShyamReviewerNode:
             return {
                 "state": state,
                 "output": response['output'],
-                "success": True
+                "success": True,
+                "tool_results": tool_results(response.get('intermediate_steps', []))
             }
         except Exception as e:
             state.agent_output = f"Error in ShyamReviewerNode: {str(e)}"
@@ -210,14 +313,26 @@ class ShyamReviewerNode:
             }
     
 class BabuBhiyaNode:
-    def __init__(self, llm_provider: str = "groq"):
+    def __init__(self, llm_provider: str = "groq", session_id: str = None, model: str = None, cassette: Cassette = None):
         self.llm_provider = llm_provider
-        self.llm = LLMFactory.create_llm(llm_provider)
-        self.tools = [TerminalCmdNodeTool(), SystemInfoNodeTool(), ChangeDirectoryNodeTool()]
+        self.session_id = session_id
+        self.model = model
+        self.usage = TokenUsageCallback()
+        self.cassette = cassette.channel("BabuBhiyaNode") if cassette else None
+        self.llm = LLMFactory.create_llm(llm_provider, model, callbacks=[self.usage], cassette=self.cassette)
+        self.tools = [
+            TerminalCmdNodeTool(session_id=session_id),
+            ParallelCmdNodeTool(session_id=session_id),
+            SystemInfoNodeTool(session_id=session_id),
+            ChangeDirectoryNodeTool(session_id=session_id),
+        ]
+        if self.cassette:
+            self.tools = self.cassette.wrap_tools(self.tools)
         
         self.prompt = ChatPromptTemplate.from_messages(
             [
                 ("system", Prompts.babubhaiyanode),
+                ("placeholder", "{context}"),
                 ("human", "{input}"),
                 ("placeholder", "{agent_scratchpad}")
             ]
@@ -231,23 +346,75 @@ class BabuBhiyaNode:
             agent=self.agent,
             tools=self.tools,
             verbose=True,
-            handle_parsing_errors=True
+            handle_parsing_errors=True,
+            return_intermediate_steps=True
         )
         
+    def _run_command(self, command: str) -> CommandResult:
+        run = lambda: run_terminal_command(command, timeout=settings.BABU_COMMAND_TIMEOUT, session_id=self.session_id)
+        if not self.cassette:
+            return run()
+        return self.cassette.call("command", {"command": command}, run,
+                                  encode=CommandResult.to_dict, decode=CommandResult.from_dict)
+        
+    def _run_commands(self, commands: List[str]) -> Tuple[str, bool, List[Dict[str, Any]]]:
+        """Run Raju's commands in order in the session shell, stopping at the first failure."""
+        reports, results = [], []
+        for i, command in enumerate(commands):
+            try:
+                result = self._run_command(command)
+            except Exception as e:
+                reports.append(f"Command: {command}\nError: {str(e)}")
+                success = False
+            else:
+                reports.append(result.format(settings.MAX_TOOL_OUTPUT_CHARS))
+                success = result.success
+            results.append({"tool": "terminal_command", "input": {"command": command}, "output": reports[-1]})
+            if not success:
+                skipped = commands[i + 1:]
+                if skipped:
+                    reports.append("Skipped after failure:\n" + "\n".join(f"  {c}" for c in skipped))
+                return "Error\n\n" + "\n\n".join(reports), False, results
+        return "Success\n\n" + "\n\n".join(reports), True, results
+    
+    @staticmethod
+    def _reports_failure(text: str) -> bool:
+        return "Status: FAILED" in text or '"success": false' in text or text.startswith(("Error", "Unexpected error"))
+
+    @classmethod
+    def _steps_succeeded(cls, steps, output: str) -> bool:
+        """False if the agent ran no command, or a command or its final answer reported a failure."""
+        if not steps:
+            return False
+        texts = [str(observation) for _, observation in steps] + [str(output)]
+        return not any(cls._reports_failure(text) for text in texts)
+        
     def process(self, state: HeraPheriState) -> Dict[str, Any]:
         """Process the state for BabuBhaiyaNode."""
         try:
-            response = self.agent_executor.invoke({
-                "input": state.agent_input,
-            })
-            state.agent_output = response['output']
+            commands = extract_commands(state.agent_input) if settings.BABU_FAST_PATH else None
+            if commands:
+                # Raju spelled the commands out: run them directly, no LLM needed.
+                output, success, results = self._run_commands(commands)
+            else:
+                response = self.agent_executor.invoke({
+                    "input": state.agent_input,
+                    "context": recall_messages(state),
+                })
+                output = response['output']
+                steps = response.get('intermediate_steps', [])
+                success = self._steps_succeeded(steps, output)
+                results = tool_results(steps)
+            state.agent_output = output
             state.agent_input = state.agent_output
             state.node_type = "BabuBhaiyaNode"
             
             return {
                 "state": state,
-                "output": response['output'],
-                "success": True
+                "output": output,
+                "success": success,
+                "fast_path": bool(commands),
+                "tool_results": results
             }
         except Exception as e:
             state.agent_output = f"Error in BabuBhaiyaNode: {str(e)}"
@@ -0,0 +1,180 @@
+import ast
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+from agents.patch import split_lines
+from agents.tree import workspace_tree
+
+
+@dataclass
+class Symbol:
+    name: str            # qualified, e.g. "HeraPheriGraph._build_graph"
+    kind: str            # "class", "function", "method", ...
+    signature: str
+    start_line: int      # 1-based, includes decorators
+    end_line: int        # 1-based, inclusive
+    doc: str = ""
+
+    @property
+    def depth(self) -> int:
+        return self.name.count(".")
+
+
+OutlineParser = Callable[[str], List[Symbol]]
+_parsers: Dict[str, OutlineParser] = {}
+
+
+def register_parser(extensions: List[str], parser: OutlineParser):
+    """Register an outline parser for file extensions (e.g. [".py"])."""
+    for extension in extensions:
+        _parsers[extension.lower()] = parser
+
+
+def parser_for(path: str) -> Optional[OutlineParser]:
+    return _parsers.get(os.path.splitext(path)[1].lower())
+
+
+# ***************** Parsers *****************
+
+def _python_signature(node) -> str:
+    if isinstance(node, ast.ClassDef):
+        bases = [ast.unparse(base) for base in node.bases] + [ast.unparse(kw) for kw in node.keywords]
+        return f"class {node.name}({', '.join(bases)})" if bases else f"class {node.name}"
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+    return f"{prefix} {node.name}({ast.unparse(node.args)}){returns}"
+
+
+def parse_python(source: str) -> List[Symbol]:
+    """Classes, functions and methods of a Python module, in source order."""
+    tree = ast.parse(source)
+    symbols: List[Symbol] = []
+
+    def visit(body, scope: str, in_class: bool):
+        for node in body:
+            if not isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+                continue
+            name = f"{scope}.{node.name}" if scope else node.name
+            if isinstance(node, ast.ClassDef):
+                kind = "class"
+            else:
+                kind = "method" if in_class else "function"
+            start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            doc = (ast.get_docstring(node) or "").strip().split("\n")[0]
+            symbols.append(Symbol(name, kind, _python_signature(node), start, node.end_lineno, doc))
+            visit(node.body, name, isinstance(node, ast.ClassDef))
+
+    visit(tree.body, "", False)
+    return symbols
+
+
+_JS_DECLARATION = re.compile(
+    r"^(?P<indent>[ \t]*)(?:export\s+(?:default\s+)?)?(?:async\s+)?"
+    r"(?:(?P<class>class)\s+(?P<cname>[A-Za-z_$][\w$]*)[^{]*"
+    r"|function\*?\s+(?P<fname>[A-Za-z_$][\w$]*)\s*\([^)]*\)"
+    r"|(?:const|let|var)\s+(?P<vname>[A-Za-z_$][\w$]*)\s*=\s*(?:async\s*)?(?:\([^)]*\)|[A-Za-z_$][\w$]*)\s*=>)",
+    re.MULTILINE,
+)
+
+
+def parse_javascript(source: str) -> List[Symbol]:
+    """Top-level-ish declarations of JavaScript/TypeScript files.
+
+    A regex scan rather than a real parser: a symbol ends where the next one
+    at the same or lower indentation starts.
+    """
+    found: List[Tuple[int, int, str, str, str]] = []
+    for match in _JS_DECLARATION.finditer(source):
+        line = source.count("\n", 0, match.start()) + 1
+        indent = len(match.group("indent").expandtabs(4))
+        name = match.group("cname") or match.group("fname") or match.group("vname")
+        kind = "class" if match.group("class") else "function"
+        found.append((line, indent, name, kind, match.group(0).strip().rstrip("{").strip()))
+
+    total = source.count("\n") + 1
+    symbols = []
+    for i, (line, indent, name, kind, signature) in enumerate(found):
+        end = total
+        for next_line, next_indent, *_ in found[i + 1:]:
+            if next_indent <= indent:
+                end = next_line - 1
+                break
+        symbols.append(Symbol(name, kind, signature, line, end))
+    return symbols
+
+
+register_parser([".py", ".pyi"], parse_python)
+register_parser([".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx"], parse_javascript)
+
+
+# ***************** Outline index *****************
+
+class OutlineIndex:
+    """Caches parsed outlines keyed by file content hash."""
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._outlines: "OrderedDict[str, List[Symbol]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def outline(self, path: str) -> Tuple[List[Symbol], List[str]]:
+        """Return the symbols of a file and its source lines."""
+        parser = parser_for(path)
+        if parser is None:
+            raise ValueError(f"No outline parser registered for '{os.path.splitext(path)[1] or path}'")
+        with open(path, "rb") as f:
+            raw = f.read()
+        digest = hashlib.sha1(raw).hexdigest()
+        source = raw.decode("utf-8", errors="replace")
+        with self._lock:
+            symbols = self._outlines.get(digest)
+            if symbols is not None:
+                self._outlines.move_to_end(digest)
+                return symbols, split_lines(source)
+        symbols = parser(source)
+        with self._lock:
+            self._outlines[digest] = symbols
+            while len(self._outlines) > self.max_entries:
+                self._outlines.popitem(last=False)
+        return symbols, split_lines(source)
+
+    def find(self, root: str, name: str, path: Optional[str] = None) -> List[Tuple[str, Symbol, List[str]]]:
+        """Locate symbols called ``name`` (or ending in ``.name``) in a file or under ``root``."""
+        if path and os.path.isfile(path):
+            candidates = [path]
+        else:
+            base = path or root
+            candidates = [
+                os.path.join(base, relpath)
+                for relpath, is_dir, _ in workspace_tree.walk(base)
+                if not is_dir and parser_for(relpath)
+            ]
+        results = []
+        for candidate in candidates:
+            try:
+                symbols, lines = self.outline(candidate)
+            except (OSError, SyntaxError, ValueError):
+                continue
+            for symbol in symbols:
+                if symbol.name == name or symbol.name.endswith("." + name):
+                    results.append((candidate, symbol, lines))
+        return results
+
+
+def resolve_module(root: str, target: str) -> Optional[str]:
+    """Map a file path or dotted module name to a file under ``root``."""
+    path = os.path.join(root, target)
+    if os.path.isfile(path):
+        return path
+    module = os.path.join(root, *target.split("."))
+    for candidate in (module + ".py", os.path.join(module, "__init__.py")):
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+outline_index = OutlineIndex()
@@ -0,0 +1,233 @@
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchError(Exception):
+    """Raised when an edit does not apply cleanly; the file is left untouched."""
+
+
+@dataclass
+class Hunk:
+    old_start: int
+    old_count: int
+    new_start: int
+    new_count: int
+    # (op, text) with op in " ", "-", "+"; text has no line terminator
+    lines: List[Tuple[str, str]] = field(default_factory=list)
+    # "\ No newline at end of file" followed the last old / new line
+    old_no_newline: bool = False
+    new_no_newline: bool = False
+
+    @property
+    def old_lines(self) -> List[str]:
+        return [text for op, text in self.lines if op in " -"]
+
+    @property
+    def new_lines(self) -> List[str]:
+        return [text for op, text in self.lines if op in " +"]
+
+
+@dataclass
+class FilePatch:
+    old_path: Optional[str]
+    new_path: Optional[str]
+    hunks: List[Hunk] = field(default_factory=list)
+
+    @property
+    def path(self) -> Optional[str]:
+        return self.new_path or self.old_path
+
+    @property
+    def is_new(self) -> bool:
+        return self.old_path is None
+
+    @property
+    def is_delete(self) -> bool:
+        return self.new_path is None
+
+
+def split_lines(text: str, keepends: bool = False) -> List[str]:
+    """Split ``text`` into lines at "\n" only, the way diff, ast and editors count lines.
+
+    Unlike ``str.splitlines()``, form feeds, vertical tabs, ``\x1c``-``\x1e``,
+    ``\x85`` and ``\u2028`` stay inside their line. A "\r\n" ending is
+    dropped with the line break unless ``keepends``.
+    """
+    lines = text.split("\n")
+    tail = lines.pop()  # whatever follows the last "\n": an unterminated last line, or ""
+    if keepends:
+        lines = [line + "\n" for line in lines]
+    else:
+        lines = [line[:-1] if line.endswith("\r") else line for line in lines]
+    if tail:
+        lines.append(tail)
+    return lines
+
+
+def _strip_prefix(path: str) -> Optional[str]:
+    path = path.split("\t")[0].strip()
+    if path == "/dev/null":
+        return None
+    if path.startswith(("a/", "b/")):
+        return path[2:]
+    return path
+
+
+def parse_unified_diff(diff: str) -> List[FilePatch]:
+    """Parse a unified diff into per-file hunks.
+
+    ``---``/``+++`` headers are optional for single-file diffs; hunks without
+    them are collected into one patch whose path is ``None``.
+    """
+    patches: List[FilePatch] = []
+    current: Optional[FilePatch] = None
+    hunk: Optional[Hunk] = None
+    old_left = new_left = 0  # old and new lines the hunk header says are still to come
+    lines = split_lines(diff)
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            current = FilePatch(_strip_prefix(line[4:]), _strip_prefix(lines[i + 1][4:]))
+            patches.append(current)
+            hunk = None
+            i += 2
+            continue
+        match = HUNK_HEADER.match(line)
+        if match:
+            if current is None:
+                current = FilePatch("", "")
+                patches.append(current)
+            old_start, old_count, new_start, new_count = match.groups()
+            hunk = Hunk(
+                int(old_start),
+                int(old_count) if old_count is not None else 1,
+                int(new_start),
+                int(new_count) if new_count is not None else 1,
+            )
+            current.hunks.append(hunk)
+            old_left, new_left = hunk.old_count, hunk.new_count
+        elif hunk is not None and line[:1] in (" ", "-", "+"):
+            hunk.lines.append((line[0], line[1:]))
+            old_left -= line[0] in " -"
+            new_left -= line[0] in " +"
+        elif hunk is not None and line == "":
+            if old_left > 0 or new_left > 0:
+                # Some generators drop the leading space on empty context lines.
+                hunk.lines.append((" ", ""))
+                old_left -= 1
+                new_left -= 1
+            else:
+                hunk = None  # the blank line between the sections of a multi-file diff
+        elif line.startswith("\\"):
+            # "\ No newline at end of file": the line before it ends the old and/or new file
+            if hunk is not None and hunk.lines:
+                op = hunk.lines[-1][0]
+                hunk.old_no_newline |= op in " -"
+                hunk.new_no_newline |= op in " +"
+        elif line.startswith(("diff ", "index ", "new file mode", "deleted file mode")):
+            hunk = None
+        i += 1
+
+    for patch in patches:
+        for h in patch.hunks:
+            old, new = len(h.old_lines), len(h.new_lines)
+            if (old, new) != (h.old_count, h.new_count):
+                raise PatchError(
+                    f"Malformed hunk @@ -{h.old_start},{h.old_count} +{h.new_start},{h.new_count} @@: "
+                    f"body has {old} old and {new} new lines"
+                )
+    if not any(patch.hunks for patch in patches):
+        raise PatchError("No hunks found in diff")
+    return patches
+
+
+def _find(lines: List[str], needle: List[str], hint: int) -> int:
+    """Locate ``needle`` in ``lines``, preferring the position closest to ``hint``."""
+    if not needle:
+        return min(max(hint, 0), len(lines))
+    best = -1
+    for start in range(len(lines) - len(needle) + 1):
+        if lines[start:start + len(needle)] == needle:
+            if best == -1 or abs(start - hint) < abs(best - hint):
+                best = start
+            if start > hint:
+                break
+    return best
+
+
+def apply_hunks(text: str, hunks: List[Hunk]) -> str:
+    """Apply hunks to ``text``. Context must match exactly; only the offset may drift."""
+    newline = "\r\n" if "\r\n" in text else "\n"
+    trailing_newline = text.endswith(("\n", "\r\n")) or not text
+    lines = split_lines(text)
+    offset = 0
+    cursor = 0
+    for h in hunks:
+        old = h.old_lines
+        # "-N,0" (no old lines) means "insert after line N"; otherwise the hunk starts at line N
+        hint = (h.old_start if h.old_count == 0 else max(h.old_start - 1, 0)) + offset
+        position = _find(lines, old, hint)
+        if position < cursor:
+            found_later = _find(lines[cursor:], old, hint - cursor)
+            position = cursor + found_later if found_later != -1 else -1
+        if position == -1:
+            actual = lines[hint:hint + len(old)]
+            expected = "\n".join(f"  {line}" for line in old) or "  <nothing>"
+            got = "\n".join(f"  {line}" for line in actual) or "  <end of file>"
+            raise PatchError(
+                f"Hunk @@ -{h.old_start},{h.old_count} +{h.new_start},{h.new_count} @@ does not apply: "
+                f"context not found.\nExpected near line {hint + 1}:\n{expected}\nFound:\n{got}"
+            )
+        lines[position:position + len(old)] = h.new_lines
+        offset += len(h.new_lines) - len(old)
+        cursor = position + len(h.new_lines)
+        if h.new_no_newline:
+            trailing_newline = False
+        elif h.old_no_newline:
+            trailing_newline = True
+    result = newline.join(lines)
+    if lines and trailing_newline:
+        result += newline
+    return result
+
+
+def replace_text(text: str, search: str, replace: str, expected_count: int = 1) -> str:
+    """Replace an exact snippet, requiring it to occur ``expected_count`` times."""
+    if not search:
+        raise PatchError("Search text must not be empty")
+    count = text.count(search)
+    if count == 0:
+        raise PatchError("Search text not found in file; re-read the file and copy the snippet exactly")
+    if count != expected_count:
+        raise PatchError(
+            f"Search text occurs {count} times but {expected_count} expected; "
+            "include more surrounding lines to make it unique"
+        )
+    return text.replace(search, replace)
+
+
+def replace_line_range(text: str, start_line: int, end_line: int, content: str,
+                       expected: Optional[str] = None) -> str:
+    """Replace lines ``start_line``..``end_line`` (1-based, inclusive) with ``content``.
+
+    ``end_line`` may be ``start_line - 1`` to insert before ``start_line``. If
+    ``expected`` is given the current lines must equal it.
+    """
+    newline = "\r\n" if "\r\n" in text else "\n"
+    lines = split_lines(text, keepends=True)
+    if start_line < 1 or end_line < start_line - 1 or end_line > len(lines):
+        raise PatchError(f"Line range {start_line}-{end_line} is outside the file (1-{len(lines)})")
+    current = "".join(lines[start_line - 1:end_line])
+    if expected is not None and current.rstrip("\r\n") != expected.rstrip("\r\n"):
+        raise PatchError(f"Lines {start_line}-{end_line} do not match the expected text; they are:\n{current}")
+    replacement = content
+    if replacement and not replacement.endswith(("\n", "\r\n")) and (end_line < len(lines) or text.endswith("\n")):
+        replacement += newline
+    before = "".join(lines[:start_line - 1])
+    if before and not before.endswith("\n"):
+        before += newline  # inserting after a last line that has no line break
+    return before + replacement + "".join(lines[end_line:])
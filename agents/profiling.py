@@ -0,0 +1,245 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_core.tools import BaseTool
+
+# Self time is grouped by where the function lives (or, for built-ins, by its name)
+# to separate the usual suspects.
+CATEGORIES: List[Tuple[str, Tuple[str, ...]]] = [
+    ("network", ("/ssl.py", "/socket.py", "/selectors.py", "_ssl.", "_socket.", "select.", "httpx", "httpcore",
+                 "urllib3", "requests/")),
+    ("sleep and backoff", ("time.sleep", "asyncio/tasks.py")),
+    ("waiting on threads", ("threading.py", "concurrent/futures", "queue.py", "_thread.lock")),
+    ("prompt formatting", ("langchain_core/prompts", "langchain_core/messages")),
+    ("pydantic validation", ("pydantic",)),
+    ("JSON encoding", ("/json/", "_json.", "orjson", "langgraph/checkpoint/serde")),
+    ("storage", ("duckdb", "database/")),
+    ("Rich rendering", ("/rich/",)),
+    ("console output", ("builtins.print",)),
+    ("subprocess and shell", ("subprocess.py", "agents/shell.py", "posix.read", "posix.write")),
+    ("imports", ("importlib", "<frozen")),
+    ("langchain / langgraph", ("langchain", "langgraph")),
+    ("herapheri", ("agents/", "llms/", "tools/", "run/")),
+]
+# Frames a blocked thread sits in, used to classify samples when per-thread CPU clocks are unavailable
+WAIT_FILES = ("ssl.py", "socket.py", "selectors.py", "threading.py", "queue.py", "subprocess.py")
+_TOOL_RUN = (BaseTool.run.__code__, BaseTool.arun.__code__)
+
+
+def category_of(filename: str, function: str = "") -> str:
+    where = filename.replace("\\", "/") + ":" + function
+    for name, fragments in CATEGORIES:
+        if any(fragment in where for fragment in fragments):
+            return name
+    return "other"
+
+
+def location(filename: str, line: int) -> str:
+    """``file:line``, relative to the working directory or site-packages where possible."""
+    if filename.startswith(os.getcwd()):
+        filename = os.path.relpath(filename)
+    elif "site-packages" in filename:
+        filename = filename.split("site-packages", 1)[1].lstrip("/\\")
+    return f"{filename}:{line}"
+
+
+def _thread_clock(ident: int) -> Optional[int]:
+    try:
+        return time.pthread_getcpuclockid(ident)
+    except (AttributeError, OSError):
+        return None
+
+
+class StackSampler:
+    """Samples the stacks of busy threads and labels them with the node and tool they run in.
+
+    Frames of ``HeraPheriGraph._run_node`` are labelled ``node:<node_type>``
+    and frames of ``BaseTool.run`` ``tool:<name>``, so the collapsed stacks
+    group by node and tool without any instrumentation. Each sample is
+    counted as CPU or wait time from the thread's CPU clock where the
+    platform has one, else from the frame the thread is blocked in.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.sections: Dict[str, Dict[str, float]] = defaultdict(lambda: {"cpu": 0.0, "wait": 0.0})
+        self.samples = 0
+        self._target = threading.get_ident()
+        self._cpu: Dict[int, float] = {}
+        self._clocks: Dict[int, Optional[int]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._target = threading.get_ident()
+        self._thread = threading.Thread(target=self._loop, name="herapheri-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _loop(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            self.sample(now - last)
+            last = now
+
+    @staticmethod
+    def _frame_name(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({location(code.co_filename, code.co_firstlineno)})".replace(";", ",")
+
+    def _busy(self, ident: int, elapsed: float) -> Optional[bool]:
+        """Whether the thread used the CPU for most of the interval; None if unknown."""
+        if ident not in self._clocks:
+            self._clocks[ident] = _thread_clock(ident)
+        clock = self._clocks[ident]
+        if clock is None:
+            return None
+        try:
+            cpu = time.clock_gettime(clock)
+        except OSError:
+            return None
+        previous = self._cpu.get(ident, cpu)
+        self._cpu[ident] = cpu
+        return cpu - previous >= elapsed / 2
+
+    def sample(self, elapsed: float):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        frames = sys._current_frames()
+        # Thread idents are reused, so forget the clocks of threads that have exited
+        for ident in set(self._clocks) - set(frames):
+            self._clocks.pop(ident, None)
+            self._cpu.pop(ident, None)
+        for ident, frame in frames.items():
+            if ident == threading.get_ident():
+                continue
+            busy = self._busy(ident, elapsed)
+            stack = []
+            while frame is not None:
+                stack.append(frame)
+                frame = frame.f_back
+            stack.reverse()
+
+            parts, labels = [names.get(ident, str(ident))], []
+            for frame in stack:
+                parts.append(self._frame_name(frame))
+                code = frame.f_code
+                if code.co_name == "_run_node" and "node_type" in code.co_varnames:
+                    labels.append(f"node:{frame.f_locals.get('node_type')}")
+                    parts.append(labels[-1])
+                elif code in _TOOL_RUN:
+                    tool = frame.f_locals.get("self")
+                    labels.append(f"tool:{getattr(tool, 'name', '?')}")
+                    parts.append(labels[-1])
+            # Idle threads (pools, shell readers) would only add noise
+            if ident != self._target and not labels and not busy:
+                continue
+            if busy is None:
+                busy = not stack or os.path.basename(stack[-1].f_code.co_filename) not in WAIT_FILES
+
+            self.samples += 1
+            self.stacks[";".join(parts)] += 1
+            kind = "cpu" if busy else "wait"
+            for label in labels:
+                self.sections[label][kind] += elapsed
+            if not labels:
+                self.sections["(outside nodes)"][kind] += elapsed
+
+    def collapsed(self) -> str:
+        """Stacks in the folded format read by flamegraph.pl, speedscope and inferno."""
+        return "\n".join(f"{stack} {count}" for stack, count in sorted(self.stacks.items())) + "\n"
+
+
+class SessionProfiler:
+    """Profiles one run of the graph with cProfile plus a labelled stack sampler.
+
+    ``save`` writes ``<session>-<time>.pstats``, ``.collapsed`` and
+    ``.txt`` (the summary) to ``out_dir``. cProfile only sees the thread
+    that started the profiler; the sampler covers every busy thread.
+    """
+
+    def __init__(self, session_id: str, out_dir: str = "profiles", interval: float = 0.005):
+        self.session_id = session_id
+        self.out_dir = out_dir
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler(interval)
+        self.wall = 0.0
+        self._started = 0.0
+
+    def __enter__(self) -> "SessionProfiler":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        self._started = time.perf_counter()
+        self.sampler.start()
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        self.sampler.stop()
+        self.wall = time.perf_counter() - self._started
+
+    def stats(self) -> pstats.Stats:
+        return pstats.Stats(self.profile, stream=io.StringIO())
+
+    def hotspots(self, top: int = 15) -> List[Dict[str, Any]]:
+        """Functions with the most self time."""
+        rows = []
+        for (filename, line, name), (_, ncalls, tottime, cumtime, _) in self.stats().stats.items():
+            rows.append({
+                "function": f"{name} ({location(filename, line)})",
+                "calls": ncalls,
+                "self": tottime,
+                "cumulative": cumtime,
+                "category": category_of(filename, name),
+            })
+        rows.sort(key=lambda row: row["self"], reverse=True)
+        return rows[:top]
+
+    def categories(self) -> Dict[str, float]:
+        """Self time per category, largest first."""
+        totals: Dict[str, float] = defaultdict(float)
+        for (filename, _, name), (_, _, tottime, _, _) in self.stats().stats.items():
+            totals[category_of(filename, name)] += tottime
+        return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+    def summary(self, top: int = 15) -> str:
+        lines = [f"Session {self.session_id}: {self.wall:.2f}s wall, {self.sampler.samples} samples", ""]
+        lines.append("Time per node and tool (sampled):")
+        for label, times in sorted(self.sampler.sections.items(), key=lambda item: -sum(item[1].values())):
+            lines.append(f"  {label:<32} cpu {times['cpu']:8.3f}s   wait {times['wait']:8.3f}s")
+        lines += ["", "Self time per category:"]
+        for name, seconds in self.categories().items():
+            lines.append(f"  {name:<24} {seconds:8.3f}s")
+        lines += ["", f"Top {top} functions by self time:"]
+        for row in self.hotspots(top):
+            lines.append(f"  {row['self']:8.3f}s  {row['calls']:>8}  {row['function']}")
+        return "\n".join(lines) + "\n"
+
+    def save(self) -> Dict[str, str]:
+        """Write the pstats, collapsed stacks and summary; returns their paths."""
+        os.makedirs(self.out_dir, exist_ok=True)
+        base = os.path.join(self.out_dir, f"{self.session_id}-{datetime.now():%Y%m%d-%H%M%S}")
+        paths = {"pstats": base + ".pstats", "collapsed": base + ".collapsed", "summary": base + ".txt"}
+        self.profile.dump_stats(paths["pstats"])
+        with open(paths["collapsed"], "w", encoding="utf-8") as f:
+            f.write(self.sampler.collapsed())
+        with open(paths["summary"], "w", encoding="utf-8") as f:
+            f.write(self.summary())
+        return paths
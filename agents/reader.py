@@ -0,0 +1,134 @@
+import bisect
+import mmap
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Tuple
+
+from agents.patch import split_lines
+
+# The file is indexed in fixed-size chunks: for each chunk we remember how many
+# newlines precede it, so finding a line only scans within a single chunk.
+CHUNK_SIZE = 64 * 1024
+
+
+class LineIndex:
+    """Line count and per-chunk newline counts of one version of a file."""
+
+    def __init__(self, total_lines: int, newlines_before: List[int]):
+        self.total_lines = total_lines
+        self.newlines_before = newlines_before
+
+
+_index_cache: "OrderedDict[Tuple[str, int, int], LineIndex]" = OrderedDict()
+_index_lock = threading.Lock()
+_MAX_CACHED_INDEXES = 32
+
+
+def _build_index(mm, size: int) -> LineIndex:
+    newlines_before = []
+    newlines = 0
+    for start in range(0, size, CHUNK_SIZE):
+        newlines_before.append(newlines)
+        newlines += mm[start:start + CHUNK_SIZE].count(b"\n")
+    total_lines = newlines + (1 if size and mm[size - 1:size] != b"\n" else 0)
+    return LineIndex(total_lines, newlines_before)
+
+
+class MappedFile:
+    """Read-only memory map of a file with line-oriented helpers.
+
+    Only the pages that are touched get loaded, so asking for the last lines
+    of a multi-gigabyte log does not read the whole file into memory.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self._file = open(self.path, "rb")
+        stat = os.fstat(self._file.fileno())
+        self.size = stat.st_size
+        self._key = (self.path, stat.st_mtime_ns, stat.st_size)
+        self.mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+
+    def close(self):
+        if self.size:
+            self.mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def index(self) -> LineIndex:
+        with _index_lock:
+            cached = _index_cache.get(self._key)
+            if cached is not None:
+                _index_cache.move_to_end(self._key)
+                return cached
+        index = _build_index(self.mm, self.size) if self.size else LineIndex(0, [])
+        with _index_lock:
+            _index_cache[self._key] = index
+            while len(_index_cache) > _MAX_CACHED_INDEXES:
+                _index_cache.popitem(last=False)
+        return index
+
+    @property
+    def line_count(self) -> int:
+        return self.index.total_lines
+
+    def line_offset(self, line: int) -> int:
+        """Byte offset where 1-based ``line`` starts (``size`` past the end)."""
+        index = self.index
+        if line <= 1:
+            return 0
+        if line > index.total_lines:
+            return self.size
+        # Line N starts right after the (N-1)th newline; find the chunk holding it.
+        target = line - 1
+        chunk = bisect.bisect_left(index.newlines_before, target) - 1
+        position = chunk * CHUNK_SIZE
+        for _ in range(target - index.newlines_before[chunk]):
+            position = self.mm.find(b"\n", position) + 1
+        return position
+
+    def line_number_at(self, offset: int) -> int:
+        """1-based line containing byte ``offset``."""
+        # offset == size falls past the last chunk when the size is a multiple of CHUNK_SIZE
+        chunk = max(min(offset // CHUNK_SIZE, len(self.index.newlines_before) - 1), 0)
+        start = chunk * CHUNK_SIZE
+        before = self.index.newlines_before[chunk] if self.index.newlines_before else 0
+        return before + self.mm[start:offset].count(b"\n") + 1
+
+    def lines(self, start: int, end: int) -> List[str]:
+        """Decoded lines ``start``..``end`` (1-based, inclusive)."""
+        if start > end or start > self.line_count:
+            return []
+        begin = self.line_offset(start)
+        finish = self.line_offset(end + 1)
+        text = self.mm[begin:finish].decode("utf-8", errors="replace")
+        return split_lines(text)
+
+    def read_bytes(self, offset: int, length: int) -> bytes:
+        return self.mm[max(offset, 0):max(offset, 0) + max(length, 0)]
+
+    def search(self, pattern: str, ignore_case: bool = False, max_matches: int = 20) -> List[int]:
+        """1-based line numbers of the first ``max_matches`` lines matching ``pattern``."""
+        if not self.size:
+            return []
+        regex = re.compile(pattern.encode("utf-8"), re.MULTILINE | (re.IGNORECASE if ignore_case else 0))
+        found: List[int] = []
+        last_line_end = -1
+        for match in regex.finditer(self.mm):
+            if match.start() < last_line_end:
+                continue
+            line = self.line_number_at(match.start())
+            found.append(line)
+            if len(found) >= max_matches:
+                break
+            newline = self.mm.find(b"\n", match.start())
+            last_line_end = self.size if newline == -1 else newline + 1
+        return found
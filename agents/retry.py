@@ -0,0 +1,95 @@
+import hashlib
+import re
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+# Parts of an error report that change between otherwise identical failures.
+_VOLATILE = [
+    (re.compile(r"0x[0-9a-fA-F]+"), "0x?"),                                # object addresses
+    (re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?"), "<time>"),
+    (re.compile(r"/tmp/[^\s'\":]+"), "<tmp>"),
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b"), "<uuid>"),
+    (re.compile(r"\b[0-9a-f]{32,}\b"), "<hash>"),
+    (re.compile(r"(?:in|after|took) \d+(?:\.\d+)?\s*(?:ms|s|sec|seconds)\b"), "<duration>"),
+    (re.compile(r"\bline \d+"), "line ?"),
+    (re.compile(r"\b(?:pid|PID)[ =:]*\d+"), "pid ?"),
+]
+# Lines that describe the run rather than the failure.
+_NOISE = re.compile(r"^(?:Command:|Working Directory:|Exit Code:|Status:|---|Skipped after failure)")
+
+
+def normalize_error(output: str) -> str:
+    """Reduce an error report to the parts that identify the failure."""
+    lines = []
+    for line in (output or "").splitlines():
+        line = line.strip()
+        if not line or _NOISE.match(line):
+            continue
+        for pattern, replacement in _VOLATILE:
+            line = pattern.sub(replacement, line)
+        lines.append(re.sub(r"\s+", " ", line))
+    # Tracebacks put the useful part at the end; long logs get trimmed to it.
+    return "\n".join(lines[-40:]).lower()
+
+
+def fingerprint_error(output: str) -> str:
+    """Short stable hash of a normalized error report."""
+    return hashlib.sha1(normalize_error(output).encode("utf-8")).hexdigest()[:12]
+
+
+@dataclass
+class RetryStats:
+    """Retry counters carried in the graph state and returned with the result."""
+    task_attempts: int = 0          # failed runs of the current task
+    identical_failures: int = 0     # consecutive failures with the same fingerprint
+    last_fingerprint: Optional[str] = None
+    total_failures: int = 0
+    tasks_skipped: int = 0
+    backoff_seconds: float = 0.0    # total time spent waiting between retries
+    exhausted: bool = False
+    outcome: str = "running"        # running | completed | aborted
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "RetryStats":
+        return cls(**state.get("retry_stats", {}))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def record_success(self):
+        self.task_attempts = 0
+        self.identical_failures = 0
+        self.last_fingerprint = None
+        self.exhausted = False
+
+    def record_failure(self, output: str, max_attempts: int, max_identical: int) -> str:
+        """Count a failed run and decide whether the task may be retried.
+
+        Returns the failure's fingerprint and sets ``exhausted`` once the task
+        used up its attempts or kept failing the same way.
+        """
+        fingerprint = fingerprint_error(output)
+        self.task_attempts += 1
+        self.total_failures += 1
+        self.identical_failures = self.identical_failures + 1 if fingerprint == self.last_fingerprint else 1
+        self.last_fingerprint = fingerprint
+        self.exhausted = self.task_attempts >= max_attempts or self.identical_failures >= max_identical
+        return fingerprint
+
+    def start_next_task(self):
+        """Give up on the current task and reset the per-task counters.
+
+        ``exhausted`` stays set so the routing still sees why the task ended;
+        the next recorded run clears it.
+        """
+        self.tasks_skipped += 1
+        self.task_attempts = 0
+        self.identical_failures = 0
+        self.last_fingerprint = None
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff before retry ``attempt`` (1-based)."""
+    if base <= 0 or attempt < 1:
+        return 0.0
+    return min(cap, base * (2 ** (attempt - 1)))
@@ -0,0 +1,321 @@
+import fnmatch
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+from agents.tree import workspace_tree
+from config.settings import settings
+
+INDEX_VERSION = 1
+
+
+def trigrams(text: str) -> Set[str]:
+    """Case-folded trigrams of a string."""
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _class_end(pattern: str, start: int) -> int:
+    """Index of the ``]`` closing the character class opened at ``start`` (len(pattern) if unclosed)."""
+    i = start + 1
+    if i < len(pattern) and pattern[i] == "^":
+        i += 1
+    if i < len(pattern) and pattern[i] == "]":
+        i += 1  # a leading "]" is a literal member
+    while i < len(pattern):
+        if pattern[i] == "\\":
+            i += 2
+            continue
+        if pattern[i] == "]":
+            return i
+        i += 1
+    return len(pattern)
+
+
+def required_literals(pattern: str) -> List[str]:
+    """Literal runs that every match of ``pattern`` must contain.
+
+    This is deliberately conservative: alternations disable filtering, and
+    anything inside groups or character classes is treated as optional.
+    """
+    runs, current, i, depth = [], [], 0, 0
+
+    def flush():
+        if current:
+            runs.append("".join(current))
+            current.clear()
+
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\" and i + 1 < len(pattern):
+            nxt = pattern[i + 1]
+            if depth == 0 and not nxt.isalnum():
+                current.append(nxt)
+            else:
+                flush()
+            i += 2
+            continue
+        if c == "|":
+            return []
+        if c == "(":
+            depth += 1
+            flush()
+        elif c == ")":
+            depth = max(depth - 1, 0)
+            flush()
+        elif c == "[":
+            flush()
+            i = _class_end(pattern, i)
+        elif c in "*?{":
+            # The preceding character is optional; drop it from the run.
+            if current:
+                current.pop()
+            flush()
+            if c == "{":
+                end = pattern.find("}", i)
+                i = end if end != -1 else len(pattern)
+        elif c == "+":
+            flush()
+        elif c in ".^$":
+            flush()
+        elif depth == 0:
+            current.append(c)
+        i += 1
+    flush()
+    return [run for run in runs if len(run) >= 3]
+
+
+class CodeSearchIndex:
+    """A trigram index over the text files of a workspace.
+
+    Files are enumerated with the same ignore rules as the project tree. On
+    refresh only files whose mtime or size changed are re-read, and only those
+    whose content hash changed are re-indexed. The per-file trigram sets are
+    persisted as gzipped JSON under the workspace cache directory; posting
+    lists are rebuilt from them on load.
+    """
+
+    def __init__(self, root: str, index_path: Optional[str] = None,
+                 max_file_size: int = 1024 * 1024, refresh_interval: float = 2.0):
+        self.root = os.path.abspath(root)
+        self.index_path = index_path or os.path.join(self.root, settings.CACHE_DIR, "search_index.json.gz")
+        self.max_file_size = max_file_size
+        self.refresh_interval = refresh_interval
+        # relpath -> (mtime_ns, size, sha1, trigrams); binary and oversized files have no sha1
+        self.files: Dict[str, Tuple[int, int, str, Set[str]]] = {}
+        self.postings: Dict[str, Set[str]] = {}
+        self._dirty = False
+        self._last_refresh = 0.0
+        self._lock = threading.RLock()
+        self._load()
+
+    # ---------------- persistence ----------------
+
+    def _load(self):
+        try:
+            with gzip.open(self.index_path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != INDEX_VERSION or data.get("root") != self.root:
+            return
+        for relpath, (mtime, size, digest, grams) in data["files"].items():
+            self._add(relpath, mtime, size, digest, set(grams))
+
+    def save(self):
+        """Write the index to disk if it changed since the last save."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                "version": INDEX_VERSION,
+                "root": self.root,
+                "files": {
+                    relpath: [mtime, size, digest, sorted(grams)]
+                    for relpath, (mtime, size, digest, grams) in self.files.items()
+                },
+            }
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=1) as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_path, self.index_path)
+            self._dirty = False
+
+    # ---------------- maintenance ----------------
+
+    def _add(self, relpath: str, mtime: int, size: int, digest: str, grams: Set[str]):
+        self.files[relpath] = (mtime, size, digest, grams)
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(relpath)
+
+    def _remove(self, relpath: str):
+        entry = self.files.pop(relpath, None)
+        if entry is None:
+            return
+        for gram in entry[3]:
+            paths = self.postings.get(gram)
+            if paths is not None:
+                paths.discard(relpath)
+                if not paths:
+                    del self.postings[gram]
+
+    def _update_file(self, relpath: str, stat: Optional[os.stat_result] = None) -> bool:
+        """Re-index one file if it changed. Returns True when the index changed."""
+        path = os.path.join(self.root, relpath)
+        try:
+            stat = stat or os.stat(path)
+        except OSError:
+            if relpath in self.files:
+                self._remove(relpath)
+                return True
+            return False
+
+        known = self.files.get(relpath)
+        if known and known[0] == stat.st_mtime_ns and known[1] == stat.st_size:
+            return False
+        if stat.st_size > self.max_file_size:
+            # Remembered with an empty digest so it is not re-read until it changes.
+            self._remove(relpath)
+            self._add(relpath, stat.st_mtime_ns, stat.st_size, "", set())
+            return True
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+        except OSError:
+            return False
+        if b"\0" in raw[:8192]:
+            self._remove(relpath)
+            self._add(relpath, stat.st_mtime_ns, stat.st_size, "", set())
+            return True
+
+        digest = hashlib.sha1(raw).hexdigest()
+        if known and known[2] == digest:
+            # Touched but unchanged: keep the trigrams, remember the new mtime.
+            self.files[relpath] = (stat.st_mtime_ns, stat.st_size, digest, known[3])
+            return True
+        self._remove(relpath)
+        self._add(relpath, stat.st_mtime_ns, stat.st_size, digest, trigrams(raw.decode("utf-8", errors="replace")))
+        return True
+
+    def refresh(self, force: bool = False) -> int:
+        """Bring the index up to date with the workspace. Returns files changed."""
+        with self._lock:
+            if not force and time.monotonic() - self._last_refresh < self.refresh_interval:
+                return 0
+            changed = 0
+            seen = set()
+            for relpath, is_dir, _ in workspace_tree.walk(self.root):
+                if is_dir:
+                    continue
+                seen.add(relpath)
+                if self._update_file(relpath):
+                    changed += 1
+            for relpath in list(self.files):
+                if relpath not in seen:
+                    self._remove(relpath)
+                    changed += 1
+            self._last_refresh = time.monotonic()
+            if changed:
+                self._dirty = True
+                self.save()
+            return changed
+
+    def notify_changed(self, path: str):
+        """Re-index a file the agents just wrote, without a full refresh."""
+        path = os.path.abspath(path)
+        if not path.startswith(self.root + os.sep):
+            return
+        relpath = os.path.relpath(path, self.root).replace(os.sep, "/")
+        with self._lock:
+            if self._update_file(relpath):
+                self._dirty = True
+
+    # ---------------- queries ----------------
+
+    def candidates(self, query: str, regex: bool = False) -> Set[str]:
+        """Files that may contain ``query`` according to the trigram postings."""
+        literals = required_literals(query) if regex else ([query] if len(query) >= 3 else [])
+        if not literals:
+            return {relpath for relpath, entry in self.files.items() if entry[2]}
+        result = None
+        for literal in literals:
+            for gram in trigrams(literal):
+                paths = self.postings.get(gram, set())
+                result = set(paths) if result is None else result & paths
+                if not result:
+                    return set()
+        return result
+
+    def search(self, query: str, regex: bool = False, case_sensitive: bool = False,
+               path_glob: Optional[str] = None, max_results: int = 50) -> Tuple[List[Tuple[str, int, str]], int]:
+        """Find matching lines.
+
+        Returns up to ``max_results`` (relpath, line number, line) tuples and the
+        number of candidate files that had to be read.
+        """
+        self.refresh()
+        flags = 0 if case_sensitive else re.IGNORECASE
+        matcher = re.compile(query if regex else re.escape(query), flags)
+        with self._lock:
+            self.save()
+            paths = sorted(self.candidates(query, regex))
+        if path_glob:
+            paths = [p for p in paths if fnmatch.fnmatch(p, path_glob)]
+
+        matches = []
+        for relpath in paths:
+            try:
+                with open(os.path.join(self.root, relpath), "r", encoding="utf-8", errors="replace") as f:
+                    for number, line in enumerate(f, 1):
+                        if matcher.search(line):
+                            matches.append((relpath, number, line.rstrip("\n")))
+                            if len(matches) >= max_results:
+                                return matches, len(paths)
+            except OSError:
+                continue
+        return matches, len(paths)
+
+
+# Open indexes, least recently used first; the oldest is saved and dropped past MAX_SEARCH_INDEXES
+_indexes: "OrderedDict[str, CodeSearchIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_search_index(root: str) -> CodeSearchIndex:
+    """Return the index for a workspace root, loading it from disk on first use."""
+    root = os.path.abspath(root)
+    evicted = []
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None:
+            index = CodeSearchIndex(root)
+            _indexes[root] = index
+            while len(_indexes) > max(1, settings.MAX_SEARCH_INDEXES):
+                evicted.append(_indexes.popitem(last=False)[1])
+        else:
+            _indexes.move_to_end(root)
+    for old in evicted:
+        old.save()
+    return index
+
+
+def release_search_index(root: str):
+    """Save and drop the in-memory index of a workspace root."""
+    with _indexes_lock:
+        index = _indexes.pop(os.path.abspath(root), None)
+    if index is not None:
+        index.save()
+
+
+def notify_file_changed(path: str):
+    """Tell every open index about a file written by a tool."""
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        index.notify_changed(path)
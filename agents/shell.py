@@ -0,0 +1,307 @@
+import atexit
+import codecs
+import os
+import platform
+import queue
+import shlex
+import shutil
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from agents.memory import truncate_middle
+
+# ***************** Command results *****************
+
+@dataclass
+class CommandResult:
+    """Structured outcome of a single terminal command."""
+    command: str
+    exit_code: Optional[int]
+    stdout: str = ""
+    stderr: str = ""
+    duration: float = 0.0
+    cwd: Optional[str] = None
+    timed_out: bool = False
+
+    @property
+    def success(self) -> bool:
+        return self.exit_code == 0 and not self.timed_out
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["success"] = self.success
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CommandResult":
+        return cls(**{key: value for key, value in data.items() if key != "success"})
+
+    def format(self, max_chars: int = 0) -> str:
+        """Render the result in the text layout the agents are prompted with.
+
+        With ``max_chars`` stdout and stderr keep only their first and last
+        characters, so a noisy command does not end up whole in prompts and state.
+        """
+        output_parts = [f"Command: {self.command}"]
+        if self.cwd:
+            output_parts.append(f"Working Directory: {self.cwd}")
+
+        if self.stdout:
+            output_parts.append("--- STDOUT ---")
+            output_parts.append(truncate_middle(self.stdout.strip(), max_chars))
+
+        if self.stderr:
+            output_parts.append("--- STDERR ---")
+            output_parts.append(truncate_middle(self.stderr.strip(), max_chars))
+
+        if self.timed_out:
+            output_parts.append(f"Error: Command '{self.command}' timed out after {self.duration:.0f} seconds")
+            output_parts.append("Status: FAILED")
+            return "\n".join(output_parts)
+
+        output_parts.append("--- RETURN CODE ---")
+        output_parts.append(f"Exit Code: {self.exit_code}")
+        output_parts.append("Status: SUCCESS" if self.success else "Status: FAILED")
+        return "\n".join(output_parts)
+
+
+# ***************** Persistent shell sessions *****************
+
+class ShellSession:
+    """A long-lived shell process that keeps cwd and environment between commands.
+
+    Commands are written to the shell's stdin and framed with a per-session
+    sentinel that is echoed on both stdout and stderr once the command
+    finishes, together with its exit code and the shell's working directory.
+    Each command runs through ``eval`` so that syntax errors only fail that
+    command instead of terminating the shell.
+    """
+
+    def __init__(self, cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None,
+                 shell: Optional[str] = None):
+        self.shell = shell or shutil.which("bash") or "/bin/sh"
+        self.cwd = os.path.abspath(cwd or os.getcwd())
+        self.env = env
+        self.restarts = 0
+        self.process: Optional[subprocess.Popen] = None
+        self._sentinel = f"__HERAPHERI_{uuid.uuid4().hex}__"
+        self._lock = threading.Lock()
+        self._start()
+
+    def _start(self):
+        """Spawn the shell process and the threads draining its output."""
+        self.process = subprocess.Popen(
+            [self.shell],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=self.cwd if os.path.isdir(self.cwd) else None,
+            env=self.env,
+            start_new_session=True,
+        )
+        self._stdout = queue.Queue()
+        self._stderr = queue.Queue()
+        self._leftover: Dict[int, List[str]] = {}  # lines read past a sentinel, per queue
+        for stream, lines in ((self.process.stdout, self._stdout), (self.process.stderr, self._stderr)):
+            threading.Thread(target=self._drain, args=(stream, lines), daemon=True).start()
+
+    @staticmethod
+    def _drain(stream, lines: "queue.Queue"):
+        """Queue the stream's output as batches of lines, one batch per read of up to 64 KiB."""
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        partial = ""
+        while True:
+            chunk = stream.read1(65536)
+            if not chunk:
+                break
+            # Split on "\n" only: str.splitlines() would also break on form feeds and the like
+            parts = (partial + decoder.decode(chunk)).split("\n")
+            partial = parts.pop()
+            if parts:
+                lines.put([part + "\n" for part in parts])
+        partial += decoder.decode(b"", final=True)
+        if partial:
+            lines.put([partial])
+        lines.put(None)
+
+    def _kill(self):
+        """Terminate the shell and everything it started."""
+        if self.process is None:
+            return
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            pass
+
+    def restart(self):
+        """Replace the shell with a fresh one started in the last known cwd."""
+        self._kill()
+        self.restarts += 1
+        self._start()
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def _read_until_sentinel(self, lines: "queue.Queue", deadline: Optional[float]) -> Tuple[List[str], Optional[str], bool]:
+        """Collect lines until the sentinel appears.
+
+        Returns the collected lines, the sentinel line (``None`` if the shell
+        died first) and whether the deadline passed.
+        """
+        collected = []
+        batch = self._leftover.pop(id(lines), None)
+        while True:
+            if batch is None:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return collected, None, True
+                try:
+                    batch = lines.get(timeout=remaining)
+                except queue.Empty:
+                    return collected, None, True
+                if batch is None:
+                    return collected, None, False
+            for index, line in enumerate(batch):
+                if line.startswith(self._sentinel):
+                    collected.extend(batch[:index])
+                    if index + 1 < len(batch):
+                        self._leftover[id(lines)] = batch[index + 1:]
+                    return collected, line, False
+            collected.extend(batch)
+            batch = None
+
+    @staticmethod
+    def _join(lines: List[str]) -> str:
+        # The sentinel is printed after a newline of its own; drop it again.
+        text = "".join(lines)
+        return text[:-1] if text.endswith("\n") else text
+
+    def run(self, command: str, cwd: Optional[str] = None, timeout: Optional[float] = 30) -> CommandResult:
+        """Run a command in the persistent shell.
+
+        Args:
+            command: Shell command to run. ``cd`` and ``export`` persist.
+            cwd: Optional directory for this command only; it runs in a subshell.
+            timeout: Seconds to wait before the shell is killed and restarted.
+        """
+        with self._lock:
+            if not self.alive:
+                self.restart()
+
+            body = f"eval {shlex.quote(command)}"
+            if cwd:
+                body = f"( cd -- {shlex.quote(cwd)} && {body} )"
+            script = (
+                f"{body} </dev/null\n"
+                "__hp_rc=$?\n"
+                f"printf '\\n%s %s %s\\n' '{self._sentinel}' \"$__hp_rc\" \"$PWD\"\n"
+                f"printf '\\n%s\\n' '{self._sentinel}' >&2\n"
+            )
+
+            start = time.monotonic()
+            deadline = start + timeout if timeout else None
+            try:
+                self.process.stdin.write(script.encode("utf-8"))
+                self.process.stdin.flush()
+            except (BrokenPipeError, OSError):
+                self.restart()
+                self.process.stdin.write(script.encode("utf-8"))
+                self.process.stdin.flush()
+
+            out_lines, status_line, timed_out = self._read_until_sentinel(self._stdout, deadline)
+            err_lines, _, err_timed_out = ([], None, False)
+            if status_line is not None:
+                err_lines, _, err_timed_out = self._read_until_sentinel(self._stderr, deadline)
+            duration = time.monotonic() - start
+
+            if timed_out or err_timed_out:
+                self.restart()
+                return CommandResult(
+                    command=command,
+                    exit_code=None,
+                    stdout=self._join(out_lines),
+                    stderr=self._join(err_lines),
+                    duration=duration,
+                    cwd=cwd,
+                    timed_out=True,
+                )
+
+            if status_line is None:
+                # The shell exited (e.g. `exit` or a crash); drain stderr and start over.
+                exit_code = self.process.wait()
+                err_lines, _, _ = self._read_until_sentinel(self._stderr, time.monotonic() + 1)
+                self.restart()
+                err_lines.append("\nShell exited unexpectedly and was restarted.\n")
+                return CommandResult(
+                    command=command,
+                    exit_code=exit_code if exit_code != 0 else 1,
+                    stdout=self._join(out_lines),
+                    stderr=self._join(err_lines),
+                    duration=duration,
+                    cwd=cwd,
+                )
+
+            _, exit_code, shell_cwd = status_line.rstrip("\n").split(" ", 2)
+            self.cwd = shell_cwd
+            return CommandResult(
+                command=command,
+                exit_code=int(exit_code),
+                stdout=self._join(out_lines),
+                stderr=self._join(err_lines),
+                duration=duration,
+                cwd=cwd,
+            )
+
+    def close(self):
+        """Stop the shell process."""
+        with self._lock:
+            if self.alive:
+                try:
+                    self.process.stdin.close()
+                    self.process.wait(timeout=1)
+                except (OSError, subprocess.TimeoutExpired):
+                    pass
+            self._kill()
+            self.process = None
+
+
+_sessions: Dict[str, ShellSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def persistent_shell_supported() -> bool:
+    """Persistent shells rely on POSIX process groups and are not available on Windows."""
+    return platform.system() != "Windows"
+
+
+def get_shell_session(session_id: str, cwd: Optional[str] = None) -> ShellSession:
+    """Return the shell bound to a session, starting it on first use."""
+    with _sessions_lock:
+        session = _sessions.get(session_id)
+        if session is None:
+            session = ShellSession(cwd=cwd)
+            _sessions[session_id] = session
+        return session
+
+
+def close_shell_session(session_id: str):
+    """Stop and forget the shell bound to a session."""
+    with _sessions_lock:
+        session = _sessions.pop(session_id, None)
+    if session is not None:
+        session.close()
+
+
+@atexit.register
+def close_all_shell_sessions():
+    for session_id in list(_sessions):
+        close_shell_session(session_id)
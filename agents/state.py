@@ -1,16 +1,63 @@
-from typing import Sequence, Annotated
+from typing import Any, Dict, List, Sequence, Annotated, TypedDict
 from langchain_core.messages import BaseMessage
-from langgraph.graph.message import add_messages
+from config.settings import settings
+
+
+def append_messages(left: List[BaseMessage], right: List[BaseMessage]) -> List[BaseMessage]:
+    """Reducer for the message log: nodes only append; the oldest entries beyond MAX_STATE_MESSAGES drop off."""
+    return ((left or []) + (right or []))[-max(1, settings.MAX_STATE_MESSAGES):]
+
+
+def append_tool_results(left: List[Dict[str, Any]], right: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Reducer for the tool result log, keeping the last MAX_STATE_TOOL_RESULTS."""
+    return ((left or []) + (right or []))[-max(1, settings.MAX_STATE_TOOL_RESULTS):]
+
+
+class GraphState(TypedDict, total=False):
+    """State of one HeraPheriGraph thread, as checkpointed after every node.
+    
+    Nodes return only the keys they change. ``messages`` and
+    ``tool_results`` are append-only logs; every other key is replaced.
+    """
+    messages: Annotated[List[BaseMessage], append_messages]
+    tool_results: Annotated[List[Dict[str, Any]], append_tool_results]
+    task: str                    # the user's request
+    session_id: str
+    plan: str                    # Shyam's plan for the request
+    plan_id: str                 # the plan's id in the plan library
+    plan_reuse: Dict[str, Any]   # the earlier plan it was adapted from, if any (id, task, similarity)
+    current_task: str            # the task the task planner handed out last
+    agent_input: str             # input for the next node
+    response: str                # output of the last node
+    node_type: str
+    success: bool
+    tasks_completed: bool
+    retry_stats: Dict[str, Any]
+
 
 class HeraPheriState:
+    """The part of the graph state a node works on."""
     def __init__(self):
-        self.messages: Annotated[Sequence[BaseMessage], add_messages] = []
+        self.messages: Sequence[BaseMessage] = []
         self.task: str = ""
         self.agent_input: str = ""
         self.agent_output: str = ""
         self.node_type: str = ""
         self.llm_provider: str = "groq"
         self.session_id: str = ""
+        self.context: str = ""  # steps recalled from earlier sessions
+        self.template_task: str = ""  # an earlier, similar task whose plan the planner adapts
+        self.template_plan: str = ""
+    
+    @classmethod
+    def from_graph_state(cls, state: GraphState, llm_provider: str, session_id: str) -> "HeraPheriState":
+        node_state = cls()
+        node_state.messages = state.get('messages', [])
+        node_state.task = state.get('task', '')
+        node_state.agent_input = state.get('agent_input', '')
+        node_state.llm_provider = llm_provider
+        node_state.session_id = session_id
+        return node_state
         
         
 class Prompts:
@@ -24,7 +71,7 @@ class Prompts:
 
     # 📁 Project Structure
     ```
-    <auto-generate a tree view of the repo under /project-root>
+    <tree view of the repo under /project-root, taken from the project_tree tool>
     ```
 
     ---
@@ -74,6 +121,23 @@ class Prompts:
     Available tools:
     - web_search: Search the internet for current information only if required.
     - save_markdown: Save the generated Markdown document to a file.
+    - project_tree: Get the current directory tree of the project (respects .gitignore).
+    """
+    
+    planadaptnode = """You are a highly organized planning assistant. You are given a new task together with a similar task from an earlier session and the Markdown plan that was written for it. Adapt that plan to the new task instead of planning from scratch.
+
+    Instructions:
+    1. Keep the structure and every section of the earlier plan.
+    2. Change the project name, goal, tasks, sub-tasks and acceptance criteria wherever the new task differs — names, entities, endpoints, files, inputs and outputs.
+    3. Refresh the Project Structure section with the project_tree tool; the earlier tree may be out of date.
+    4. Drop steps that do not apply to the new task and add the ones it needs.
+    5. Save the adapted plan with save_markdown.
+
+    **IMPORTANT:** Respond **only** with the adapted Markdown document—do not include any additional commentary, greetings, or explanations.
+
+    Available tools:
+    - save_markdown: Save the adapted Markdown document to a file.
+    - project_tree: Get the current directory tree of the project (respects .gitignore).
     """
     
     taskplannernode = """You are a meticulous and highly organized planning assistant. Your role is to manage and execute a detailed task plan step by step, ensuring smooth coordination with "Raju Coder".
@@ -101,14 +165,27 @@ class Prompts:
     Your job is to:
     1. Understand the task given in the current state. This may be a new feature or a bug fix.
     2. Generate clean, working code for the task.
-    3. Use tools like `create_file` to create new files or `update_file` to modify existing files.
+    3. Use `create_file` only for new files. To change an existing file, edit just the part that changes with `replace_in_file`, `replace_lines` or `apply_patch` — never rewrite a whole file to change a few lines.
     4. If you're fixing an error, read the error message and apply necessary changes to correct it.
     5. Only output the updated or newly created code — do not explain or comment unless asked.
     6. Always include the correct file path for the task you're working on.
+    7. End your answer with the commands that run or test your change in a ```bash block, one command per line, e.g.
+       ```bash
+       python app.py
+       ```
+       Babu Bhaiya runs these exactly as written and stops at the first one that fails.
 
     You have access to the following tools:
     - `create_file(filepath, content)` — Creates a file with the given content.
-    - `update_file(filepath, content)` — Updates an existing file by replacing or appending content.
+    - `update_file(filepath, content)` — Appends content to the end of an existing file.
+    - `write_files(files)` — Writes several new or rewritten files in one call; use it instead of many `create_file` calls.
+    - `replace_in_file(filepath, search, replace)` — Replaces an exact, unique snippet of a file.
+    - `replace_lines(filepath, start_line, end_line, content, expected)` — Replaces a line range.
+    - `apply_patch(diff, filepath)` — Applies a unified diff; fails without writing if the context does not match.
+    - `code_search(query, regex, case_sensitive, path_glob)` — Finds lines in the workspace that contain the query. Use it to locate existing definitions before changing them.
+    - `read_file(filepath, start_line, end_line, pattern, context)` — Reads only the lines you need from a file, e.g. around a `code_search` hit.
+    - `file_outline(target)` — Lists the classes and functions of a file or module with signatures; read this before opening a module.
+    - `symbol_source(name, path)` — Returns the code of one class, function or method, e.g. `symbol_source("HeraPheriGraph._build_graph")`.
 
     Make sure your code is syntactically correct and task-focused. If you're reusing existing functions, keep the code modular and DRY.
 
@@ -129,6 +206,9 @@ class Prompts:
 
     Available Tool:
     - `websearch`: Use it to search the internet for error causes, solutions, or clarifications.
+    - `code_search`: Search the workspace files for the functions, messages or symbols mentioned in the error.
+    - `read_file`: Read the lines around the location named in a traceback instead of the whole file.
+    - `symbol_source`: Fetch the code of the function or class named in a traceback.
 
     """
     
@@ -136,7 +216,7 @@ class Prompts:
     You are Babu Bhaiya, a reliable and no-nonsense assistant responsible for executing code written by Raju Coder. Your task is to run code in a terminal environment and report the result clearly.
 
     Responsibilities:
-    1. Receive shell or terminal commands and execute them faithfully.
+    1. Receive shell or terminal commands and execute them faithfully. You are only consulted when Raju did not put the commands in a ```bash block, so work out from Raju's answer which commands to run.
     2. Use the available tool to simulate actual code execution.
     3. Capture all output — both standard output and any error messages.
     4. Based on the result, respond with one of:
@@ -149,6 +229,8 @@ class Prompts:
     - terminal_command 
     Description: Executes a given terminal command and returns the output.  
     Usage: Use this tool to run shell commands, Python scripts, or file operations exactly as Raju wrote them.
+    The shell stays open for the whole session, so `cd`, exported variables and activated virtualenvs persist between commands — do not repeat setup steps that already ran.
+    - parallel_terminal_commands: Runs several independent commands at once (e.g. separate linters or test suites) and returns each exit code, duration and output. Do not use it for commands that depend on each other.
     - system_info: Provides information about the system environment, which can be useful for debugging or understanding execution context.
-    - change_directory: Changes the current working directory to the specified path. This is useful if Raju's code relies on specific file paths or directories.
+    - change_directory: Changes the current working directory of the session shell to the specified path. This is useful if Raju's code relies on specific file paths or directories.
     """
\ No newline at end of file
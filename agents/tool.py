@@ -1,37 +1,377 @@
 from langchain_community.tools import TavilySearchResults
-from typing import Optional
+from typing import Callable, Dict, List, Optional
 import platform
 import os
-import subprocess
-import shutil
 import json
-import sys
+import re
+import shlex
+from config.settings import settings
+from agents.shell import CommandResult, get_shell_session, persistent_shell_supported
+from agents.executor import get_command_executor, get_workspace
+from agents.environment import environment_probe
+from agents.tree import workspace_tree
+from agents.search import get_search_index, notify_file_changed
+from agents.transaction import write_files_atomically
+from agents.reader import MappedFile
+from agents.outline import outline_index, resolve_module
+from agents.memory import truncate_middle
+from agents.patch import PatchError, apply_hunks, parse_unified_diff, replace_line_range, replace_text
 
 # ***************** File handling tools *****************
 
-def create_file(file_path: str, content: str) -> str:
+def create_file(file_path: str, content: str, session_id: Optional[str] = None) -> str:
     """Create a file with the specified content."""
     try:
+        file_path = get_workspace(session_id).resolve(file_path)
         with open(file_path, "w", encoding="utf-8") as f:
             f.write(content)
+        notify_file_changed(file_path)
         return f"File '{file_path}' created successfully."
     except Exception as e:
         return f"Error creating file '{file_path}': {str(e)}"
     
-def update_file(file_path: str, content: str) -> str:
+def update_file(file_path: str, content: str, session_id: Optional[str] = None) -> str:
     """Update a file with the specified content."""
     try:
+        file_path = get_workspace(session_id).resolve(file_path)
         if not os.path.exists(file_path):
             return f"Error: File '{file_path}' does not exist."
         
         with open(file_path, "a", encoding="utf-8") as f:
             f.write(content)
+        notify_file_changed(file_path)
         return f"File '{file_path}' updated successfully."
     except Exception as e:
         return f"Error updating file '{file_path}': {str(e)}"
 
+def write_files(files: List[Dict[str, str]], session_id: Optional[str] = None) -> str:
+    """Create or overwrite several files in one step.
+    
+    All files are staged first and only renamed into place once every one of
+    them was written, so a failure leaves the tree unchanged. Files whose
+    content is identical to what is already on disk are skipped and keep
+    their modification time.
+    
+    Args:
+        files: List of {"filepath": ..., "content": ...} entries
+        session_id: Optional session whose workspace relative paths resolve against
+    """
+    workspace = get_workspace(session_id)
+    try:
+        entries = [(workspace.resolve(entry["filepath"]), entry.get("content") or "") for entry in files]
+        result = write_files_atomically(entries, fsync=settings.FSYNC_WRITES)
+    except Exception as e:
+        return f"Error writing files, no files were changed: {str(e)}"
+    
+    for path in result.written:
+        notify_file_changed(path)
+    lines = [f"Wrote {len(result.written)} file(s), {len(result.unchanged)} unchanged."]
+    lines += [f"  written: {path}" for path in result.written]
+    lines += [f"  unchanged: {path}" for path in result.unchanged]
+    return "\n".join(lines)
+
+def _read_text(file_path: str) -> str:
+    with open(file_path, "r", encoding="utf-8", newline="") as f:
+        return f.read()
+
+def _write_text(file_path: str, content: str):
+    with open(file_path, "w", encoding="utf-8", newline="") as f:
+        f.write(content)
+    notify_file_changed(file_path)
+
+def apply_patch(diff: str, file_path: Optional[str] = None, session_id: Optional[str] = None) -> str:
+    """Apply a unified diff to one or more files.
+    
+    Every hunk is checked against the current file contents before anything is
+    written; if any context line does not match, no file is changed.
+    
+    Args:
+        diff: Unified diff text (`---`/`+++` headers optional when `file_path` is given)
+        file_path: Target file for a single-file diff; overrides the diff headers
+        session_id: Optional session whose workspace relative paths resolve against
+    """
+    workspace = get_workspace(session_id)
+    try:
+        patches = parse_unified_diff(diff)
+        if file_path and len(patches) > 1:
+            return "Error: file_path can only be used with a single-file diff"
+        
+        pending = []
+        for patch in patches:
+            target = file_path or patch.path
+            if not target:
+                return "Error: Diff has no file headers; pass file_path"
+            target = workspace.resolve(target)
+            if patch.is_delete and not file_path:
+                if not os.path.exists(target):
+                    return f"Error: Cannot delete '{target}': file does not exist"
+                pending.append((target, None))
+                continue
+            if patch.is_new and not file_path:
+                if os.path.exists(target):
+                    return f"Error: Diff creates '{target}' but it already exists"
+                original = ""
+            elif not os.path.exists(target):
+                return f"Error: File '{target}' does not exist."
+            else:
+                original = _read_text(target)
+            pending.append((target, apply_hunks(original, patch.hunks)))
+    except PatchError as e:
+        return f"Error: Patch does not apply cleanly, no files were changed. {str(e)}"
+    except Exception as e:
+        return f"Error applying patch: {str(e)}"
+    
+    try:
+        for target, content in pending:
+            if content is None:
+                os.remove(target)
+                notify_file_changed(target)
+            else:
+                _write_text(target, content)
+    except Exception as e:
+        return f"Error writing patched files: {str(e)}"
+    return "Patch applied to: " + ", ".join(f"'{target}'" for target, _ in pending)
+
+def replace_in_file(
+    file_path: str,
+    search: str,
+    replace: str,
+    expected_count: int = 1,
+    session_id: Optional[str] = None
+) -> str:
+    """Replace an exact snippet of a file.
+    
+    Args:
+        file_path: File to edit
+        search: Exact text currently in the file, including indentation
+        replace: Text to put in its place
+        expected_count: How many times `search` must occur (default: 1)
+        session_id: Optional session whose workspace relative paths resolve against
+    """
+    try:
+        file_path = get_workspace(session_id).resolve(file_path)
+        if not os.path.exists(file_path):
+            return f"Error: File '{file_path}' does not exist."
+        _write_text(file_path, replace_text(_read_text(file_path), search, replace, expected_count))
+        return f"File '{file_path}' updated successfully."
+    except PatchError as e:
+        return f"Error: Edit not applied to '{file_path}'. {str(e)}"
+    except Exception as e:
+        return f"Error updating file '{file_path}': {str(e)}"
+
+def replace_lines(
+    file_path: str,
+    start_line: int,
+    end_line: int,
+    content: str,
+    expected: Optional[str] = None,
+    session_id: Optional[str] = None
+) -> str:
+    """Replace a range of lines in a file.
+    
+    Args:
+        file_path: File to edit
+        start_line: First line to replace (1-based)
+        end_line: Last line to replace, inclusive; use start_line - 1 to insert
+        content: Replacement text
+        expected: Optional current text of those lines; the edit fails if it differs
+        session_id: Optional session whose workspace relative paths resolve against
+    """
+    try:
+        file_path = get_workspace(session_id).resolve(file_path)
+        if not os.path.exists(file_path):
+            return f"Error: File '{file_path}' does not exist."
+        updated = replace_line_range(_read_text(file_path), start_line, end_line, content, expected)
+        _write_text(file_path, updated)
+        return f"File '{file_path}' updated successfully."
+    except PatchError as e:
+        return f"Error: Edit not applied to '{file_path}'. {str(e)}"
+    except Exception as e:
+        return f"Error updating file '{file_path}': {str(e)}"
+
+def read_file(
+    file_path: str,
+    start_line: Optional[int] = None,
+    end_line: Optional[int] = None,
+    pattern: Optional[str] = None,
+    context: int = 3,
+    byte_offset: Optional[int] = None,
+    byte_length: Optional[int] = None,
+    max_chars: int = 20000,
+    session_id: Optional[str] = None
+) -> str:
+    """Read part of a file without loading it whole.
+    
+    The file is memory-mapped; the header always reports its size and line
+    count so the caller can decide what to read next.
+    
+    Args:
+        file_path: File to read
+        start_line: First line to return (1-based, default: 1)
+        end_line: Last line to return, inclusive (default: start_line + 199)
+        pattern: Regular expression; return matching lines with `context` lines around them
+        context: Lines of context around each pattern match (default: 3)
+        byte_offset: Return raw bytes starting here instead of lines
+        byte_length: Number of bytes to return with `byte_offset` (default: 4096)
+        max_chars: Maximum characters of content to return (default: 20000)
+        session_id: Optional session whose workspace relative paths resolve against
+    """
+    try:
+        file_path = get_workspace(session_id).resolve(file_path)
+        if not os.path.isfile(file_path):
+            return f"Error: File '{file_path}' does not exist."
+        
+        with MappedFile(file_path) as mapped:
+            header = f"File: {file_path} | {mapped.size} bytes | {mapped.line_count} lines"
+            
+            if byte_offset is not None:
+                data = mapped.read_bytes(byte_offset, min(byte_length or 4096, max_chars))
+                return f"{header}\n--- bytes {byte_offset}-{byte_offset + len(data)} ---\n" + data.decode("utf-8", errors="replace")
+            
+            if pattern:
+                matches = mapped.search(pattern, max_matches=50)
+                if not matches:
+                    return f"{header}\nNo lines match '{pattern}'."
+                # Merge overlapping context windows into blocks
+                blocks = []
+                for line in matches:
+                    first, last = max(line - context, 1), min(line + context, mapped.line_count)
+                    if blocks and first <= blocks[-1][1] + 1:
+                        blocks[-1][1] = max(blocks[-1][1], last)
+                    else:
+                        blocks.append([first, last])
+                ranges = blocks
+                header += f" | {len(matches)} matching lines" + (" (first 50)" if len(matches) == 50 else "")
+            else:
+                first = max(start_line or 1, 1)
+                last = min(end_line or first + 199, mapped.line_count)
+                if first > last:
+                    return f"{header}\nNo lines in range {first}-{end_line or first + 199}."
+                ranges = [[first, last]]
+            
+            output, used = [header], 0
+            for first, last in ranges:
+                output.append(f"--- lines {first}-{last} ---")
+                for number, text in enumerate(mapped.lines(first, last), first):
+                    line = f"{number:>6} | {text}"
+                    used += len(line) + 1
+                    if used > max_chars:
+                        output.append(f"... output truncated at {max_chars} characters; request a narrower range")
+                        return "\n".join(output)
+                    output.append(line)
+            return "\n".join(output)
+    except re.error as e:
+        return f"Error: Invalid regular expression '{pattern}': {str(e)}"
+    except Exception as e:
+        return f"Error reading file '{file_path}': {str(e)}"
+
+def file_outline(target: str, session_id: Optional[str] = None) -> str:
+    """List the classes, functions and methods of a file or module with their signatures.
+    
+    Args:
+        target: File path or dotted module name (e.g. "agents.graph")
+        session_id: Optional session whose workspace relative paths resolve against
+    """
+    workspace = get_workspace(session_id)
+    path = resolve_module(workspace.cwd, target) or resolve_module(workspace.root, target)
+    if not path:
+        return f"Error: No file or module named '{target}'"
+    try:
+        symbols, lines = outline_index.outline(path)
+    except SyntaxError as e:
+        return f"Error: Cannot outline '{path}': syntax error at line {e.lineno}: {e.msg}"
+    except Exception as e:
+        return f"Error outlining '{path}': {str(e)}"
+    
+    output = [f"{path} | {len(lines)} lines | {len(symbols)} symbols"]
+    for symbol in symbols:
+        doc = f"  # {symbol.doc[:80]}" if symbol.doc else ""
+        output.append(f"L{symbol.start_line}-{symbol.end_line} {'    ' * symbol.depth}{symbol.signature}{doc}")
+    return "\n".join(output)
+
+def symbol_source(name: str, path: Optional[str] = None, session_id: Optional[str] = None) -> str:
+    """Return the source code of a class, function or method.
+    
+    Args:
+        name: Symbol name, optionally qualified (e.g. "HeraPheriGraph._build_graph")
+        path: Optional file, module or directory to look in (default: the whole workspace)
+        session_id: Optional session whose workspace relative paths resolve against
+    """
+    workspace = get_workspace(session_id)
+    search_path = None
+    if path:
+        search_path = workspace.resolve(path)
+        if not os.path.isdir(search_path):
+            search_path = resolve_module(workspace.cwd, path) or search_path
+        if not os.path.exists(search_path):
+            return f"Error: No file, module or directory named '{path}'"
+    try:
+        matches = outline_index.find(workspace.root, name, search_path)
+    except Exception as e:
+        return f"Error looking up symbol '{name}': {str(e)}"
+    
+    if not matches:
+        return f"No symbol named '{name}' found."
+    output = []
+    for file_path, symbol, lines in matches[:5]:
+        output.append(f"--- {file_path} L{symbol.start_line}-{symbol.end_line} ({symbol.kind}) ---")
+        output.extend(lines[symbol.start_line - 1:symbol.end_line])
+    if len(matches) > 5:
+        output.append(f"... {len(matches) - 5} more definitions; pass path to narrow the search")
+    return "\n".join(output)
+
+def code_search(
+    query: str,
+    regex: bool = False,
+    case_sensitive: bool = False,
+    path_glob: Optional[str] = None,
+    max_results: int = 50,
+    session_id: Optional[str] = None
+) -> str:
+    """Search the workspace for text or a regular expression.
+    
+    Backed by a persistent trigram index that is updated incrementally, so only
+    files that can contain the query are read.
+    
+    Args:
+        query: Text (or regex, if `regex` is True) to look for
+        regex: Treat the query as a Python regular expression (default: False)
+        case_sensitive: Match case exactly (default: False)
+        path_glob: Optional glob restricting the files searched, e.g. "agents/*.py"
+        max_results: Maximum number of matching lines to return (default: 50)
+        session_id: Optional session whose workspace should be searched
+    
+    Returns:
+        Matching lines as "path:line: text", followed by a short summary
+    """
+    try:
+        index = get_search_index(get_workspace(session_id).root)
+        matches, scanned = index.search(query, regex, case_sensitive, path_glob, max_results)
+    except re.error as e:
+        return f"Error: Invalid regular expression '{query}': {str(e)}"
+    except Exception as e:
+        return f"Error searching workspace: {str(e)}"
+    
+    if not matches:
+        return f"No matches for '{query}' ({scanned} of {len(index.files)} indexed files were candidates)."
+    
+    lines = [f"{path}:{number}: {text.strip()[:200]}" for path, number, text in matches]
+    summary = f"--- {len(matches)} matches ({scanned} of {len(index.files)} indexed files were candidates)"
+    if len(matches) >= max_results:
+        summary += "; result limit reached, refine the query or path_glob"
+    lines.append(summary)
+    return "\n".join(lines)
+
 # ***************** Web Search Tool *****************
 
+# Optional stand-in for Tavily (benchmarks, offline runs): query -> [{"url": ..., "content": ...}]
+_search_backend: Optional[Callable[[str], List[Dict[str, str]]]] = None
+
+def set_search_backend(backend: Optional[Callable[[str], List[Dict[str, str]]]]):
+    """Route web_search through `backend` instead of Tavily; pass None to restore Tavily."""
+    global _search_backend
+    _search_backend = backend
+
 def web_search(query: str) -> str:
     """
     Performs a web search to find relevant URLs and returns a formatted string of the top results.
@@ -40,8 +380,11 @@ def web_search(query: str) -> str:
     """
     print(f"--- Performing web search for: '{query}' ---")
     try:
-        tavily_tool = TavilySearchResults(max_results=5) 
-        search_results = tavily_tool.invoke({"query": query})
+        if _search_backend is not None:
+            search_results = _search_backend(query)
+        else:
+            tavily_tool = TavilySearchResults(max_results=5) 
+            search_results = tavily_tool.invoke({"query": query})
 
         if not search_results:
             return "No search results found for that query."
@@ -60,12 +403,56 @@ def web_search(query: str) -> str:
     
 # ***************** Terminal Command Tool *****************
 
+def run_terminal_command(
+    command: str,
+    working_directory: Optional[str] = None,
+    timeout: Optional[int] = 30,
+    capture_output: bool = True,
+    shell: bool = True,
+    session_id: Optional[str] = None
+) -> CommandResult:
+    """Run a command like `execute_terminal_command` but return the structured result.
+    
+    Raises:
+        NotADirectoryError: If `working_directory` does not exist
+    """
+    workspace = get_workspace(session_id)
+    if working_directory:
+        working_directory = workspace.resolve(working_directory)
+        if not os.path.isdir(working_directory):
+            raise NotADirectoryError(f"Working directory '{working_directory}' does not exist")
+    
+    if session_id and shell and persistent_shell_supported():
+        session = get_shell_session(session_id, cwd=workspace.cwd)
+        result = session.run(command, cwd=working_directory, timeout=timeout)
+        workspace.cwd = session.cwd
+        return result
+    
+    # Prepare command execution
+    if platform.system() == "Windows":
+        # Windows-specific handling
+        if not shell:
+            command = command.split()
+    
+    # Commands get an explicit cwd; the process-wide directory is never changed
+    result = get_command_executor().run(
+        command,
+        cwd=working_directory or workspace.cwd,
+        timeout=timeout,
+        capture_output=capture_output,
+        shell=shell
+    )
+    if not working_directory:
+        result.cwd = None
+    return result
+
 def execute_terminal_command(
     command: str, 
     working_directory: Optional[str] = None,
     timeout: Optional[int] = 30,
     capture_output: bool = True,
-    shell: bool = True
+    shell: bool = True,
+    session_id: Optional[str] = None
 ) -> str:
     """Execute any terminal/command line command and return the output.
     
@@ -83,129 +470,87 @@ def execute_terminal_command(
         timeout: Maximum time to wait for command completion in seconds (default: 30)
         capture_output: Whether to capture and return output (default: True)
         shell: Whether to run command through shell (default: True)
+        session_id: Optional session whose persistent shell should run the command,
+            so that `cd`, exported variables and activated virtualenvs carry over
     
     Returns:
         String containing the command output, error messages, and execution status
     """
-    
     try:
-        # Store original directory
-        original_dir = os.getcwd()
-        
-        # Change to working directory if specified
-        if working_directory:
-            if os.path.exists(working_directory):
-                os.chdir(working_directory)
-            else:
-                return f"Error: Working directory '{working_directory}' does not exist"
-        
-        # Prepare command execution
-        if platform.system() == "Windows":
-            # Windows-specific handling
-            if not shell:
-                command = command.split()
-        
-        # Execute the command
-        result = subprocess.run(
-            command,
-            shell=shell,
-            capture_output=capture_output,
-            text=True,
-            timeout=timeout,
-            cwd=working_directory
-        )
-        
-        # Prepare output
-        output_parts = []
-        
-        # Add command info
-        output_parts.append(f"Command: {command}")
-        if working_directory:
-            output_parts.append(f"Working Directory: {working_directory}")
-        
-        # Add stdout if available
-        if result.stdout:
-            output_parts.append("--- STDOUT ---")
-            output_parts.append(result.stdout.strip())
-        
-        # Add stderr if available
-        if result.stderr:
-            output_parts.append("--- STDERR ---")
-            output_parts.append(result.stderr.strip())
-        
-        # Add return code
-        output_parts.append(f"--- RETURN CODE ---")
-        output_parts.append(f"Exit Code: {result.returncode}")
-        
-        # Determine if command was successful
-        if result.returncode == 0:
-            output_parts.append("Status: SUCCESS")
-        else:
-            output_parts.append("Status: FAILED")
-        
-        return "\n".join(output_parts)
-        
-    except subprocess.TimeoutExpired:
-        return f"Error: Command '{command}' timed out after {timeout} seconds"
-    
-    except subprocess.CalledProcessError as e:
-        return f"Error: Command '{command}' failed with exit code {e.returncode}\nOutput: {e.output}\nError: {e.stderr}"
+        return run_terminal_command(command, working_directory, timeout, capture_output, shell, session_id).format(settings.MAX_TOOL_OUTPUT_CHARS)
+    except NotADirectoryError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Unexpected error executing '{command}': {str(e)}"
+
+def run_commands_parallel(
+    commands: List[str],
+    working_directory: Optional[str] = None,
+    timeout: Optional[int] = 30,
+    session_id: Optional[str] = None
+) -> str:
+    """Run independent terminal commands concurrently and return structured results.
     
-    except FileNotFoundError:
-        return f"Error: Command '{command}' not found. Make sure the command/program is installed and in PATH"
+    Each command is a separate process started from the session's current
+    directory; they do not share shell state with each other or with
+    `terminal_command`.
     
-    except PermissionError:
-        return f"Error: Permission denied when executing '{command}'"
+    Args:
+        commands: Commands that do not depend on each other's results
+        working_directory: Optional directory to run the commands in
+        timeout: Maximum time per command in seconds (default: 30)
+        session_id: Optional session whose workspace the commands run in
     
-    except Exception as e:
-        return f"Unexpected error executing '{command}': {str(e)}"
+    Returns:
+        JSON list with command, exit_code, duration, stdout, stderr and success per command
+    """
+    workspace = get_workspace(session_id)
+    cwd = workspace.resolve(working_directory)
+    if not os.path.isdir(cwd):
+        return f"Error: Working directory '{cwd}' does not exist"
     
-    finally:
-        # Always restore original directory
-        try:
-            os.chdir(original_dir)
-        except:
-            pass
+    results = get_command_executor().run_many(commands, cwd=cwd, timeout=timeout)
+    limit = settings.MAX_TOOL_OUTPUT_CHARS
+    return json.dumps([
+        {**result.to_dict(), "stdout": truncate_middle(result.stdout, limit), "stderr": truncate_middle(result.stderr, limit)}
+        for result in results
+    ], indent=2)
   
-def get_system_info() -> str:
-    """Get comprehensive system information including OS, Python version, and available tools."""
-    
-    info = {
-        "Operating System": platform.system(),
-        "OS Release": platform.release(),
-        "OS Version": platform.version(),
-        "Architecture": platform.architecture()[0],
-        "Machine": platform.machine(),
-        "Python Version": sys.version,
-        "Current Working Directory": os.getcwd(),
-        "Environment Variables": dict(os.environ),
-        "Available Commands": {}
-    }
-    
-    # Check for common development tools
-    common_tools = [
-        "git", "python", "python3", "pip", "pip3", "node", "npm", "docker", 
-        "kubectl", "java", "javac", "gcc", "make", "cmake", "curl", "wget"
-    ]
-    
-    for tool in common_tools:
-        if shutil.which(tool):
-            info["Available Commands"][tool] = shutil.which(tool)
+def get_system_info(detailed: bool = False, session_id: Optional[str] = None) -> str:
+    """Get system information including OS, Python version, and available tools.
     
+    The probe is computed once per session and reused until PATH or another
+    relevant environment variable changes.
+    
+    Args:
+        detailed: Include OS build details, tool paths and (masked) environment
+            variables instead of the compact summary (default: False)
+        session_id: Optional session whose shell environment should be described
+    """
+    info = environment_probe.summary(session_id, detailed=detailed)
     return json.dumps(info, indent=2, default=str)
 
-def change_directory(path: str) -> str:
+def change_directory(path: str, session_id: Optional[str] = None) -> str:
     """Change the current working directory.
     
     Args:
         path: The directory path to change to
+        session_id: Optional session whose workspace (and persistent shell) should
+            change directory; the process-wide working directory is never touched
     """
     try:
-        if os.path.exists(path) and os.path.isdir(path):
-            os.chdir(path)
-            return f"Successfully changed directory to: {os.getcwd()}"
+        workspace = get_workspace(session_id)
+        if session_id and persistent_shell_supported():
+            session = get_shell_session(session_id, cwd=workspace.cwd)
+            result = session.run(f"cd -- {shlex.quote(path)}")
+            if not result.success:
+                return f"Error: Directory '{path}' does not exist or is not a directory"
+            workspace.cwd = session.cwd
         else:
-            return f"Error: Directory '{path}' does not exist or is not a directory"
+            workspace.change_directory(path)
+        return f"Successfully changed directory to: {workspace.cwd}"
+    except NotADirectoryError as e:
+        return f"Error: {str(e)}"
     except Exception as e:
         return f"Error changing directory: {str(e)}"
 
@@ -226,19 +571,20 @@ def list_directory(path: Optional[str] = None, show_hidden: bool = False) -> str
             return f"Error: Path '{target_path}' is not a directory"
         
         items = []
-        for item in os.listdir(target_path):
-            if not show_hidden and item.startswith('.'):
-                continue
+        # scandir yields the type from the directory entry itself, so only files need a stat
+        with os.scandir(target_path) as entries:
+            for entry in entries:
+                if not show_hidden and entry.name.startswith('.'):
+                    continue
                 
-            item_path = os.path.join(target_path, item)
-            is_dir = os.path.isdir(item_path)
-            size = os.path.getsize(item_path) if not is_dir else 0
-            
-            items.append({
-                "name": item,
-                "type": "directory" if is_dir else "file",
-                "size": size
-            })
+                is_dir = entry.is_dir()
+                size = entry.stat().st_size if not is_dir else 0
+                
+                items.append({
+                    "name": entry.name,
+                    "type": "directory" if is_dir else "file",
+                    "size": size
+                })
         
         # Sort items: directories first, then files
         items.sort(key=lambda x: (x["type"] == "file", x["name"].lower()))
@@ -256,6 +602,38 @@ def list_directory(path: Optional[str] = None, show_hidden: bool = False) -> str
     except Exception as e:
         return f"Error listing directory: {str(e)}"
 
+def project_tree(
+    path: Optional[str] = None,
+    max_depth: int = 4,
+    max_entries: int = 200,
+    show_hidden: bool = False,
+    session_id: Optional[str] = None
+) -> str:
+    """Render a recursive tree of a project directory.
+    
+    Honors .gitignore files and skips common build, cache and VCS directories.
+    Listings are cached by directory mtime, so repeated calls are cheap.
+    
+    Args:
+        path: Directory to summarize (default: the session's current directory)
+        max_depth: How many directory levels to descend (default: 4)
+        max_entries: Maximum number of entries in the output (default: 200)
+        show_hidden: Whether to include hidden files and directories (default: False)
+        session_id: Optional session whose workspace relative paths resolve against
+    """
+    try:
+        target_path = get_workspace(session_id).resolve(path)
+        if not os.path.isdir(target_path):
+            return f"Error: Path '{target_path}' is not a directory"
+        return workspace_tree.snapshot(
+            target_path,
+            max_depth=max_depth,
+            max_entries=max_entries,
+            show_hidden=show_hidden
+        )
+    except Exception as e:
+        return f"Error building project tree: {str(e)}"
+
 
 # ***************** Task Node Tools *****************
 def load_markdown(path: str = "plan_output.md") -> str:
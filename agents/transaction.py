@@ -0,0 +1,133 @@
+import hashlib
+import os
+import platform
+import tempfile
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple
+
+# os.umask can only be read by setting it, which races with threads creating
+# files, so read it once while the module is imported.
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+
+@dataclass
+class WriteResult:
+    written: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+
+
+def _digest_file(path: str) -> Optional[str]:
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def _fsync_directory(path: str):
+    if platform.system() == "Windows":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_files_atomically(files: Sequence[Tuple[str, str]], fsync: bool = True) -> WriteResult:
+    """Write several files as one unit.
+
+    Files whose content hash already matches are skipped, keeping their mtime.
+    The rest are staged to temp files next to their targets, fsynced as a
+    batch, then renamed into place; each affected directory is fsynced once.
+    If staging fails nothing is renamed, and if a rename fails the files
+    already replaced are restored from hard-linked backups.
+
+    Args:
+        files: (absolute path, content) pairs.
+        fsync: Flush staged files and directories to disk before returning.
+    """
+    result = WriteResult()
+    staged: List[Tuple[str, str]] = []   # (target, temp path)
+    seen = set()
+    try:
+        for target, content in files:
+            if target in seen:
+                raise ValueError(f"File '{target}' appears more than once")
+            seen.add(target)
+            data = content.encode("utf-8")
+            if os.path.isfile(target) and os.path.getsize(target) == len(data) \
+                    and _digest_file(target) == hashlib.sha256(data).hexdigest():
+                result.unchanged.append(target)
+                continue
+
+            directory = os.path.dirname(target) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(target)}.", suffix=".tmp")
+            staged.append((target, temp_path))
+            # mkstemp creates 0600; keep the target's mode, or give a new file the one open() would
+            if os.path.exists(target):
+                os.chmod(temp_path, os.stat(target).st_mode & 0o7777)
+            elif hasattr(os, "fchmod"):
+                os.fchmod(fd, 0o666 & ~_UMASK)
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+
+        if fsync:
+            # Flushing after all writes lets the filesystem coalesce the journal commits.
+            for _, temp_path in staged:
+                fd = os.open(temp_path, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+    except BaseException:
+        for _, temp_path in staged:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+        raise
+
+    backups: List[Tuple[str, Optional[str]]] = []   # (target, backup path or None if new)
+    try:
+        for target, temp_path in staged:
+            backup = None
+            if os.path.exists(target):
+                backup = f"{temp_path}.bak"
+                try:
+                    os.link(target, backup)
+                except OSError:
+                    backup = ""
+            os.replace(temp_path, target)
+            backups.append((target, backup))
+            result.written.append(target)
+    except BaseException:
+        for target, backup in reversed(backups):
+            try:
+                if backup:
+                    os.replace(backup, target)
+                elif backup is None:
+                    os.unlink(target)
+            except OSError:
+                pass
+        for _, temp_path in staged:
+            for leftover in (temp_path, f"{temp_path}.bak"):
+                try:
+                    os.unlink(leftover)
+                except OSError:
+                    pass
+        raise
+
+    for _, backup in backups:
+        if backup:
+            try:
+                os.unlink(backup)
+            except OSError:
+                pass
+
+    if fsync:
+        for directory in sorted({os.path.dirname(target) or "." for target in result.written}):
+            _fsync_directory(directory)
+    return result
@@ -0,0 +1,301 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# Directories and files that are never useful in a project summary.
+DEFAULT_IGNORE_PATTERNS = [
+    ".git/", ".hg/", ".svn/", "__pycache__/", "node_modules/", ".venv/", "venv/",
+    ".mypy_cache/", ".pytest_cache/", ".ruff_cache/", ".tox/", ".nox/", ".idea/",
+    ".vscode/", ".herapheri/", "dist/", "build/", "*.egg-info/", "*.py[cod]",
+    ".DS_Store",
+]
+
+# ***************** Ignore rules *****************
+
+def _translate(pattern: str) -> str:
+    """Translate a gitignore glob into a regular expression body."""
+    i, n, out = 0, len(pattern), []
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == n:
+            out.append("/.*")
+            i += 3
+        elif c == "*":
+            out.append("[^/]*")
+            i += 1
+        elif c == "?":
+            out.append("[^/]")
+            i += 1
+        elif c == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+                i += 1
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = end + 1
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return "".join(out)
+
+
+class IgnoreRules:
+    """An ordered set of gitignore-style rules; the last matching rule wins."""
+
+    def __init__(self, rules: Optional[List[Tuple[re.Pattern, bool, bool, bool]]] = None):
+        # (regex, negated, directory_only, anchored)
+        self.rules = rules or []
+
+    @classmethod
+    def from_lines(cls, lines: List[str], base: str = "") -> "IgnoreRules":
+        """Parse gitignore lines; ``base`` is the directory they apply to, relative to the root."""
+        rules = []
+        for raw in lines:
+            line = raw.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negated = line.startswith("!")
+            if negated:
+                line = line[1:]
+            if line.startswith("\\"):
+                line = line[1:]
+            directory_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            anchored = "/" in line
+            line = line.lstrip("/")
+            body = _translate(line)
+            if anchored:
+                prefix = re.escape(base + "/") if base else ""
+                regex = re.compile(f"^{prefix}{body}$")
+            else:
+                regex = re.compile(f"^{body}$")
+            rules.append((regex, negated, directory_only, anchored))
+        return cls(rules)
+
+    @classmethod
+    def from_file(cls, path: str, base: str = "") -> "IgnoreRules":
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                return cls.from_lines(f.readlines(), base)
+        except OSError:
+            return cls()
+
+    def __add__(self, other: "IgnoreRules") -> "IgnoreRules":
+        return IgnoreRules(self.rules + other.rules)
+
+    def match(self, relpath: str, is_dir: bool) -> Optional[bool]:
+        """Return True/False if a rule decides, or None if none applies."""
+        name = relpath.rsplit("/", 1)[-1]
+        decision = None
+        for regex, negated, directory_only, anchored in self.rules:
+            if directory_only and not is_dir:
+                continue
+            if regex.match(relpath if anchored else name):
+                decision = not negated
+        return decision
+
+    def ignored(self, relpath: str, is_dir: bool) -> bool:
+        return bool(self.match(relpath, is_dir))
+
+
+DEFAULT_IGNORES = IgnoreRules.from_lines(DEFAULT_IGNORE_PATTERNS)
+
+
+# ***************** Tree snapshots *****************
+
+class WorkspaceTree:
+    """Renders bounded directory trees with mtime-keyed caches.
+
+    Each directory's ``os.scandir`` listing is cached under its mtime, which
+    changes whenever an entry is added, removed or renamed; ``.gitignore``
+    files are cached under their own mtime. Whole snapshots are cached too and
+    revalidated with one ``stat`` per directory they visited.
+    """
+
+    def __init__(self, max_cached_dirs: int = 20000, max_cached_snapshots: int = 64):
+        self.max_cached_dirs = max_cached_dirs
+        self.max_cached_snapshots = max_cached_snapshots
+        self._listings: "OrderedDict[str, Tuple[int, List[Tuple[str, bool]]]]" = OrderedDict()
+        self._gitignores: Dict[str, Tuple[int, IgnoreRules]] = {}
+        self._snapshots: "OrderedDict[tuple, Tuple[List[Tuple[str, int]], str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _mtime(path: str) -> int:
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return -1
+
+    def _listing(self, path: str, mtime: int) -> List[Tuple[str, bool]]:
+        """Return sorted (name, is_dir) entries for a directory, directories first."""
+        with self._lock:
+            cached = self._listings.get(path)
+            if cached and cached[0] == mtime:
+                self._listings.move_to_end(path)
+                return cached[1]
+
+        entries = []
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                entries.append((entry.name, is_dir))
+        entries.sort(key=lambda item: (not item[1], item[0].lower()))
+
+        with self._lock:
+            self._listings[path] = (mtime, entries)
+            self._listings.move_to_end(path)
+            while len(self._listings) > self.max_cached_dirs:
+                self._listings.popitem(last=False)
+        return entries
+
+    def _gitignore(self, path: str, mtime: int, base: str) -> IgnoreRules:
+        with self._lock:
+            cached = self._gitignores.get(path)
+            if cached and cached[0] == mtime:
+                return cached[1]
+        rules = IgnoreRules.from_file(path, base)
+        with self._lock:
+            self._gitignores[path] = (mtime, rules)
+        return rules
+
+    def _visible(self, directory: str, relbase: str, rules: IgnoreRules, show_hidden: bool,
+                 use_gitignore: bool, visited: Optional[List[Tuple[str, int]]] = None):
+        """List the entries of ``directory`` that survive the ignore rules.
+
+        Returns the rules that apply to its children and (relpath, name, is_dir) tuples.
+        """
+        mtime = self._mtime(directory)
+        if visited is not None:
+            visited.append((directory, mtime))
+        if use_gitignore:
+            gitignore = os.path.join(directory, ".gitignore")
+            gitignore_mtime = self._mtime(gitignore)
+            if visited is not None:
+                visited.append((gitignore, gitignore_mtime))
+            if gitignore_mtime != -1:
+                rules = rules + self._gitignore(gitignore, gitignore_mtime, relbase)
+        try:
+            listing = self._listing(directory, mtime)
+        except OSError:
+            return rules, []
+
+        visible = []
+        for name, is_dir in listing:
+            if not show_hidden and name.startswith("."):
+                continue
+            relpath = f"{relbase}/{name}" if relbase else name
+            if rules.ignored(relpath, is_dir):
+                continue
+            visible.append((relpath, name, is_dir))
+        return rules, visible
+
+    def _base_rules(self, extra_ignores: Optional[List[str]]) -> IgnoreRules:
+        if extra_ignores:
+            return DEFAULT_IGNORES + IgnoreRules.from_lines(extra_ignores)
+        return DEFAULT_IGNORES
+
+    def walk(
+        self,
+        root: str,
+        max_depth: Optional[int] = None,
+        show_hidden: bool = False,
+        extra_ignores: Optional[List[str]] = None,
+        use_gitignore: bool = True,
+    ):
+        """Yield (relpath, is_dir, depth) for every visible entry, depth first."""
+        root = os.path.abspath(root)
+
+        def visit(directory: str, relbase: str, depth: int, rules: IgnoreRules):
+            rules, visible = self._visible(directory, relbase, rules, show_hidden, use_gitignore)
+            for relpath, name, is_dir in visible:
+                yield relpath, is_dir, depth
+                if is_dir and (max_depth is None or depth + 1 < max_depth):
+                    yield from visit(os.path.join(directory, name), relpath, depth + 1, rules)
+
+        yield from visit(root, "", 0, self._base_rules(extra_ignores))
+
+    def snapshot(
+        self,
+        root: str,
+        max_depth: int = 4,
+        max_entries: int = 200,
+        max_children: int = 50,
+        show_hidden: bool = False,
+        show_sizes: bool = False,
+        extra_ignores: Optional[List[str]] = None,
+    ) -> str:
+        """Render a tree view of ``root`` bounded by depth and entry counts.
+
+        Args:
+            root: Directory to summarize.
+            max_depth: How many directory levels to descend.
+            max_entries: Total entries to print before truncating.
+            max_children: Entries to print per directory before collapsing the rest.
+            show_hidden: Include dotfiles and dot-directories.
+            show_sizes: Append file sizes (costs one stat per file, disables the snapshot cache).
+            extra_ignores: Additional gitignore-style patterns.
+        """
+        root = os.path.abspath(root)
+        key = (root, max_depth, max_entries, max_children, show_hidden, tuple(extra_ignores or ()))
+        if not show_sizes:
+            with self._lock:
+                cached = self._snapshots.get(key)
+            if cached and all(self._mtime(path) == mtime for path, mtime in cached[0]):
+                return cached[1]
+
+        lines = [os.path.basename(root.rstrip(os.sep)) + "/"]
+        visited: List[Tuple[str, int]] = []
+        budget = [max_entries]
+
+        def render(directory: str, relbase: str, depth: int, rules: IgnoreRules, prefix: str):
+            rules, visible = self._visible(directory, relbase, rules, show_hidden, True, visited)
+            shown = visible[:max_children]
+            hidden = len(visible) - len(shown)
+            for index, (relpath, name, is_dir) in enumerate(shown):
+                if budget[0] <= 0:
+                    return
+                budget[0] -= 1
+                is_last = index == len(shown) - 1 and not hidden
+                label = name + "/" if is_dir else name
+                if show_sizes and not is_dir:
+                    try:
+                        label += f" ({os.path.getsize(os.path.join(directory, name))} bytes)"
+                    except OSError:
+                        pass
+                lines.append(f"{prefix}{'└── ' if is_last else '├── '}{label}")
+                if is_dir and depth + 1 < max_depth:
+                    render(os.path.join(directory, name), relpath, depth + 1, rules,
+                           prefix + ("    " if is_last else "│   "))
+            if hidden and budget[0] > 0:
+                lines.append(f"{prefix}└── … ({hidden} more)")
+
+        render(root, "", 0, self._base_rules(extra_ignores), "")
+        if budget[0] <= 0:
+            lines.append(f"… (truncated at {max_entries} entries; narrow the path or lower max_depth)")
+        output = "\n".join(lines)
+
+        if not show_sizes:
+            with self._lock:
+                self._snapshots[key] = (visited, output)
+                self._snapshots.move_to_end(key)
+                while len(self._snapshots) > self.max_cached_snapshots:
+                    self._snapshots.popitem(last=False)
+        return output
+
+
+workspace_tree = WorkspaceTree()
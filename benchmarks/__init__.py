@@ -0,0 +1,26 @@
+"""Offline benchmarks for HeraPheri.
+
+Importing this package points the settings at a throwaway database and
+workspace and disables everything that would need a network or a key, so it
+must be imported before anything that loads ``config.settings``.
+"""
+import os
+import tempfile
+
+BENCH_DIR = tempfile.mkdtemp(prefix="herapheri-bench-")
+
+for key, value in {
+    "TAVILY_API_KEY": "offline",
+    "GROQ_API_KEY": "offline",
+    "DB_PATH": os.path.join(BENCH_DIR, "bench.db"),
+    "WORKSPACE_ROOT": os.path.join(BENCH_DIR, "workspace"),
+    "LLM_RATE_LIMITING": "false",
+    "LLM_FALLBACK_PROVIDERS": "",
+    "NODE_MODELS": "",
+    "RETRY_BACKOFF_BASE": "0",
+    "BABU_FAST_PATH": "true",
+    # Scenarios repeat the same task; each run should plan from scratch
+    "PLAN_REUSE": "false",
+}.items():
+    os.environ.setdefault(key, value)
+os.makedirs(os.environ["WORKSPACE_ROOT"], exist_ok=True)
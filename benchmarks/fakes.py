@@ -0,0 +1,121 @@
+"""Deterministic stand-ins for the LLM providers and web search."""
+import itertools
+import threading
+import time
+from typing import Any, Dict, List, Optional, Union
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import ConfigDict, Field
+from agents.state import Prompts
+from llms.factory import LLMFactory
+from llms.providers import BaseLLMProvider
+
+# The system prompt tells the scripted model which node is calling it.
+ROLES = {
+    "planner": Prompts.plannernode,
+    "plan_adapter": Prompts.planadaptnode,
+    "task_planner": Prompts.taskplannernode,
+    "raju": Prompts.rajucodernode,
+    "reviewer": Prompts.shyamreviewernode,
+    "babu": Prompts.babubhaiyanode,
+}
+
+# A scripted turn is either plain text or {"tool": name, "args": {...}} / a list of those.
+Turn = Union[str, Dict[str, Any], List[Dict[str, Any]]]
+
+
+def role_of(messages: List[BaseMessage]) -> str:
+    system = next((m.content for m in messages if isinstance(m, SystemMessage)), "")
+    for role, prompt in ROLES.items():
+        # Prompt templates un-escape braces, so compare a prefix rather than the whole text.
+        if prompt.strip()[:120] in system:
+            return role
+    return "unknown"
+
+
+class Script:
+    """Per-role queues of turns, shared by every node of one graph run."""
+
+    def __init__(self, turns: Dict[str, List[Turn]]):
+        self.turns = {role: list(items) for role, items in turns.items()}
+        self.calls: Dict[str, int] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def next_message(self, role: str, prompt_chars: int) -> AIMessage:
+        with self._lock:
+            self.calls[role] = self.calls.get(role, 0) + 1
+            queue = self.turns.get(role)
+            if not queue:
+                raise RuntimeError(f"Script has no turn left for '{role}' (call {self.calls[role]})")
+            turn = queue.pop(0)
+            call_id = next(self._ids)
+        usage = {"input_tokens": prompt_chars // 4, "output_tokens": 0, "total_tokens": prompt_chars // 4}
+        if isinstance(turn, str):
+            usage["output_tokens"] = len(turn) // 4
+            usage["total_tokens"] += usage["output_tokens"]
+            return AIMessage(content=turn, usage_metadata=usage)
+        calls = turn if isinstance(turn, list) else [turn]
+        return AIMessage(
+            content="",
+            tool_calls=[
+                {"name": call["tool"], "args": call.get("args", {}), "id": f"call_{call_id}_{i}"}
+                for i, call in enumerate(calls)
+            ],
+            usage_metadata=usage,
+        )
+
+    def remaining(self) -> Dict[str, int]:
+        return {role: len(items) for role, items in self.turns.items() if items}
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that replays a Script, optionally sleeping to mimic provider latency."""
+
+    script: Any = Field(exclude=True)
+    model_name: str = "scripted"
+    latency: float = 0.0
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        # Tool calls come from the script, so the schemas are not needed.
+        return self.bind(tools=[getattr(tool, "name", str(tool)) for tool in tools])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        message = self.script.next_message(role_of(messages), sum(len(str(m.content)) for m in messages))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class ScriptedProvider(BaseLLMProvider):
+    """LLMFactory provider handing out models that share the active script."""
+
+    script: Optional[Script] = None
+    latency: float = 0.0
+
+    def get_llm(self, model: str = "scripted", temperature: float = 0.7, **kwargs):
+        return ScriptedChatModel(script=ScriptedProvider.script, model_name=model, latency=ScriptedProvider.latency)
+
+
+def install(script: Script, latency: float = 0.0, name: str = "scripted"):
+    """Register the scripted provider with LLMFactory and make ``script`` the active one."""
+    ScriptedProvider.script = script
+    ScriptedProvider.latency = latency
+    LLMFactory.register_provider(name, ScriptedProvider)
+
+
+def fake_search(query: str) -> List[Dict[str, str]]:
+    """Stand-in for Tavily with stable, query-dependent results."""
+    return [
+        {"url": f"https://docs.example.com/{i}?q={query.replace(' ', '+')}",
+         "content": f"Result {i} for '{query}': " + "lorem ipsum " * 40}
+        for i in range(1, 4)
+    ]
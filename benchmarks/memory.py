@@ -0,0 +1,200 @@
+"""Memory regression benchmark: a long scripted session and repeated session switches.
+
+    python -m benchmarks.memory                     # 500 node runs, fails on steady growth
+    python -m benchmarks.memory --steps 2000 --output memory.json
+
+The session loops task planner → Raju → Babu, with every command printing far
+more than MAX_TOOL_OUTPUT_CHARS, so the caps on state and tool output are
+exercised on each step. Traced memory (tracemalloc) and RSS are sampled after
+every node; the growth rate is the least-squares slope after the warm-up,
+reported per 100 steps. The switch check builds and closes graphs the way
+the CLI does on /new-session and verifies that none of them, nor their shell
+sessions and workspaces, stay alive.
+"""
+import benchmarks  # noqa: F401  (must come before config.settings)
+from benchmarks import BENCH_DIR
+from benchmarks.fakes import Script, fake_search, install
+from benchmarks.run_graph import PROVIDER, git_rev
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+import weakref
+from typing import Any, Dict, List, Sequence
+
+import agents.executor
+import agents.shell
+from agents.graph import HeraPheriGraph
+from agents.memory import rss_bytes
+from agents.tool import set_search_backend
+from config.settings import settings
+
+PLAN = "# 📋 Tasks\n**1 Task Title:** Print a long line, many times over\n"
+
+
+def slope(values: Sequence[float]) -> float:
+    """Least-squares slope of ``values`` against their index."""
+    n = len(values)
+    if n < 2:
+        return 0.0
+    mean_x = (n - 1) / 2
+    mean_y = sum(values) / n
+    numerator = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(values))
+    return numerator / sum((x - mean_x) ** 2 for x in range(n))
+
+
+def long_session(tasks: int, output_bytes: int) -> Dict[str, List]:
+    command = f'"{sys.executable}" -c "print(\'x\' * {output_bytes})"'
+    return {
+        "planner": [PLAN],
+        "task_planner": [f"Task {i}: print a long line." for i in range(1, tasks + 1)] + ["all tasks are completed"],
+        "raju": [f"Step {i}\n\n```bash\n{command}\n```" for i in range(1, tasks + 1)],
+    }
+
+
+def run_long_session(steps: int, output_bytes: int, warmup: float) -> Dict[str, Any]:
+    # Every task is three node runs, plus the planner and the final task planner run.
+    tasks = max(1, (steps - 2) // 3)
+    script = Script(long_session(tasks, output_bytes))
+    install(script, name=PROVIDER)
+    graph = HeraPheriGraph(llm_provider=PROVIDER, session_id=f"memory-{uuid.uuid4().hex}")
+
+    traced: List[int] = []
+    rss: List[int] = []
+    run_node = graph._run_node
+
+    def sampled(node_type, node, agent_state):
+        try:
+            return run_node(node_type, node, agent_state)
+        finally:
+            traced.append(tracemalloc.get_traced_memory()[0])
+            rss.append(rss_bytes() or 0)
+
+    graph._run_node = sampled
+    # Three node runs per task; keep LangGraph's step limit out of the way.
+    settings.GRAPH_RECURSION_LIMIT = max(settings.GRAPH_RECURSION_LIMIT, 4 * steps)
+
+    started = time.perf_counter()
+    result = graph.process_input("Print a long line, many times over")
+    seconds = time.perf_counter() - started
+    graph.close()
+
+    skip = int(len(traced) * warmup)
+    return {
+        "steps": len(traced),
+        "seconds": seconds,
+        "outcome": result.get("retry_stats", {}).get("outcome"),
+        "unused_turns": script.remaining(),
+        "traced_start": traced[skip] if traced[skip:] else 0,
+        "traced_end": traced[-1] if traced else 0,
+        "traced_peak": tracemalloc.get_traced_memory()[1],
+        "rss_start": rss[skip] if rss[skip:] else 0,
+        "rss_end": rss[-1] if rss else 0,
+        "traced_growth_per_100": slope(traced[skip:]) * 100,
+        "rss_growth_per_100": slope(rss[skip:]) * 100,
+    }
+
+
+def run_session_switches(count: int) -> Dict[str, Any]:
+    """Build and close ``count`` graphs, each with a shell and workspace, like /new-session does."""
+    install(Script({}), name=PROVIDER)
+    refs, session_ids = [], []
+    gc.collect()
+    traced_before = tracemalloc.get_traced_memory()[0]
+    for _ in range(count):
+        graph = HeraPheriGraph(llm_provider=PROVIDER, session_id=f"switch-{uuid.uuid4().hex}")
+        if agents.shell.persistent_shell_supported():
+            agents.shell.get_shell_session(graph.session_id)
+        agents.executor.get_workspace(graph.session_id)
+        refs.append(weakref.ref(graph))
+        session_ids.append(graph.session_id)
+        graph.close()
+        del graph
+    gc.collect()
+    return {
+        "graphs": count,
+        "graphs_alive": sum(ref() is not None for ref in refs),
+        "shells_open": sum(session_id in agents.shell._sessions for session_id in session_ids),
+        "workspaces_kept": sum(session_id in agents.executor._workspaces for session_id in session_ids),
+        "traced_growth_per_graph": (tracemalloc.get_traced_memory()[0] - traced_before) / count,
+    }
+
+
+def check(report: Dict[str, Any], max_traced: float, max_rss: float) -> List[str]:
+    failures = []
+    session, switches = report["session"], report["switches"]
+    if session["outcome"] != "completed":
+        failures.append(f"session outcome {session['outcome']!r}, expected 'completed'")
+    if session["unused_turns"]:
+        failures.append(f"session left unused turns {session['unused_turns']}")
+    if session["traced_growth_per_100"] > max_traced * 1024:
+        failures.append(f"traced memory grows {session['traced_growth_per_100'] / 1024:.1f} KB per 100 steps "
+                        f"(limit {max_traced} KB)")
+    if session["rss_growth_per_100"] > max_rss * 1024:
+        failures.append(f"RSS grows {session['rss_growth_per_100'] / 1024:.1f} KB per 100 steps (limit {max_rss} KB)")
+    for key in ("graphs_alive", "shells_open", "workspaces_kept"):
+        if switches[key]:
+            failures.append(f"{switches[key]} of {switches['graphs']} closed sessions still have {key.split('_')[0]}")
+    return failures
+
+
+def print_report(report: Dict[str, Any]):
+    session, switches = report["session"], report["switches"]
+    mb = 2 ** 20
+    print(f"Long session: {session['steps']} steps in {session['seconds']:.1f}s, outcome {session['outcome']}")
+    print(f"  traced  {session['traced_start'] / mb:8.1f} MB → {session['traced_end'] / mb:8.1f} MB   "
+          f"growth {session['traced_growth_per_100'] / 1024:8.1f} KB/100 steps   peak {session['traced_peak'] / mb:.1f} MB")
+    print(f"  RSS     {session['rss_start'] / mb:8.1f} MB → {session['rss_end'] / mb:8.1f} MB   "
+          f"growth {session['rss_growth_per_100'] / 1024:8.1f} KB/100 steps")
+    print(f"Session switches: {switches['graphs']} graphs, {switches['graphs_alive']} alive, "
+          f"{switches['shells_open']} shells open, {switches['workspaces_kept']} workspaces kept, "
+          f"{switches['traced_growth_per_graph'] / 1024:.1f} KB traced per graph")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--steps", type=int, default=500, help="Node runs in the long session")
+    parser.add_argument("--output-bytes", type=int, default=100_000, help="Characters printed by every command")
+    parser.add_argument("--warmup", type=float, default=0.2, help="Fraction of steps ignored for the growth rate")
+    parser.add_argument("--switches", type=int, default=20, help="Graphs built and closed in the switch check")
+    parser.add_argument("--max-traced-growth", type=float, default=512, help="Allowed traced growth, KB per 100 steps")
+    parser.add_argument("--max-rss-growth", type=float, default=4096, help="Allowed RSS growth, KB per 100 steps")
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--verbose", action="store_true", help="Show the agents' output")
+    args = parser.parse_args(argv)
+
+    set_search_backend(fake_search)
+    tracemalloc.start()
+    try:
+        # Not a StringIO: the captured output would count as growth
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(sys.stdout if args.verbose else devnull):
+            session = run_long_session(args.steps, args.output_bytes, args.warmup)
+            switches = run_session_switches(args.switches)
+    finally:
+        tracemalloc.stop()
+        set_search_backend(None)
+
+    report = {"rev": git_rev(), "bench_dir": BENCH_DIR, "session": session, "switches": switches}
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failures = check(report, args.max_traced_growth, args.max_rss_growth)
+    if failures:
+        print("\nRegressions:")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    print("\nMemory stays flat.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
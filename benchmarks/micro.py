@@ -0,0 +1,243 @@
+"""Microbenchmarks for ConversationStorage and the agents/tool functions.
+
+    python -m benchmarks.micro                       # writes benchmarks/results/micro-<rev>.json
+    python -m benchmarks.micro --quick --compare benchmarks/results/micro-abc1234.json
+
+Storage is measured against tables pre-filled with 10k, 100k and 1M rows
+(sessions of 20 conversations each). Every benchmark reports the median and
+minimum time per operation; ``--compare`` fails with exit code 1 when a
+median is more than ``--tolerance`` times the baseline's.
+"""
+import benchmarks  # noqa: F401  (must come before config.settings)
+from benchmarks import BENCH_DIR
+from benchmarks.run_graph import git_rev
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from agents.tool import execute_terminal_command, list_directory, load_markdown, project_tree, save_markdown
+from agents.tree import WorkspaceTree
+from database.models import Conversation
+from database.storage import ConversationStorage
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+SESSION_SIZE = 20
+MESSAGE = "Output: " + "x" * 400
+
+
+def measure(fn: Callable[[], Any], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    """Call ``fn`` ``repeat`` times and return per-call timings in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {"median_ms": statistics.median(timings), "min_ms": min(timings), "repeat": repeat}
+
+
+# ***************** Storage *****************
+
+def seeded_storage(rows: int) -> ConversationStorage:
+    """A fresh database with ``rows`` conversations spread over sessions of SESSION_SIZE."""
+    storage = ConversationStorage(os.path.join(BENCH_DIR, f"micro-{rows}.db"))
+    storage.conn.execute("DELETE FROM conversations")
+    storage.conn.execute(f"""
+        INSERT INTO conversations
+        SELECT 'seed-' || i,
+               'session-' || (i // {SESSION_SIZE}),
+               '["Input: task", "{MESSAGE}"]',
+               TIMESTAMP '2025-01-01' + to_seconds(i),
+               TIMESTAMP '2025-01-01' + to_seconds(i),
+               'RajuCoderNode',
+               'groq'
+        FROM range(?) t(i)
+    """, [rows])
+    return storage
+
+
+def bench_storage(rows: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    storage = seeded_storage(rows)
+    sessions = rows // SESSION_SIZE
+    rng = random.Random(rows)
+    try:
+        results = {
+            f"storage.create[{rows}]": measure(
+                lambda: storage.create(Conversation(
+                    session_id=f"session-{rng.randrange(sessions)}",
+                    messages=["Input: task", MESSAGE],
+                    node_type="RajuCoderNode",
+                    llm_provider="groq",
+                )),
+                repeat * 10,
+            ),
+            f"storage.get_session_history[{rows}]": measure(
+                lambda: storage.get_session_history(f"session-{rng.randrange(sessions)}"), repeat * 10
+            ),
+            f"storage.get_all_sessions[{rows}]": measure(storage.get_all_sessions, repeat),
+        }
+    finally:
+        storage.close()
+    return results
+
+
+def bench_append_message(lengths: List[int], repeat: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    storage = ConversationStorage(os.path.join(BENCH_DIR, "micro-append.db"))
+    try:
+        for length in lengths:
+            convo = Conversation(session_id=f"long-{length}", messages=[MESSAGE] * length,
+                                 node_type="RajuCoderNode", llm_provider="groq")
+            storage.create(convo)
+            results[f"storage.append_message[{length} msgs]"] = measure(
+                lambda: storage.append_message(convo.id, MESSAGE), repeat
+            )
+    finally:
+        storage.close()
+    return results
+
+
+# ***************** Tools *****************
+
+def bench_terminal(repeat: int) -> Dict[str, Dict[str, float]]:
+    python = sys.executable
+    # About 1.6 MB of output
+    high_output = f'"{python}" -c "for _ in range(20000): print(\'y\' * 80)"'
+    results = {}
+    for label, session_id in (("subprocess", None), ("shell", "micro-bench")):
+        results[f"terminal.trivial[{label}]"] = measure(
+            lambda: execute_terminal_command("echo ok", session_id=session_id), repeat * 5
+        )
+        results[f"terminal.high_output[{label}]"] = measure(
+            lambda: execute_terminal_command(high_output, session_id=session_id), max(1, repeat // 5)
+        )
+    return results
+
+
+def make_tree(root: str, width: int, depth: int, files: int) -> int:
+    """Create ``width`` directories per level, ``depth`` levels deep, each with ``files`` files."""
+    count = 0
+    os.makedirs(root, exist_ok=True)
+    for i in range(files):
+        with open(os.path.join(root, f"file_{i}.py"), "w") as f:
+            f.write("pass\n")
+        count += 1
+    if depth:
+        for i in range(width):
+            count += 1 + make_tree(os.path.join(root, f"dir_{i}"), width, depth - 1, files)
+    return count
+
+
+def bench_directories(repeat: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for entries in (1000, 10000):
+        flat = os.path.join(BENCH_DIR, f"flat-{entries}")
+        make_tree(flat, width=entries // 10, depth=0, files=entries - entries // 10)
+        for i in range(entries // 10):
+            os.makedirs(os.path.join(flat, f"dir_{i}"), exist_ok=True)
+        results[f"list_directory[{entries} entries]"] = measure(lambda: list_directory(flat), repeat)
+    deep = os.path.join(BENCH_DIR, "deep")
+    count = make_tree(deep, width=6, depth=4, files=8)
+    # A fresh WorkspaceTree has empty caches; project_tree uses the shared, warm one.
+    results[f"project_tree[{count} entries, cold]"] = measure(lambda: WorkspaceTree().snapshot(deep), repeat)
+    results[f"project_tree[{count} entries, warm]"] = measure(lambda: project_tree(deep), repeat)
+    return results
+
+
+def bench_markdown(repeat: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for label, size in (("10KB", 10 * 1024), ("1MB", 1024 * 1024)):
+        path = os.path.join(BENCH_DIR, f"plan-{label}.md")
+        markdown = ("**1 Task Title:** Build the thing\n" * (size // 34 + 1))[:size]
+        results[f"save_markdown[{label}]"] = measure(lambda: save_markdown(markdown, path), repeat * 5)
+        results[f"load_markdown[{label}]"] = measure(lambda: load_markdown(path), repeat * 5)
+    return results
+
+
+# ***************** Reporting *****************
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            tolerance: float) -> List[str]:
+    """Benchmarks whose median grew by more than ``tolerance`` times the baseline."""
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old and old["median_ms"] > 0 and result["median_ms"] > old["median_ms"] * tolerance:
+            regressions.append(
+                f"{name}: {result['median_ms']:.3f} ms vs {old['median_ms']:.3f} ms "
+                f"(x{result['median_ms'] / old['median_ms']:.2f})"
+            )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated table sizes")
+    parser.add_argument("--quick", action="store_true", help="Only the 10k table and fewer repeats")
+    parser.add_argument("--repeat", type=int, default=20, help="Base number of timed calls per benchmark")
+    parser.add_argument("--only", action="append", choices=["storage", "append", "terminal", "directories", "markdown"],
+                        help="Run only these groups (repeatable)")
+    parser.add_argument("--output", help=f"JSON report path (default: {RESULTS_DIR}/micro-<rev>.json)")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="Allowed slowdown factor against the baseline")
+    args = parser.parse_args(argv)
+
+    sizes = [10000] if args.quick else [int(size) for size in args.sizes.split(",")]
+    repeat = max(1, args.repeat // 4) if args.quick else args.repeat
+    groups = set(args.only or ["storage", "append", "terminal", "directories", "markdown"])
+
+    results: Dict[str, Dict[str, float]] = {}
+    if "storage" in groups:
+        for rows in sizes:
+            results.update(bench_storage(rows, repeat))
+    if "append" in groups:
+        results.update(bench_append_message([100, 1000, 10000], repeat))
+    if "terminal" in groups:
+        results.update(bench_terminal(repeat))
+    if "directories" in groups:
+        results.update(bench_directories(repeat))
+    if "markdown" in groups:
+        results.update(bench_markdown(repeat))
+
+    rev = git_rev()
+    report = {
+        "rev": rev,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"micro-{rev}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    width = max(len(name) for name in results) if results else 0
+    for name, result in results.items():
+        print(f"{name:<{width}}  {result['median_ms']:10.3f} ms  (min {result['min_ms']:.3f})")
+    print(f"\nReport written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if regressions:
+            print(f"\nRegressions against {baseline.get('rev', args.compare)}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\nNo regressions against {baseline.get('rev', args.compare)}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
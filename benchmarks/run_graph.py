@@ -0,0 +1,214 @@
+"""End-to-end benchmark of HeraPheriGraph with a scripted LLM and fake search.
+
+    python -m benchmarks.run_graph --runs 5 --output graph.json --check
+
+Every run builds a fresh graph and session, replays a scenario's script and
+reports setup time, end-to-end latency, per-node framework overhead (node
+latency minus time spent in the model) and time spent in storage. Storage
+time is summed over calls; checkpoint writes run on LangGraph's background
+threads, so it can exceed the wall-clock latency. With ``--check`` the
+medians are compared against ``thresholds.json`` and the exit code is 1 on
+a regression.
+"""
+import benchmarks  # noqa: F401  (must come before config.settings)
+from benchmarks import BENCH_DIR
+from benchmarks.fakes import Script, fake_search, install
+from benchmarks.scenarios import SCENARIOS
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List
+
+from agents.graph import HeraPheriGraph
+from agents.tool import set_search_backend
+from config.settings import settings
+
+THRESHOLDS = os.path.join(os.path.dirname(__file__), "thresholds.json")
+PROVIDER = "scripted"
+
+
+class StorageTimer:
+    """Wraps storage and checkpointer methods on one graph to time them."""
+
+    METHODS = {
+        "storage": ("create", "save_metric"),
+        "checkpointer": ("put", "put_writes", "get_tuple"),
+    }
+
+    def __init__(self, graph: HeraPheriGraph):
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.seconds: Dict[str, float] = defaultdict(float)
+        for attr, methods in self.METHODS.items():
+            target = getattr(graph, attr)
+            for method in methods:
+                setattr(target, method, self._timed(f"{attr}.{method}", getattr(target, method)))
+
+    def _timed(self, key: str, fn):
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.calls[key] += 1
+                self.seconds[key] += time.perf_counter() - started
+        return wrapper
+
+    @property
+    def total(self) -> float:
+        return sum(self.seconds.values())
+
+
+def git_rev() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_once(name: str, latency: float) -> Dict[str, Any]:
+    scenario = SCENARIOS[name]
+    workspace = os.path.join(settings.WORKSPACE_ROOT, f"{name}-{uuid.uuid4().hex[:8]}")
+    os.makedirs(workspace)
+    script = Script(scenario.build(workspace))
+    install(script, latency=latency, name=PROVIDER)
+
+    started = time.perf_counter()
+    graph = HeraPheriGraph(llm_provider=PROVIDER, session_id=f"bench-{uuid.uuid4().hex}")
+    setup = time.perf_counter() - started
+    timer = StorageTimer(graph)
+
+    started = time.perf_counter()
+    result = graph.process_input(f"Build the {name} project in {workspace}")
+    e2e = time.perf_counter() - started
+
+    nodes = {}
+    for row in graph.storage.node_metrics_summary(graph.session_id):
+        total = row["avg_latency"] * row["runs"]
+        nodes[row["node_type"]] = {
+            "runs": row["runs"],
+            "llm_calls": int(row["llm_calls"]),
+            "tokens": int(row["input_tokens"] + row["output_tokens"]),
+            "overhead": (total - row["llm_seconds"]) / row["runs"],
+        }
+    outcome = result.get("retry_stats", {}).get("outcome")
+    problems = []
+    if outcome != scenario.expected_outcome:
+        problems.append(f"outcome {outcome!r}, expected {scenario.expected_outcome!r}")
+    if script.remaining():
+        problems.append(f"unused turns {script.remaining()}")
+    return {
+        "setup": setup,
+        "e2e": e2e,
+        "llm_calls": sum(script.calls.values()),
+        "nodes": nodes,
+        "storage": {key: {"calls": timer.calls[key], "seconds": timer.seconds[key]} for key in sorted(timer.calls)},
+        "storage_total": timer.total,
+        "problems": problems,
+    }
+
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def median(values):
+        return statistics.median(values) if values else 0.0
+
+    e2e = sorted(run["e2e"] for run in runs)
+    node_names = sorted({node for run in runs for node in run["nodes"]})
+    return {
+        "runs": len(runs),
+        "setup": median([run["setup"] for run in runs]),
+        "e2e": median(e2e),
+        "e2e_max": e2e[-1],
+        "llm_calls": runs[0]["llm_calls"],
+        "storage_total": median([run["storage_total"] for run in runs]),
+        "storage": {
+            key: median([run["storage"].get(key, {}).get("seconds", 0.0) for run in runs])
+            for key in sorted({key for run in runs for key in run["storage"]})
+        },
+        "node_overhead": {
+            node: median([run["nodes"][node]["overhead"] for run in runs if node in run["nodes"]])
+            for node in node_names
+        },
+        "problems": sorted({problem for run in runs for problem in run["problems"]}),
+    }
+
+
+def check(report: Dict[str, Any], thresholds: Dict[str, Any]) -> List[str]:
+    """Human-readable list of every metric above its threshold."""
+    failures = []
+    for name, summary in report["scenarios"].items():
+        limits = {**thresholds.get("default", {}), **thresholds.get(name, {})}
+        failures += [f"{name}: {problem}" for problem in summary["problems"]]
+        for metric in ("setup", "e2e", "storage_total"):
+            if metric in limits and summary[metric] > limits[metric]:
+                failures.append(f"{name}: {metric} {summary[metric]:.3f}s > {limits[metric]}s")
+        limit = limits.get("node_overhead")
+        for node, overhead in summary["node_overhead"].items():
+            if limit is not None and overhead > limit:
+                failures.append(f"{name}: {node} overhead {overhead:.3f}s > {limit}s")
+    return failures
+
+
+def print_report(report: Dict[str, Any]):
+    for name, summary in report["scenarios"].items():
+        print(f"\n{name}  ({summary['runs']} runs, {summary['llm_calls']} LLM calls)")
+        print(f"  setup {summary['setup'] * 1000:8.1f} ms   e2e {summary['e2e'] * 1000:8.1f} ms   "
+              f"storage {summary['storage_total'] * 1000:8.1f} ms")
+        for node, overhead in summary["node_overhead"].items():
+            print(f"  {node:<20} overhead {overhead * 1000:8.1f} ms/run")
+        for key, seconds in summary["storage"].items():
+            print(f"  {key:<24} {seconds * 1000:8.1f} ms")
+        for problem in summary["problems"]:
+            print(f"  ! {problem}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Scenario to run (repeatable, default: all)")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per scenario")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated seconds per LLM call")
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--check", action="store_true", help="Fail if a metric exceeds thresholds.json")
+    parser.add_argument("--thresholds", default=THRESHOLDS)
+    parser.add_argument("--verbose", action="store_true", help="Show the agents' output")
+    args = parser.parse_args(argv)
+
+    set_search_backend(fake_search)
+    report = {"rev": git_rev(), "bench_dir": BENCH_DIR, "latency": args.latency, "scenarios": {}}
+    try:
+        for name in args.scenario or sorted(SCENARIOS):
+            with contextlib.redirect_stdout(sys.stdout if args.verbose else io.StringIO()):
+                runs = [run_once(name, args.latency) for _ in range(args.runs)]
+            report["scenarios"][name] = summarize(runs)
+    finally:
+        set_search_backend(None)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.check:
+        with open(args.thresholds) as f:
+            failures = check(report, json.load(f))
+        if failures:
+            print("\nRegressions:")
+            for failure in failures:
+                print(f"  {failure}")
+            return 1
+        print("\nAll metrics within thresholds.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Scripted sessions that drive HeraPheriGraph through realistic plans.
+
+Each scenario builds its script for a fresh workspace directory. Task planner
+turns avoid the word "end": the graph treats any output containing it as the
+completion signal.
+"""
+import os
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+PLAN = """# 🚀 Project Overview
+**Project:** greeter
+**Goal:** A small greeting CLI with a test.
+
+# 📋 Tasks
+**1 Task Title:** Create greet.py that prints a greeting
+**2 Task Title:** Add test_greet.py and run it
+"""
+
+
+@dataclass
+class Scenario:
+    name: str
+    description: str
+    build: Callable[[str], Dict[str, List]]
+    expected_outcome: str = "completed"
+
+
+def _planner(workspace: str) -> List:
+    return [
+        {"tool": "web_search", "args": {"content": "python argparse greeting cli"}},
+        {"tool": "project_tree", "args": {"path": workspace}},
+        {"tool": "save_markdown", "args": {"query": PLAN, "filepath": os.path.join(workspace, "task.md")}},
+        PLAN,
+    ]
+
+
+def happy_path(workspace: str) -> Dict[str, List]:
+    greet = os.path.join(workspace, "greet.py")
+    test = os.path.join(workspace, "test_greet.py")
+    return {
+        "planner": _planner(workspace),
+        "task_planner": [
+            "Task 1: create greet.py with a greet(name) function and a __main__ block printing greet('world').",
+            "Task 2: add test_greet.py asserting greet('a') == 'Hello, a!' and run it.",
+            "all tasks are completed",
+        ],
+        "raju": [
+            {"tool": "create_file", "args": {
+                "filepath": greet,
+                "content": "def greet(name):\n    return f'Hello, {name}!'\n\n\nif __name__ == '__main__':\n    print(greet('world'))\n",
+            }},
+            f"Created greet.py\n\n```bash\npython {greet}\n```",
+            {"tool": "file_outline", "args": {"target": greet}},
+            {"tool": "create_file", "args": {
+                "filepath": test,
+                "content": f"import sys\nsys.path.insert(0, {workspace!r})\nfrom greet import greet\nassert greet('a') == 'Hello, a!'\nprint('ok')\n",
+            }},
+            f"Added the test\n\n```bash\npython {test}\n```",
+        ],
+    }
+
+
+def failure_loop(workspace: str) -> Dict[str, List]:
+    """The first attempt crashes; the reviewer diagnoses it and Raju patches it."""
+    app = os.path.join(workspace, "app.py")
+    return {
+        "planner": _planner(workspace),
+        "task_planner": [
+            "Task 1: create app.py that prints the sum of 2 and 3.",
+            "all tasks are completed",
+        ],
+        "raju": [
+            {"tool": "create_file", "args": {"filepath": app, "content": "print(totl(2, 3))\n"}},
+            f"Created app.py\n\n```bash\npython {app}\n```",
+            {"tool": "replace_in_file", "args": {"filepath": app, "search": "totl(2, 3)", "replace": "sum([2, 3])"}},
+            f"Fixed the typo\n\n```bash\npython {app}\n```",
+        ],
+        "reviewer": [
+            {"tool": "code_search", "args": {"query": "totl"}},
+            {"tool": "read_file", "args": {"filepath": app}},
+            "NameError: `totl` is not defined. Replace the call with `sum([2, 3])`.",
+        ],
+    }
+
+
+def retry_exhausted(workspace: str) -> Dict[str, List]:
+    """Raju keeps producing the same failure until the retry budget stops the loop."""
+    broken = os.path.join(workspace, "broken.py")
+    attempt = f"Trying again\n\n```bash\npython {broken}\n```"
+    return {
+        "planner": _planner(workspace),
+        "task_planner": ["Task 1: make broken.py run."],
+        "raju": [
+            {"tool": "create_file", "args": {"filepath": broken, "content": "import does_not_exist\n"}},
+            attempt,
+            attempt,
+            attempt,
+        ],
+        "reviewer": [
+            "The module does_not_exist is missing; install it or remove the import.",
+            "The module does_not_exist is still missing.",
+        ],
+    }
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in [
+        Scenario("happy_path", "Two tasks, both succeed first time", happy_path),
+        Scenario("failure_loop", "One failure, review, patch, success", failure_loop),
+        Scenario("retry_exhausted", "Identical failures until the retry budget aborts", retry_exhausted, "aborted"),
+    ]
+}
@@ -24,6 +24,83 @@ class Settings:
         self.DB_PATH = os.getenv("DB_PATH", "conversation.db")
         self.DEFAULT_LLM_PROVIDER = os.getenv("DEFAULT_LLM_PROVIDER", "groq")
         self.DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "qwen-qwq-32b")
+        # Per-node models: "task_planner=groq/llama-3.1-8b-instant,raju_coder=openai/gpt-4o"
+        # Nodes: shyam_planner, task_planner, raju_coder, shyam_reviewer, babu_bhaiya
+        self.NODE_MODELS = os.getenv("NODE_MODELS", "")
+
+        # Client-side rate limiting, shared by every node in the process.
+        # LLM_RATE_LIMITS: "provider[/model]=requests_per_minute:tokens_per_minute,..."
+        self.LLM_RATE_LIMITING = os.getenv("LLM_RATE_LIMITING", "true").lower() in ("1", "true", "yes")
+        self.LLM_RATE_LIMITS = os.getenv("LLM_RATE_LIMITS", "groq=30:6000")
+        self.LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+        self.LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+        self.LLM_BACKOFF_CAP = float(os.getenv("LLM_BACKOFF_CAP", "60"))
+
+        # Optional fallback/hedging over several providers, e.g. "openai/gpt-4o-mini,anthropic"
+        self.LLM_FALLBACK_PROVIDERS = os.getenv("LLM_FALLBACK_PROVIDERS", "")
+        self.LLM_HEDGING = os.getenv("LLM_HEDGING", "true").lower() in ("1", "true", "yes")
+        self.HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+        self.HEDGE_DEFAULT_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", "15"))
+
+        # Command execution
+        self.WORKSPACE_ROOT = os.getenv("WORKSPACE_ROOT", os.getcwd())
+        self.ISOLATE_SESSION_WORKSPACES = os.getenv("ISOLATE_SESSION_WORKSPACES", "false").lower() in ("1", "true", "yes")
+        self.MAX_PARALLEL_COMMANDS = int(os.getenv("MAX_PARALLEL_COMMANDS", "4"))
+        # Run commands Raju spelled out in ```bash blocks without an LLM round trip
+        self.BABU_FAST_PATH = os.getenv("BABU_FAST_PATH", "true").lower() in ("1", "true", "yes")
+        self.BABU_COMMAND_TIMEOUT = int(os.getenv("BABU_COMMAND_TIMEOUT", "120"))
+
+        # Raju -> Babu Bhaiya -> Shyam Review retry loop
+        self.MAX_TASK_RETRIES = int(os.getenv("MAX_TASK_RETRIES", "5"))
+        self.MAX_IDENTICAL_FAILURES = int(os.getenv("MAX_IDENTICAL_FAILURES", "3"))
+        self.RETRY_BACKOFF_BASE = float(os.getenv("RETRY_BACKOFF_BASE", "1.0"))
+        self.RETRY_BACKOFF_MAX = float(os.getenv("RETRY_BACKOFF_MAX", "30"))
+        self.ON_RETRY_EXHAUSTED = os.getenv("ON_RETRY_EXHAUSTED", "abort").lower()  # abort | skip
+        self.GRAPH_RECURSION_LIMIT = int(os.getenv("GRAPH_RECURSION_LIMIT", "100"))
+        # Graph checkpoints kept per session for --resume
+        self.CHECKPOINT_HISTORY = int(os.getenv("CHECKPOINT_HISTORY", "20"))
+        # "sync" waits for each checkpoint before the next node, so a slow disk cannot build a backlog
+        # of unsaved states in memory; "async" overlaps the writes with the next node
+        self.CHECKPOINT_DURABILITY = os.getenv("CHECKPOINT_DURABILITY", "sync").lower()
+
+        # Recall: nodes (see NODE_MODELS for the names) that get the top BM25 matches from earlier
+        # sessions in their prompt, how many, and their token budget
+        self.RECALL_NODES = os.getenv("RECALL_NODES", "shyam_planner,shyam_reviewer")
+        self.RECALL_TOP_K = int(os.getenv("RECALL_TOP_K", "3"))
+        self.RECALL_MAX_TOKENS = int(os.getenv("RECALL_MAX_TOKENS", "600"))
+
+        # Plan reuse: a task whose MinHash similarity to an earlier task reaches the threshold gets
+        # that task's plan adapted instead of planned from scratch (see /plans)
+        self.PLAN_REUSE = os.getenv("PLAN_REUSE", "true").lower() in ("1", "true", "yes")
+        self.PLAN_REUSE_THRESHOLD = float(os.getenv("PLAN_REUSE_THRESHOLD", "0.5"))
+
+        # Session recordings written by `herapheri --record`
+        self.CASSETTE_DIR = os.getenv("CASSETTE_DIR", "cassettes")
+        # Profiles written by `herapheri --profile`, and the stack sampling interval in seconds
+        self.PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+        self.PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+
+        # Memory: tracemalloc snapshots per node (--trace-memory), caps on what long runs keep around
+        self.TRACE_MEMORY = os.getenv("TRACE_MEMORY", "false").lower() in ("1", "true", "yes")
+        self.MAX_STATE_CHARS = int(os.getenv("MAX_STATE_CHARS", "20000"))  # per text field in graph state
+        self.MAX_TOOL_OUTPUT_CHARS = int(os.getenv("MAX_TOOL_OUTPUT_CHARS", "20000"))  # per stream of a command
+        self.MAX_STATE_MESSAGES = int(os.getenv("MAX_STATE_MESSAGES", "50"))  # message log kept in graph state
+        self.MAX_STATE_TOOL_RESULTS = int(os.getenv("MAX_STATE_TOOL_RESULTS", "20"))  # tool results kept in graph state
+        self.STATE_LOG_CHARS = int(os.getenv("STATE_LOG_CHARS", "2000"))  # per message / tool result in those logs
+        self.MAX_SEARCH_INDEXES = int(os.getenv("MAX_SEARCH_INDEXES", "4"))  # open workspace search indexes
+        self.DB_MEMORY_LIMIT = os.getenv("DB_MEMORY_LIMIT", "")  # DuckDB memory_limit, e.g. "1GB"
+
+        # Retention: sessions older than RETENTION_MAX_AGE_DAYS, or beyond the newest RETENTION_KEEP_SESSIONS,
+        # are archived to Parquet in ARCHIVE_DIR and deleted (0 = no limit). The CLI applies it on start-up,
+        # at most every RETENTION_INTERVAL_HOURS; `herapheri retention` runs it on demand.
+        self.RETENTION_MAX_AGE_DAYS = int(os.getenv("RETENTION_MAX_AGE_DAYS", "0"))
+        self.RETENTION_KEEP_SESSIONS = int(os.getenv("RETENTION_KEEP_SESSIONS", "0"))
+        self.RETENTION_INTERVAL_HOURS = float(os.getenv("RETENTION_INTERVAL_HOURS", "24"))
+        self.ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+
+        # Per-workspace caches (search index, outlines), relative to the workspace root
+        self.CACHE_DIR = os.getenv("HERAPHERI_CACHE_DIR", ".herapheri")
+        self.FSYNC_WRITES = os.getenv("FSYNC_WRITES", "true").lower() in ("1", "true", "yes")
 
     def _prompt_key(self, env_var: str, prompt_text: str) -> str:
         if not sys.stdin.isatty():
@@ -0,0 +1,172 @@
+import os
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional
+
+import duckdb
+
+# What each exported table is partitioned by: its rows' day and LLM provider.
+# Node metrics only know the model label ("groq/llama-3.1-8b-instant", "replay:x", ...).
+EXPORTS = {
+    "conversations": "coalesce(nullif(llm_provider, ''), 'unknown')",
+    "node_metrics": "CASE WHEN contains(model, '/') THEN split_part(model, '/', 1) ELSE 'unknown' END",
+}
+
+
+def table_exists(conn, table: str) -> bool:
+    return conn.execute(
+        "SELECT count(*) FROM information_schema.tables WHERE table_name = ?", (table,)
+    ).fetchone()[0] > 0
+
+
+def copy_partitioned(conn, table: str, output_dir: str, where: str = "", params: Optional[Dict[str, Any]] = None,
+                     compression: str = "zstd", append: bool = False) -> int:
+    """COPY the rows of ``table`` matching ``where`` to ``<output_dir>/<table>/date=.../provider=.../*.parquet``.
+
+    Without ``append`` the partitions written are overwritten; with it every
+    call adds new files next to the existing ones. Returns the rows copied.
+    """
+    params = params or {}
+    count = conn.execute(f"SELECT count(*) FROM {table} {where}", params).fetchone()[0]
+    if count:
+        path = os.path.join(output_dir, table).replace("'", "''")
+        mode = "APPEND" if append else "OVERWRITE_OR_IGNORE"
+        conn.execute(f"""
+            COPY (
+                SELECT *, strftime(created_at, '%Y-%m-%d') AS date, {EXPORTS[table]} AS provider
+                FROM {table} {where}
+            ) TO '{path}' (FORMAT PARQUET, COMPRESSION {compression}, PARTITION_BY (date, provider), {mode})
+        """, params)
+    return count
+
+
+def export_parquet(conn, output_dir: str, since: Optional[date] = None,
+                   compression: str = "zstd") -> Dict[str, int]:
+    """COPY conversations and node metrics to Parquet under ``output_dir``, hive-partitioned by date and provider.
+
+    Existing partitions are overwritten. Returns the rows exported per table.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    where = "WHERE created_at >= $since" if since else ""
+    params = {"since": since} if since else {}
+    return {
+        table: copy_partitioned(conn, table, output_dir, where, params, compression)
+        for table in EXPORTS
+        if table_exists(conn, table)
+    }
+
+
+def connect_export(export_dir: str):
+    """An in-memory connection whose ``conversations`` and ``node_metrics`` are views over a Parquet export."""
+    conn = duckdb.connect()
+    for table in EXPORTS:
+        files = os.path.join(export_dir, table, "**", "*.parquet")
+        if os.path.isdir(os.path.join(export_dir, table)):
+            conn.execute(f"""
+                CREATE VIEW {table} AS
+                SELECT * EXCLUDE (date, provider)
+                FROM read_parquet('{files.replace("'", "''")}', hive_partitioning = true)
+            """)
+    return conn
+
+
+def _rows(conn, sql: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    cursor = conn.execute(sql, params)
+    keys = [column[0] for column in cursor.description]
+    return [dict(zip(keys, row)) for row in cursor.fetchall()]
+
+
+def steps_per_session(conn, limit: int = 20, session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Per session: the request, node runs by type, failed runs, tokens and time, newest first."""
+    return _rows(conn, """
+        WITH runs AS (
+            SELECT session_id,
+                   count(*) AS steps,
+                   count(*) FILTER (node_type = 'RajuCoderNode') AS coder_runs,
+                   count(*) FILTER (node_type = 'ShyamReviewerNode') AS reviews,
+                   count(*) FILTER (NOT success) AS failures,
+                   sum(input_tokens + output_tokens) AS tokens,
+                   sum(latency) AS seconds,
+                   min(created_at) AS started
+            FROM node_metrics
+            WHERE $session IS NULL OR session_id = $session
+            GROUP BY session_id
+        ),
+        requests AS (
+            SELECT session_id,
+                   arg_min(substr(json_extract_string(messages, '$[0]'), 8), created_at) AS request,
+                   arg_min(llm_provider, created_at) AS provider
+            FROM conversations
+            WHERE node_type = 'ShyamPlannerNode'
+            GROUP BY session_id
+        )
+        SELECT r.session_id, q.provider, q.request, r.steps, r.coder_runs, r.reviews, r.failures,
+               r.tokens, r.seconds, r.started
+        FROM runs r LEFT JOIN requests q USING (session_id)
+        ORDER BY r.started DESC
+        LIMIT $limit
+    """, {"session": session_id, "limit": limit})
+
+
+def failure_loops(conn, limit: int = 20, min_failures: int = 1,
+                  session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Tasks whose commands failed, with the number of fix loops and the time they cost.
+
+    Node runs are numbered into tasks by the task planner runs before them;
+    the n-th task of a session is the output of its n-th task planner
+    conversation.
+    """
+    return _rows(conn, """
+        WITH runs AS (
+            SELECT session_id, node_type, success, latency, input_tokens + output_tokens AS tokens,
+                   count(*) FILTER (node_type = 'TaskPlannerNode')
+                       OVER (PARTITION BY session_id ORDER BY created_at ROWS UNBOUNDED PRECEDING) AS task_no
+            FROM node_metrics
+            WHERE $session IS NULL OR session_id = $session
+        ),
+        loops AS (
+            SELECT session_id, task_no,
+                   count(*) FILTER (node_type = 'BabuBhiyaNode' AND NOT success) AS failures,
+                   count(*) FILTER (node_type = 'ShyamReviewerNode') AS reviews,
+                   count(*) FILTER (node_type = 'BabuBhiyaNode' AND success) > 0 AS fixed,
+                   sum(latency) AS seconds,
+                   sum(tokens) AS tokens
+            FROM runs
+            WHERE task_no > 0
+            GROUP BY session_id, task_no
+        ),
+        tasks AS (
+            SELECT session_id,
+                   row_number() OVER (PARTITION BY session_id ORDER BY created_at) AS task_no,
+                   substr(json_extract_string(messages, '$[1]'), 9) AS task
+            FROM conversations
+            WHERE node_type = 'TaskPlannerNode'
+        )
+        SELECT l.session_id, l.task_no, t.task, l.failures, l.reviews, l.fixed, l.seconds, l.tokens
+        FROM loops l LEFT JOIN tasks t USING (session_id, task_no)
+        WHERE l.failures >= $min_failures
+        ORDER BY l.failures DESC, l.seconds DESC
+        LIMIT $limit
+    """, {"session": session_id, "limit": limit, "min_failures": min_failures})
+
+
+def node_latency(conn, session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Latency distribution per node and model: runs, mean, p50/p90/p99 and max, and time in the LLM."""
+    return _rows(conn, """
+        SELECT node_type, model, count(*) AS runs,
+               avg(latency) AS mean,
+               quantile_cont(latency, [0.5, 0.9, 0.99]) AS p50_p90_p99,
+               max(latency) AS max,
+               sum(llm_seconds) / nullif(sum(latency), 0) AS llm_share
+        FROM node_metrics
+        WHERE $session IS NULL OR session_id = $session
+        GROUP BY node_type, model
+        ORDER BY sum(latency) DESC
+    """, {"session": session_id})
+
+
+# Name → query, for `herapheri query <name>`
+QUERIES: Dict[str, Callable[..., List[Dict[str, Any]]]] = {
+    "steps": steps_per_session,
+    "failure-loops": failure_loops,
+    "latency": node_latency,
+}
@@ -0,0 +1,313 @@
+import threading
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+# Serialized values above this size are zlib-compressed before they are stored.
+COMPRESS_THRESHOLD = 1024
+# Channel under which the regular writes of a task are stored together, as one list of (channel, value)
+WRITES_BATCH = "__writes__"
+
+
+class DuckDBCheckpointSaver(BaseCheckpointSaver):
+    """LangGraph checkpointer that stores graph state in the conversation database.
+
+    A checkpoint is one row, channel values included, and the pending writes
+    of a task are one row too (plus one per error or interrupt). DuckDB keeps
+    every appended row in memory until its row group goes, deleted or not,
+    so a row per channel cost more than rewriting the few small channels
+    that did not change. Large values are zlib-compressed, and only the last
+    ``keep_last`` checkpoints of a thread are kept.
+    """
+
+    def __init__(self, conn, keep_last: int = 20, serde=None):
+        super().__init__(serde=serde)
+        # Puts arrive from LangGraph's background threads while the nodes use the storage
+        # connection; a cursor is a separate connection to the same database.
+        self.conn = conn.cursor()
+        self.keep_last = keep_last
+        self._lock = threading.Lock()
+        self._puts_since_prune: Dict[str, int] = {}
+        self.init_tables()
+
+    def init_tables(self):
+        with self._lock:
+            self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                checkpoint_id TEXT NOT NULL,
+                parent_checkpoint_id TEXT,
+                type TEXT NOT NULL,
+                checkpoint BLOB NOT NULL,
+                metadata_type TEXT NOT NULL,
+                metadata BLOB NOT NULL,
+                created_at TIMESTAMP NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+            );
+            """)
+            self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS checkpoint_writes (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                checkpoint_id TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                channel TEXT NOT NULL,
+                type TEXT NOT NULL,
+                blob BLOB,
+                task_path TEXT,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+            );
+            """)
+
+    # ---------------- serialization ----------------
+
+    def _dump(self, value: Any) -> Tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(value)
+        if len(data) > COMPRESS_THRESHOLD:
+            return f"{type_}+zlib", zlib.compress(data, 1)
+        return type_, data
+
+    def _load(self, type_: str, data: Optional[bytes]) -> Any:
+        if type_.endswith("+zlib"):
+            type_, data = type_[:-5], zlib.decompress(data)
+        return self.serde.loads_typed((type_, data))
+
+    # ---------------- reads ----------------
+
+    def _to_tuple(self, row) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, data, metadata_type, metadata = row
+        checkpoint = self._load(type_, data)
+        with self._lock:
+            writes = self.conn.execute("""
+                SELECT task_id, channel, type, blob FROM checkpoint_writes
+                WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?
+                ORDER BY task_id, idx
+            """, (thread_id, checkpoint_ns, checkpoint_id)).fetchall()
+
+        pending_writes = []
+        for task_id, channel, write_type, blob in writes:
+            value = self._load(write_type, blob)
+            if channel == WRITES_BATCH:
+                pending_writes += [(task_id, batch_channel, batch_value) for batch_channel, batch_value in value]
+            else:
+                pending_writes.append((task_id, channel, value))
+        return CheckpointTuple(
+            config={"configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint_id,
+            }},
+            checkpoint=checkpoint,
+            metadata=self._load(metadata_type, metadata),
+            parent_config=(
+                {"configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": parent_id,
+                }}
+                if parent_id else None
+            ),
+            pending_writes=pending_writes,
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Fetch a specific checkpoint, or the latest one of the thread."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        query = """
+            SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,
+                   type, checkpoint, metadata_type, metadata
+            FROM checkpoints
+            WHERE thread_id = ? AND checkpoint_ns = ?
+        """
+        params: List[Any] = [thread_id, checkpoint_ns]
+        if checkpoint_id := get_checkpoint_id(config):
+            query += " AND checkpoint_id = ?"
+            params.append(checkpoint_id)
+        else:
+            query += " ORDER BY checkpoint_id DESC LIMIT 1"
+        with self._lock:
+            row = self.conn.execute(query, params).fetchone()
+        return self._to_tuple(row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """List checkpoints, newest first."""
+        query = """
+            SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,
+                   type, checkpoint, metadata_type, metadata
+            FROM checkpoints WHERE 1 = 1
+        """
+        params: List[Any] = []
+        if config:
+            query += " AND thread_id = ?"
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                query += " AND checkpoint_ns = ?"
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                query += " AND checkpoint_id = ?"
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            query += " AND checkpoint_id < ?"
+            params.append(before_id)
+        query += " ORDER BY thread_id, checkpoint_ns, checkpoint_id DESC"
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+
+        for row in rows:
+            if limit is not None and limit <= 0:
+                break
+            checkpoint_tuple = self._to_tuple(row)
+            if filter and not all(checkpoint_tuple.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield checkpoint_tuple
+
+    # ---------------- writes ----------------
+
+    def _insert(self, conflict: str, table: str, columns: Sequence[str], rows: List[tuple]):
+        """Insert rows with one statement; DuckDB's executemany runs one statement per row."""
+        if not rows:
+            return
+        placeholders = "(" + ", ".join("?" * len(columns)) + ")"
+        self.conn.execute(
+            f"INSERT {conflict} INTO {table} ({', '.join(columns)}) VALUES " + ", ".join([placeholders] * len(rows)),
+            [value for row in rows for value in row],
+        )
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Store a checkpoint with its channel values."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, data = self._dump(checkpoint)
+        metadata_type, metadata_data = self._dump(get_checkpoint_metadata(config, metadata))
+
+        with self._lock:
+            self.conn.execute("""
+                INSERT OR REPLACE INTO checkpoints
+                (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,
+                 type, checkpoint, metadata_type, metadata, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                thread_id, checkpoint_ns, checkpoint["id"],
+                config["configurable"].get("checkpoint_id"),
+                type_, data, metadata_type, metadata_data, datetime.now(),
+            ))
+
+        # Pruning reads the kept checkpoints, so it only runs every few steps.
+        puts = self._puts_since_prune.get(thread_id, 0) + 1
+        self._puts_since_prune[thread_id] = puts
+        if self.keep_last and puts >= self.keep_last:
+            self.prune(thread_id)
+        return {"configurable": {
+            "thread_id": thread_id,
+            "checkpoint_ns": checkpoint_ns,
+            "checkpoint_id": checkpoint["id"],
+        }}
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Store the pending writes of a task so a resumed run does not redo it."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        key = (thread_id, checkpoint_ns, checkpoint_id, task_id)
+        # Special channels (errors, interrupts) get a row each and overwrite; regular writes are kept once.
+        special = [(*key, WRITES_IDX_MAP[channel], channel, *self._dump(value), task_path)
+                   for channel, value in writes if channel in WRITES_IDX_MAP]
+        regular = [(channel, value) for channel, value in writes if channel not in WRITES_IDX_MAP]
+        batch = [(*key, 0, WRITES_BATCH, *self._dump(regular), task_path)] if regular else []
+        with self._lock:
+            for conflict, rows in (("OR REPLACE", special), ("OR IGNORE", batch)):
+                self._insert(conflict, "checkpoint_writes",
+                             ("thread_id", "checkpoint_ns", "checkpoint_id", "task_id", "idx", "channel",
+                              "type", "blob", "task_path"), rows)
+
+    def close(self):
+        with self._lock:
+            if self.conn:
+                self.conn.close()
+                self.conn = None
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            for table in ("checkpoints", "checkpoint_writes"):
+                self.conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+        self._puts_since_prune.pop(thread_id, None)
+
+    def prune(self, thread_id: str):
+        """Drop all but the last ``keep_last`` checkpoints of a thread and their pending writes."""
+        self._puts_since_prune[thread_id] = 0
+        with self._lock:
+            stale = self.conn.execute("""
+                SELECT checkpoint_ns, checkpoint_id FROM (
+                    SELECT checkpoint_ns, checkpoint_id,
+                           row_number() OVER (PARTITION BY checkpoint_ns ORDER BY checkpoint_id DESC) AS rank
+                    FROM checkpoints WHERE thread_id = ?
+                ) WHERE rank > ?
+            """, (thread_id, self.keep_last)).fetchall()
+            if not stale:
+                return
+            self.conn.execute("BEGIN TRANSACTION")
+            try:
+                # One statement per table; a DELETE per row is what made pruning slow
+                for table in ("checkpoints", "checkpoint_writes"):
+                    self.conn.execute(f"""
+                        DELETE FROM {table} USING (SELECT unnest($ns) AS ns, unnest($id) AS id) stale
+                        WHERE {table}.thread_id = $thread AND {table}.checkpoint_ns = stale.ns
+                          AND {table}.checkpoint_id = stale.id
+                    """, {"thread": thread_id, "ns": [row[0] for row in stale], "id": [row[1] for row in stale]})
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    # The graph runs synchronously; the async API just delegates.
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.get_tuple(config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        for item in self.list(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path: str = "") -> None:
+        return self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return self.delete_thread(thread_id)
@@ -1,6 +1,7 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 import uuid
+from typing import Dict, List
 
 @dataclass
 class Conversation:
@@ -20,4 +21,43 @@ class Conversation:
             self.created_at = datetime.now()
         
         if self.updated_at is None:
-            self.updated_at = datetime.now()
\ No newline at end of file
+            self.updated_at = datetime.now()
+
+@dataclass
+class NodeMetric:
+    session_id: str
+    node_type: str
+    model: str
+    latency: float
+    llm_seconds: float = 0.0
+    llm_calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    success: bool = True
+    id: str = None
+    created_at: datetime = None
+    
+    def __post_init__(self):
+        if self.id is None:
+            self.id = str(uuid.uuid4())
+            
+        if self.created_at is None:
+            self.created_at = datetime.now()
+
+@dataclass
+class RetentionRun:
+    sessions: List[str]
+    archive_dir: str
+    archived: Dict[str, int] = field(default_factory=dict)
+    deleted: Dict[str, int] = field(default_factory=dict)
+    seconds: float = 0.0
+    dry_run: bool = False
+    id: str = None
+    ran_at: datetime = None
+
+    def __post_init__(self):
+        if self.id is None:
+            self.id = str(uuid.uuid4())
+            
+        if self.ran_at is None:
+            self.ran_at = datetime.now()
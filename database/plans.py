@@ -0,0 +1,198 @@
+import random
+import struct
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from hashlib import blake2b
+from typing import Any, Dict, List, Optional, Sequence
+
+from database.retrieval import tokenize
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+
+def shingles(text: str, size: int = 2) -> List[str]:
+    """Word ``size``-grams of ``text`` after tokenizing; the terms themselves for very short texts."""
+    terms = tokenize(text)
+    if len(terms) < size:
+        return sorted(set(terms))
+    return sorted({" ".join(terms[i:i + size]) for i in range(len(terms) - size + 1)})
+
+
+def _hash(value: str) -> int:
+    return struct.unpack("<I", blake2b(value.encode("utf-8"), digest_size=4).digest())[0]
+
+
+class MinHasher:
+    """MinHash signatures with ``num_perm`` universal hash permutations (fixed seed, so stable across runs)."""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.params = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME)) for _ in range(num_perm)]
+
+    def signature(self, items: Sequence[str]) -> List[int]:
+        hashes = [_hash(item) for item in items]
+        if not hashes:
+            return [MAX_HASH] * self.num_perm
+        return [min(((a * h + b) % MERSENNE_PRIME) & MAX_HASH for h in hashes) for a, b in self.params]
+
+    @staticmethod
+    def similarity(left: Sequence[int], right: Sequence[int]) -> float:
+        """Estimated Jaccard similarity: the share of equal signature slots."""
+        if not left or len(left) != len(right):
+            return 0.0
+        return sum(x == y for x, y in zip(left, right)) / len(left)
+
+
+@dataclass
+class PlanMatch:
+    plan_id: str
+    session_id: str
+    task: str
+    plan: str
+    similarity: float
+    created_at: datetime
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "created_at": self.created_at.isoformat()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PlanMatch":
+        return cls(**{**data, "created_at": datetime.fromisoformat(data["created_at"])})
+
+
+class PlanLibrary:
+    """Plans of earlier tasks, found again by MinHash over the task's shingles.
+
+    Every plan is stored with the MinHash signature of its task. The
+    signature is also split into ``bands`` and each band hashed into
+    ``plan_bands``, so candidates are the plans sharing at least one band
+    (locality-sensitive hashing) and only those are compared in full.
+    ``reused_from`` records which plan a new one was adapted from, and
+    ``outcome`` how the session using it ended; plans of aborted sessions
+    are not offered again.
+    """
+
+    def __init__(self, conn, num_perm: int = 64, bands: int = 16, shingle_size: int = 2):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.conn = conn
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.init_tables()
+
+    def init_tables(self):
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS plans (
+            id TEXT PRIMARY KEY,
+            session_id TEXT NOT NULL,
+            task VARCHAR NOT NULL,
+            plan VARCHAR NOT NULL,
+            signature UBIGINT[] NOT NULL,
+            reused_from TEXT,
+            similarity DOUBLE,
+            outcome TEXT,
+            created_at TIMESTAMP NOT NULL
+        );
+        """)
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS plan_bands (
+            plan_id TEXT NOT NULL,
+            band SMALLINT NOT NULL,
+            bucket UBIGINT NOT NULL
+        );
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS plan_bands_bucket ON plan_bands (bucket)")
+
+    def signature(self, task: str) -> Optional[List[int]]:
+        """The MinHash signature of ``task``, or None if it has no shingles (only stopwords or punctuation).
+
+        Such tasks would all get the same all-MAX_HASH signature and match
+        each other perfectly, so they are neither stored nor looked up.
+        """
+        items = shingles(task, self.shingle_size)
+        return self.hasher.signature(items) if items else None
+
+    def _buckets(self, signature: List[int]) -> List[int]:
+        # One bucket per band; the band number is part of the hash so equal slices in different bands differ
+        return [
+            int.from_bytes(blake2b(struct.pack(f"<H{self.rows}I", band, *signature[band * self.rows:(band + 1) * self.rows]),
+                                   digest_size=8).digest(), "little")
+            for band in range(self.bands)
+        ]
+
+    def add(self, session_id: str, task: str, plan: str, reused_from: Optional[PlanMatch] = None) -> Optional[str]:
+        """Store the plan made for ``task``; returns its id, or None if the task has no shingles."""
+        signature = self.signature(task)
+        if signature is None:
+            return None
+        plan_id = str(uuid.uuid4())
+        self.conn.execute(
+            "INSERT INTO plans VALUES (?, ?, ?, ?, ?, ?, ?, NULL, ?)",
+            (plan_id, session_id, task, plan, signature,
+             reused_from.plan_id if reused_from else None,
+             reused_from.similarity if reused_from else None,
+             datetime.now()),
+        )
+        self.conn.execute(
+            "INSERT INTO plan_bands SELECT ?, unnest(range(?)), unnest(?::UBIGINT[])",
+            (plan_id, self.bands, self._buckets(signature)),
+        )
+        return plan_id
+
+    def set_outcome(self, plan_id: str, outcome: str):
+        self.conn.execute("UPDATE plans SET outcome = ? WHERE id = ?", (outcome, plan_id))
+
+    def find(self, task: str, threshold: float = 0.5, exclude_session: Optional[str] = None) -> Optional[PlanMatch]:
+        """The most similar earlier plan whose estimated similarity is at least ``threshold``."""
+        signature = self.signature(task)
+        if signature is None:
+            return None
+        params: Dict[str, Any] = {"buckets": self._buckets(signature)}
+        exclude = ""
+        if exclude_session:
+            exclude = "AND p.session_id <> $exclude"
+            params["exclude"] = exclude_session
+        rows = self.conn.execute(f"""
+            SELECT p.id, p.session_id, p.task, p.plan, p.signature, p.created_at
+            FROM plans p
+            WHERE p.id IN (
+                SELECT b.plan_id FROM plan_bands b
+                JOIN (SELECT unnest($buckets::UBIGINT[]) AS bucket, generate_subscripts($buckets::UBIGINT[], 1) - 1 AS band) q
+                ON b.bucket = q.bucket AND b.band = q.band
+            )
+            AND coalesce(p.outcome, '') <> 'aborted' {exclude}
+        """, params).fetchall()
+        best = None
+        for plan_id, session_id, old_task, plan, old_signature, created_at in rows:
+            similarity = MinHasher.similarity(signature, old_signature)
+            # Newest plan wins a tie: it has the most recent project structure
+            if similarity >= threshold and (best is None or (similarity, created_at) > (best.similarity, best.created_at)):
+                best = PlanMatch(plan_id, session_id, old_task, plan, similarity, created_at)
+        return best
+
+    def stats(self) -> Dict[str, Any]:
+        """Plans made, how many were adapted from an earlier one, and the reuse rate."""
+        total, reused, mean_similarity = self.conn.execute(
+            "SELECT count(*), count(reused_from), avg(similarity) FROM plans"
+        ).fetchone()
+        return {
+            "plans": total,
+            "reused": reused,
+            "reuse_rate": reused / total if total else 0.0,
+            "mean_similarity": mean_similarity or 0.0,
+        }
+
+    def recent(self, limit: int = 20) -> List[Dict[str, Any]]:
+        rows = self.conn.execute("""
+            SELECT p.created_at, p.session_id, p.task, p.similarity, p.outcome, o.task
+            FROM plans p LEFT JOIN plans o ON o.id = p.reused_from
+            ORDER BY p.created_at DESC
+            LIMIT ?
+        """, (limit,)).fetchall()
+        keys = ["created_at", "session_id", "task", "similarity", "outcome", "reused_task"]
+        return [dict(zip(keys, row)) for row in rows]
@@ -0,0 +1,164 @@
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+import duckdb
+
+from database.analytics import EXPORTS, copy_partitioned, table_exists
+from database.models import RetentionRun
+
+# Rows of a session that are archived before they are deleted
+ARCHIVED_TABLES = tuple(EXPORTS)
+# Graph checkpoints (thread_id = session_id); only useful to resume a run, so deleted without archiving
+CHECKPOINT_TABLES = ("checkpoints", "checkpoint_writes")
+
+
+def init_tables(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS retention_runs (
+        id TEXT PRIMARY KEY,
+        ran_at TIMESTAMP NOT NULL,
+        sessions INTEGER NOT NULL,
+        archived_rows BIGINT NOT NULL,
+        deleted_rows BIGINT NOT NULL,
+        archive_dir TEXT,
+        seconds DOUBLE
+    );
+    """)
+
+
+def last_run(conn) -> Optional[datetime]:
+    init_tables(conn)
+    return conn.execute("SELECT max(ran_at) FROM retention_runs").fetchone()[0]
+
+
+def expired_sessions(conn, max_age_days: int = 0, keep_sessions: int = 0,
+                     protect: Sequence[str] = ()) -> List[str]:
+    """Sessions past the retention limits, oldest first.
+
+    A session's age is that of its last conversation or node run. It
+    expires when it is older than ``max_age_days`` or when more than
+    ``keep_sessions`` newer sessions exist; a limit of 0 is off. Sessions
+    in ``protect`` (e.g. the one in use) never expire.
+    """
+    if max_age_days <= 0 and keep_sessions <= 0:
+        return []
+    sources = [f"SELECT session_id, created_at FROM {table}" for table in ARCHIVED_TABLES if table_exists(conn, table)]
+    if not sources:
+        return []
+    rows = conn.execute(f"""
+        WITH activity AS (
+            SELECT session_id, max(created_at) AS last_active
+            FROM ({" UNION ALL ".join(sources)})
+            GROUP BY session_id
+        ),
+        ranked AS (
+            SELECT session_id, last_active, row_number() OVER (ORDER BY last_active DESC) AS rank
+            FROM activity
+        )
+        SELECT session_id FROM ranked
+        WHERE (($max_age > 0 AND last_active < $cutoff) OR ($keep > 0 AND rank > $keep))
+          AND session_id NOT IN (SELECT unnest($protect::VARCHAR[]))
+        ORDER BY last_active
+    """, {
+        "max_age": max_age_days,
+        "cutoff": datetime.now() - timedelta(days=max(max_age_days, 0)),
+        "keep": keep_sessions,
+        "protect": list(protect),
+    }).fetchall()
+    return [session_id for session_id, in rows]
+
+
+def apply_retention(conn, archive_dir: str, max_age_days: int = 0, keep_sessions: int = 0,
+                    protect: Sequence[str] = (), compression: str = "zstd", dry_run: bool = False) -> RetentionRun:
+    """Archive expired sessions to Parquet under ``archive_dir``, delete them, then CHECKPOINT.
+
+    Archives use the layout of ``herapheri export`` (and can be queried the
+    same way); every run appends new files, so earlier archives are kept.
+    Nothing is deleted unless the archive was written. Besides the archived
+    tables, a session's search index entries and graph checkpoints go too.
+    """
+    started = time.perf_counter()
+    sessions = expired_sessions(conn, max_age_days, keep_sessions, protect)
+    run = RetentionRun(sessions=sessions, archive_dir=archive_dir, dry_run=dry_run)
+    if not sessions:
+        return run
+    params = {"sessions": sessions}
+    in_sessions = "IN (SELECT unnest($sessions::VARCHAR[]))"
+    tables = [table for table in ARCHIVED_TABLES if table_exists(conn, table)]
+    if dry_run:
+        for table in tables:
+            run.archived[table] = conn.execute(f"SELECT count(*) FROM {table} WHERE session_id {in_sessions}",
+                                               params).fetchone()[0]
+        return run
+
+    os.makedirs(archive_dir, exist_ok=True)
+    for table in tables:
+        run.archived[table] = copy_partitioned(conn, table, archive_dir, f"WHERE session_id {in_sessions}", params,
+                                               compression, append=True)
+
+    deletes = []
+    if table_exists(conn, "conversation_docs"):
+        # The BM25 index of the archived conversations
+        deletes.append(("conversation_terms", f"""doc_id IN (
+            SELECT doc_id FROM conversation_docs WHERE session_id {in_sessions})"""))
+        deletes.append(("conversation_docs", f"session_id {in_sessions}"))
+    deletes += [(table, f"session_id {in_sessions}") for table in tables]
+    deletes += [(table, f"thread_id {in_sessions}") for table in CHECKPOINT_TABLES if table_exists(conn, table)]
+
+    conn.execute("BEGIN TRANSACTION")
+    try:
+        for table, where in deletes:
+            run.deleted[table] = conn.execute(f"DELETE FROM {table} WHERE {where}", params).fetchone()[0]
+        init_tables(conn)
+        run.seconds = time.perf_counter() - started
+        conn.execute("INSERT INTO retention_runs VALUES (?, ?, ?, ?, ?, ?, ?)", (
+            run.id, run.ran_at, len(sessions), sum(run.archived.values()), sum(run.deleted.values()),
+            archive_dir, run.seconds,
+        ))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    # Write the deletions to the database file so the freed blocks can be reused
+    conn.execute("CHECKPOINT")
+    run.seconds = time.perf_counter() - started
+    return run
+
+
+def database_size(path: str) -> int:
+    """Bytes of a database file and its write-ahead log."""
+    return sum(os.path.getsize(file) for file in (path, path + ".wal") if os.path.exists(file))
+
+
+def compact(path: str) -> Dict[str, int]:
+    """Rewrite the database at ``path`` into a new file, dropping the free space deletions leave behind.
+
+    DuckDB reuses freed blocks but rarely shrinks its file, so this copies
+    every table into a fresh database and swaps it in. Nothing else may
+    have the database open while this runs. Indexes are recreated by the
+    storage classes the next time the database is opened.
+    """
+    before = database_size(path)
+    target = f"{path}.compact-{uuid.uuid4().hex[:8]}"
+    conn = duckdb.connect()
+    try:
+        conn.execute(f"ATTACH '{path.replace(chr(39), chr(39) * 2)}' AS source")
+        conn.execute("CHECKPOINT source")
+        conn.execute(f"ATTACH '{target.replace(chr(39), chr(39) * 2)}' AS target")
+        conn.execute("COPY FROM DATABASE source TO target")
+        conn.execute("DETACH target")
+        conn.execute("DETACH source")
+    except Exception:
+        for file in (target, target + ".wal"):
+            if os.path.exists(file):
+                os.remove(file)
+        raise
+    finally:
+        conn.close()
+    os.replace(target, path)
+    if os.path.exists(path + ".wal"):
+        os.remove(path + ".wal")
+    return {"before": before, "after": database_size(path)}
@@ -0,0 +1,253 @@
+import re
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from json import dumps, loads
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+TOKEN_RE = re.compile(r"[A-Za-z][A-Za-z0-9_]*|\d+")
+CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+STOPWORDS = frozenset("""
+a an and are as at be but by can do for from has have if in into is it its not of on or so than that the
+their then there these this to was were will with you your we our i me my he she they them
+input output
+""".split())
+MAX_QUERY_TERMS = 64
+# Conversations buffered before they are written to the index in one go. A flush reads their
+# rows back, so larger batches only add to the memory a long session holds on to.
+FLUSH_EVERY = 32
+# Conversations tokenized and inserted per statement when catching up
+SYNC_BATCH = 5000
+
+
+@lru_cache(maxsize=65536)
+def _word_terms(word: str) -> Tuple[str, ...]:
+    # The word itself, then its parts in order; words repeat a lot, so this is cached
+    parts = [part for chunk in word.split("_") for part in CAMEL_RE.findall(chunk)]
+    terms = [term.lower() for term in ([word, *parts] if len(parts) > 1 else [word])]
+    return tuple(dict.fromkeys(term for term in terms if 1 < len(term) <= 40 and term not in STOPWORDS))
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms; identifiers also yield their snake_case and camelCase parts."""
+    terms: List[str] = []
+    for word in TOKEN_RE.findall(text or ""):
+        terms += _word_terms(word)
+    return terms
+
+
+@dataclass
+class RecallHit:
+    doc_id: str
+    session_id: str
+    node_type: str
+    created_at: datetime
+    score: float
+    messages: List[str]
+
+    def text(self, max_chars: int) -> str:
+        """The step as injected into a prompt, at most ``max_chars`` long."""
+        header = f"[{self.node_type} · session {self.session_id[:8]} · {self.created_at:%Y-%m-%d}]"
+        body = "\n".join(self.messages)
+        if len(header) + 1 + len(body) > max_chars:
+            body = body[:max(0, max_chars - len(header) - 2)] + "…"
+        return f"{header}\n{body}"
+
+
+class ConversationIndex:
+    """BM25 over the ``conversations`` table, kept in two side tables.
+
+    ``conversation_terms`` holds a row per (conversation, term) with the term
+    frequency and ``conversation_docs`` the length and ``updated_at`` of
+    every indexed conversation. Conversations written through
+    ConversationStorage are queued by id and indexed in bulk, from their
+    rows, before the next search, every FLUSH_EVERY conversations and on
+    close, so inserting one costs no extra statements. Rows written some
+    other way (another process, bulk loads) or changed since they were
+    indexed are caught up once, on the first search.
+    """
+
+    def __init__(self, conn, k1: float = 1.2, b: float = 0.75):
+        self.conn = conn
+        self.k1 = k1
+        self.b = b
+        self._synced = False
+        # Conversations to index on the next flush, and those of them whose old entry must go first
+        self._pending: Set[str] = set()
+        self._replaced: Set[str] = set()
+        self.init_tables()
+
+    def init_tables(self):
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS conversation_docs (
+            doc_id TEXT PRIMARY KEY,
+            session_id TEXT NOT NULL,
+            node_type TEXT,
+            length INTEGER NOT NULL,
+            created_at TIMESTAMP NOT NULL,
+            updated_at TIMESTAMP
+        );
+        """)
+        # Indexes created before updated_at was tracked are caught up by sync()
+        self.conn.execute("ALTER TABLE conversation_docs ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP")
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS conversation_terms (
+            doc_id TEXT NOT NULL,
+            term TEXT NOT NULL,
+            tf INTEGER NOT NULL
+        );
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS conversation_terms_term ON conversation_terms (term)")
+
+    def add(self, doc_id: str, replace: bool = False):
+        """Queue a conversation for indexing; ``replace`` drops its previous entry first."""
+        self._pending.add(doc_id)
+        if replace:
+            self._replaced.add(doc_id)
+        if len(self._pending) >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        """Index the queued conversations."""
+        if not self._pending:
+            return
+        pending, replaced = list(self._pending), list(self._replaced)
+        self._pending, self._replaced = set(), set()
+        self.remove(replaced)
+        rows = self.conn.execute("""
+            SELECT id, session_id, node_type, created_at, updated_at, messages
+            FROM conversations WHERE id IN (SELECT unnest(?::VARCHAR[]))
+        """, (pending,)).fetchall()
+        self._insert(row[:5] + (loads(row[5]),) for row in rows)
+
+    def _insert(self, rows: Iterable[tuple]):
+        """Tokenize rows in one pass and insert them with a single statement per table.
+
+        Rows are ``(doc_id, session_id, node_type, created_at, updated_at,
+        messages)``. They travel as one JSON document per table, since
+        DuckDB binds a Python list parameter element by element, which
+        takes longer than the insert itself.
+        """
+        docs: Dict[str, list] = {"ids": [], "sessions": [], "nodes": [], "lengths": [], "created": [], "updated": []}
+        terms: Dict[str, list] = {"ids": [], "terms": [], "tfs": []}
+        for doc_id, session_id, node_type, created_at, updated_at, messages in rows:
+            counts = Counter(tokenize("\n".join(messages)))
+            docs["ids"].append(doc_id)
+            docs["sessions"].append(session_id)
+            docs["nodes"].append(node_type)
+            docs["lengths"].append(sum(counts.values()))
+            docs["created"].append(created_at.isoformat())
+            docs["updated"].append(updated_at.isoformat() if updated_at else None)
+            terms["ids"] += [doc_id] * len(counts)
+            terms["terms"] += counts.keys()
+            terms["tfs"] += counts.values()
+        if not docs["ids"]:
+            return
+        self.conn.execute("""
+            INSERT INTO conversation_docs
+            SELECT unnest(d.ids), unnest(d.sessions), unnest(d.nodes), unnest(d.lengths),
+                   unnest(d.created), unnest(d.updated)
+            FROM (SELECT json_transform($docs, '{"ids": ["VARCHAR"], "sessions": ["VARCHAR"], "nodes": ["VARCHAR"],
+                  "lengths": ["INTEGER"], "created": ["TIMESTAMP"], "updated": ["TIMESTAMP"]}') AS d)
+        """, {"docs": dumps(docs)})
+        if terms["ids"]:
+            self.conn.execute("""
+                INSERT INTO conversation_terms
+                SELECT unnest(t.ids), unnest(t.terms), unnest(t.tfs)
+                FROM (SELECT json_transform($terms, '{"ids": ["VARCHAR"], "terms": ["VARCHAR"], "tfs": ["INTEGER"]}') AS t)
+            """, {"terms": dumps(terms)})
+
+    def remove(self, doc_ids: List[str]):
+        if not doc_ids:
+            return
+        for table in ("conversation_terms", "conversation_docs"):
+            self.conn.execute(f"DELETE FROM {table} WHERE doc_id IN (SELECT unnest(?::VARCHAR[]))", (doc_ids,))
+
+    def sync(self) -> int:
+        """Index conversations that are missing from the index or changed since; returns how many."""
+        self.flush()
+        # Entries of conversations deleted or changed behind the index's back
+        stale = """SELECT d.doc_id FROM conversation_docs d LEFT JOIN conversations c ON c.id = d.doc_id
+                   WHERE c.id IS NULL OR d.updated_at IS DISTINCT FROM c.updated_at"""
+        self.conn.execute(f"DELETE FROM conversation_terms WHERE doc_id IN ({stale})")
+        self.conn.execute(f"DELETE FROM conversation_docs WHERE doc_id IN ({stale})")
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("""
+                SELECT c.id, c.session_id, c.node_type, c.created_at, c.updated_at, c.messages
+                FROM conversations c ANTI JOIN conversation_docs d ON c.id = d.doc_id
+            """)
+            count = 0
+            while True:
+                rows = cursor.fetchmany(SYNC_BATCH)
+                if not rows:
+                    break
+                self._insert(row[:5] + (loads(row[5]),) for row in rows)
+                count += len(rows)
+        finally:
+            cursor.close()
+        self._synced = True
+        return count
+
+    def search(self, query: str, k: int = 5, exclude_session: Optional[str] = None,
+               node_types: Optional[List[str]] = None) -> List[RecallHit]:
+        """Top ``k`` conversations for ``query`` by BM25."""
+        if not self._synced:
+            self.sync()
+        else:
+            self.flush()
+        counts = Counter(tokenize(query))
+        terms = [term for term, _ in counts.most_common(MAX_QUERY_TERMS)]
+        if not terms:
+            return []
+        filters, params = [], {"terms": terms, "k1": self.k1, "b": self.b, "k": k}
+        if exclude_session:
+            filters.append("d.session_id <> $exclude")
+            params["exclude"] = exclude_session
+        if node_types:
+            filters.append("d.node_type IN (SELECT unnest($nodes::VARCHAR[]))")
+            params["nodes"] = node_types
+        rows = self.conn.execute(f"""
+            WITH stats AS (SELECT count(*) AS n, avg(length) AS avgdl FROM conversation_docs),
+            matches AS (SELECT doc_id, term, tf FROM conversation_terms WHERE term IN (SELECT unnest($terms::VARCHAR[]))),
+            df AS (SELECT term, count(*) AS df FROM matches GROUP BY term),
+            scored AS (
+                SELECT m.doc_id,
+                       sum(ln(1 + (stats.n - df.df + 0.5) / (df.df + 0.5))
+                           * m.tf * ($k1 + 1) / (m.tf + $k1 * (1 - $b + $b * d.length / stats.avgdl))) AS score
+                FROM matches m
+                JOIN df USING (term)
+                JOIN conversation_docs d ON d.doc_id = m.doc_id
+                CROSS JOIN stats
+                {"WHERE " + " AND ".join(filters) if filters else ""}
+                GROUP BY m.doc_id
+                ORDER BY score DESC
+                LIMIT $k
+            )
+            SELECT s.doc_id, c.session_id, c.node_type, c.created_at, s.score, c.messages
+            FROM scored s JOIN conversations c ON c.id = s.doc_id
+            ORDER BY s.score DESC
+        """, params).fetchall()
+        return [
+            RecallHit(doc_id, session_id, node_type, created_at, score, loads(messages))
+            for doc_id, session_id, node_type, created_at, score, messages in rows
+        ]
+
+    def context(self, query: str, k: int = 3, max_tokens: int = 600, **filters: Any) -> str:
+        """The top hits as prompt text, within ``max_tokens`` (estimated at four characters each)."""
+        budget = max_tokens * 4
+        parts: List[str] = []
+        for hit in self.search(query, k=k, **filters):
+            remaining = budget - sum(len(part) + 2 for part in parts)
+            if remaining < 200:
+                break
+            parts.append(hit.text(remaining))
+        return "\n\n".join(parts)
+
+    def stats(self) -> Dict[str, int]:
+        self.flush()
+        docs, terms = self.conn.execute(
+            "SELECT (SELECT count(*) FROM conversation_docs), (SELECT count(DISTINCT term) FROM conversation_terms)"
+        ).fetchone()
+        return {"documents": docs, "terms": terms}
@@ -1,6 +1,8 @@
 import duckdb
-from typing import List, Optional
-from database.models import Conversation
+from typing import Any, Dict, List, Optional
+from database.models import Conversation, NodeMetric
+from database.retrieval import ConversationIndex, RecallHit
+from database.plans import PlanLibrary
 from config.settings import settings
 from json import dumps, loads
 
@@ -9,7 +11,13 @@ class ConversationStorage:
         self.db_path = db_path or settings.DB_PATH
         # We'll keep one persistent connection
         self.conn = duckdb.connect(self.db_path)
+        if settings.DB_MEMORY_LIMIT:
+            self.conn.execute(f"SET memory_limit = '{settings.DB_MEMORY_LIMIT}'")
         self.init_database()
+        # BM25 over past conversations, brought up to date before every search
+        self.index = ConversationIndex(self.conn)
+        # Earlier plans, found by MinHash similarity of their tasks
+        self.plans = PlanLibrary(self.conn)
 
     def init_database(self):
         self.conn.execute("""
@@ -23,6 +31,21 @@ class ConversationStorage:
             llm_provider TEXT
         );
         """)
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS node_metrics (
+            id TEXT PRIMARY KEY,
+            session_id TEXT NOT NULL,
+            node_type TEXT NOT NULL,
+            model TEXT,
+            latency DOUBLE NOT NULL,
+            llm_seconds DOUBLE,
+            llm_calls INTEGER,
+            input_tokens BIGINT,
+            output_tokens BIGINT,
+            success BOOLEAN,
+            created_at TIMESTAMP NOT NULL
+        );
+        """)
 
     def create(self, convo: Conversation):
         """Insert a new conversation record."""
@@ -39,6 +62,7 @@ class ConversationStorage:
             convo.node_type,
             convo.llm_provider
         ))
+        self.index.add(convo.id)
 
     def update(self, convo: Conversation):
         """Overwrite an existing conversation (by id)."""
@@ -60,6 +84,7 @@ class ConversationStorage:
             convo.llm_provider,
             convo.id
         ))
+        self.index.add(convo.id, replace=True)
 
     def get_by_id(self, convo_id: str) -> Optional[Conversation]:
         """Fetch a Conversation by its ID."""
@@ -137,6 +162,47 @@ class ConversationStorage:
         """).fetchall()
         return [row[0] for row in rows]
 
+    def save_metric(self, metric: NodeMetric):
+        """Record the latency and token usage of one node run."""
+        self.conn.execute("""
+        INSERT INTO node_metrics
+        (id, session_id, node_type, model, latency, llm_seconds, llm_calls,
+         input_tokens, output_tokens, success, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            metric.id,
+            metric.session_id,
+            metric.node_type,
+            metric.model,
+            metric.latency,
+            metric.llm_seconds,
+            metric.llm_calls,
+            metric.input_tokens,
+            metric.output_tokens,
+            metric.success,
+            metric.created_at
+        ))
+        
+    def node_metrics_summary(self, session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Per node and model: runs, mean/p95 latency, time in the LLM and tokens."""
+        where = "WHERE session_id = ?" if session_id else ""
+        rows = self.conn.execute(f"""
+            SELECT node_type, model, COUNT(*), AVG(latency), quantile_cont(latency, 0.95),
+                   SUM(llm_seconds), SUM(llm_calls), SUM(input_tokens), SUM(output_tokens),
+                   AVG(CASE WHEN success THEN 1 ELSE 0 END)
+            FROM node_metrics
+            {where}
+            GROUP BY node_type, model
+            ORDER BY SUM(latency) DESC
+        """, [session_id] if session_id else []).fetchall()
+        keys = ["node_type", "model", "runs", "avg_latency", "p95_latency", "llm_seconds",
+                "llm_calls", "input_tokens", "output_tokens", "success_rate"]
+        return [dict(zip(keys, row)) for row in rows]
+        
+    def recall(self, query: str, k: int = 5, exclude_session: Optional[str] = None) -> List[RecallHit]:
+        """Past conversation steps most relevant to ``query`` (BM25)."""
+        return self.index.search(query, k=k, exclude_session=exclude_session)
+        
     def append_message(self, convo_id: str, message: str):
         """Add a single message to the conversation's message list."""
         convo = self.get_by_id(convo_id)
@@ -148,6 +214,7 @@ class ConversationStorage:
     def close(self):
         """Close the DuckDB connection when done."""
         if hasattr(self, 'conn') and self.conn:
+            self.index.flush()
             self.conn.close()
             self.conn = None
 
@@ -0,0 +1,260 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict, messages_to_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import BaseTool
+from pydantic import ConfigDict, Field
+
+
+class CassetteMismatch(Exception):
+    """A replay asked for something the cassette did not record."""
+
+
+def request_key(args: Any) -> str:
+    """Stable hash of a request, used to spot replays that diverge from the recording."""
+    return hashlib.sha1(json.dumps(args, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+class Cassette:
+    """LLM requests/responses and tool results of one session, one JSON object per line.
+
+    In ``record`` mode every call is executed and appended to the file as it
+    happens, so an interrupted session still leaves a usable cassette. In
+    ``replay`` mode nothing is executed: each node gets the next recorded
+    answer of the same kind, in order. A request that differs from the
+    recorded one counts as a mismatch (an error with ``strict``), which is how
+    a replay shows that a change altered the graph's behaviour.
+    """
+
+    def __init__(self, path: str, mode: str = "record", strict: bool = False):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}. Use 'record' or 'replay'")
+        self.path = path
+        self.mode = mode
+        self.strict = strict
+        self.meta: Dict[str, Any] = {}
+        self.inputs: List[str] = []
+        self.recorded = 0
+        self.replayed = 0
+        self.mismatches = 0
+        self.recorded_seconds = 0.0
+        self._queues: Dict[Tuple[str, str], Deque[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._file = None
+        if self.replaying:
+            self._load()
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = open(path, "a", encoding="utf-8")
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                kind = entry.get("kind")
+                if kind == "meta":
+                    self.meta.update(entry)
+                elif kind == "input":
+                    self.inputs.append(entry["task"])
+                else:
+                    self._queues.setdefault((entry["channel"], kind), deque()).append(entry)
+                    self.recorded_seconds += entry.get("duration", 0.0)
+
+    def _append(self, entry: Dict[str, Any]):
+        line = json.dumps(entry, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            self.recorded += 1
+
+    def record_meta(self, **fields):
+        if not self.replaying:
+            self._append({"kind": "meta", "created_at": datetime.now().isoformat(), **fields})
+
+    def record_input(self, task: str):
+        if not self.replaying:
+            self._append({"kind": "input", "task": task})
+
+    def take(self, channel: str, kind: str, key: str) -> Dict[str, Any]:
+        """Next recorded entry of ``kind`` for ``channel``."""
+        with self._lock:
+            queue = self._queues.get((channel, kind))
+            if not queue:
+                self.mismatches += 1
+                raise CassetteMismatch(f"Cassette has no recorded '{kind}' left for {channel}")
+            entry = queue.popleft()
+            self.replayed += 1
+            if entry["key"] != key:
+                self.mismatches += 1
+                if self.strict:
+                    raise CassetteMismatch(f"{channel} sent a different '{kind}' request than the recording")
+            return entry
+
+    def remaining(self) -> Dict[str, int]:
+        """Recorded entries a replay has not consumed, by channel and kind."""
+        with self._lock:
+            return {f"{channel}/{kind}": len(queue) for (channel, kind), queue in self._queues.items() if queue}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "mismatches": self.mismatches,
+            "remaining": sum(self.remaining().values()),
+        }
+
+    def channel(self, name: str) -> "CassetteChannel":
+        return CassetteChannel(self, name)
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class CassetteChannel:
+    """The part of a cassette that belongs to one graph node."""
+
+    def __init__(self, cassette: Cassette, name: str):
+        self.cassette = cassette
+        self.name = name
+
+    @property
+    def replaying(self) -> bool:
+        return self.cassette.replaying
+
+    def _entry(self, kind: str, key: str, args: Any, started: float) -> Dict[str, Any]:
+        return {"kind": kind, "channel": self.name, "key": key, "args": args,
+                "duration": time.perf_counter() - started}
+
+    def _replayed(self, entry: Dict[str, Any], decode: Optional[Callable[[Any], Any]]) -> Any:
+        if "error" in entry:
+            raise RuntimeError(entry["error"])
+        return decode(entry["result"]) if decode else entry["result"]
+
+    def call(self, kind: str, args: Any, fn: Callable[[], Any],
+             encode: Optional[Callable[[Any], Any]] = None, decode: Optional[Callable[[Any], Any]] = None) -> Any:
+        """Run ``fn`` and record its result, or return the recorded result when replaying."""
+        key = request_key(args)
+        if self.replaying:
+            return self._replayed(self.cassette.take(self.name, kind, key), decode)
+        started = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            self.cassette._append({**self._entry(kind, key, args, started), "error": str(e)})
+            raise
+        self.cassette._append({**self._entry(kind, key, args, started), "result": encode(result) if encode else result})
+        return result
+
+    async def acall(self, kind: str, args: Any, fn: Callable[[], Awaitable[Any]],
+                    encode: Optional[Callable[[Any], Any]] = None, decode: Optional[Callable[[Any], Any]] = None) -> Any:
+        key = request_key(args)
+        if self.replaying:
+            return self._replayed(self.cassette.take(self.name, kind, key), decode)
+        started = time.perf_counter()
+        try:
+            result = await fn()
+        except Exception as e:
+            self.cassette._append({**self._entry(kind, key, args, started), "error": str(e)})
+            raise
+        self.cassette._append({**self._entry(kind, key, args, started), "result": encode(result) if encode else result})
+        return result
+
+    def wrap_llm(self, llm: Optional[BaseChatModel]) -> "CassetteChatModel":
+        """Record ``llm`` or, when replaying, stand in for it (``llm`` may then be None)."""
+        return CassetteChatModel(inner=None if self.replaying else llm, channel=self)
+
+    def wrap_tools(self, tools: List[BaseTool]) -> List[BaseTool]:
+        return [
+            CassetteTool(name=tool.name, description=tool.description, args_schema=tool.args_schema,
+                         tool=tool, channel=self)
+            for tool in tools
+        ]
+
+
+def _decode_message(data: Dict[str, Any]) -> BaseMessage:
+    return messages_from_dict([data])[0]
+
+
+class CassetteChatModel(BaseChatModel):
+    """Chat model wrapper that records to, or replays from, a cassette channel."""
+
+    inner: Optional[BaseChatModel] = None
+    channel: Any = Field(exclude=True)
+    model_name: str = "replay"
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette"
+
+    def bind_tools(self, tools, **kwargs):
+        if self.inner is None:
+            # Replayed answers already contain their tool calls.
+            return self.bind()
+        bound = self.inner.bind_tools(tools, **kwargs)
+        if isinstance(bound, BaseChatModel):
+            return self.model_copy(update={"inner": bound})
+        return self.bind(**bound.kwargs)
+
+    @staticmethod
+    def _result(message: BaseMessage) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message = self.channel.call(
+            "llm", {"messages": messages_to_dict(messages)},
+            lambda: self.inner.invoke(messages, stop=stop, **kwargs),
+            encode=message_to_dict, decode=_decode_message,
+        )
+        return self._result(message)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message = await self.channel.acall(
+            "llm", {"messages": messages_to_dict(messages)},
+            lambda: self.inner.ainvoke(messages, stop=stop, **kwargs),
+            encode=message_to_dict, decode=_decode_message,
+        )
+        return self._result(message)
+
+
+class CassetteTool(BaseTool):
+    """Tool wrapper that records results, or replays them without running the tool."""
+
+    tool: BaseTool = Field(exclude=True)
+    channel: Any = Field(default=None, exclude=True)
+
+    def _run(self, **kwargs: Any) -> Any:
+        return self.channel.call(f"tool:{self.name}", kwargs, lambda: self.tool.run(kwargs))
+
+    async def _arun(self, **kwargs: Any) -> Any:
+        return await self.channel.acall(f"tool:{self.name}", kwargs, lambda: self.tool.arun(kwargs))
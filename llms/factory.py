@@ -1,5 +1,9 @@
-from typing import Dict, Type
+from typing import Dict, List, Optional, Tuple, Type
+from config.settings import settings
 from llms.providers import BaseLLMProvider, OpenAIProvider, AnthropicProvider, GoogleProvider, GroqProvider
+from llms.ratelimit import RateLimitedChatModel, get_rate_limiter, parse_rate_limits
+from llms.router import HedgedChatModel
+from llms.cassette import CassetteChatModel
 
 class LLMFactory:
     _providers: Dict[str, Type[BaseLLMProvider]] = {
@@ -10,16 +14,127 @@ class LLMFactory:
     }
     
     @classmethod
-    def create_llm(cls, provider: str, model: str = None, temperature: float = 0.7):
+    def create_llm(cls, provider: str, model: str = None, temperature: float = 0.7, callbacks: list = None,
+                   cassette=None):
+        if cassette is not None and cassette.replaying:
+            # Replays answer from the cassette; no provider client (or key) is needed
+            llm = cassette.wrap_llm(None)
+            llm.model_name = f"{provider}/{model}" if model else provider
+        else:
+            llm = cls._route(provider, model, temperature)
+            if cassette is not None:
+                llm = cassette.wrap_llm(llm)
+        if callbacks:
+            llm.callbacks = callbacks
+        return llm
+    
+    @classmethod
+    def _route(cls, provider: str, model: str = None, temperature: float = 0.7):
+        llm = cls._create_single(provider, model, temperature)
+        fallbacks = [
+            (name, fallback_model)
+            for name, fallback_model in cls.fallback_providers()
+            if (name, fallback_model) != (provider, model) and cls._is_configured(name)
+        ]
+        if not fallbacks:
+            return llm
+        
+        models = [llm] + [cls._create_single(name, fallback_model, temperature) for name, fallback_model in fallbacks]
+        return HedgedChatModel(
+            models=models,
+            names=[cls._model_key(provider, llm)] + [cls._model_key(name, m) for (name, _), m in zip(fallbacks, models[1:])],
+            hedging=settings.LLM_HEDGING,
+            min_samples=settings.HEDGE_MIN_SAMPLES,
+            default_delay=settings.HEDGE_DEFAULT_DELAY,
+        )
+    
+    @classmethod
+    def _create_single(cls, provider: str, model: str = None, temperature: float = 0.7):
         if provider not in cls._providers:
             raise ValueError(f"Unknown provider: {provider}. Available: {list(cls._providers.keys())}")
         
         provider_class = cls._providers[provider]
         provider_instance = provider_class()
+        # With client-side rate limiting the wrapper does all retries (429s, 5xx, timeouts), not the SDKs
+        kwargs = {"max_retries": 0} if settings.LLM_RATE_LIMITING else {}
         if model is not None:
-            return provider_instance.get_llm(model, temperature)
+            llm = provider_instance.get_llm(model, temperature, **kwargs)
         else:
-            return provider_instance.get_llm(temperature=temperature)
+            llm = provider_instance.get_llm(temperature=temperature, **kwargs)
+        if not settings.LLM_RATE_LIMITING:
+            return llm
+        return cls.rate_limited(provider, llm)
+    
+    @staticmethod
+    def _model_name(llm) -> str:
+        llm = getattr(llm, "inner", llm)
+        return getattr(llm, "model_name", None) or getattr(llm, "model", None) or ""
+    
+    @classmethod
+    def _model_key(cls, provider: str, llm) -> str:
+        return f"{provider}/{cls._model_name(llm)}"
+    
+    @classmethod
+    def model_label(cls, llm) -> str:
+        """Human-readable provider/model of a chat model created by the factory."""
+        if isinstance(llm, CassetteChatModel):
+            return cls.model_label(llm.inner) if llm.inner is not None else f"replay:{llm.model_name}"
+        if isinstance(llm, HedgedChatModel):
+            return "+".join(llm.names)
+        if isinstance(llm, RateLimitedChatModel):
+            return f"{llm.provider}/{llm.model_name}"
+        return cls._model_name(llm)
+    
+    @classmethod
+    def parse_model_spec(cls, spec: str, default_provider: str) -> Tuple[str, Optional[str]]:
+        """Split "provider/model" or a bare "model" into (provider, model).
+        
+        Model names may contain slashes themselves (e.g. "meta-llama/llama-4-scout"),
+        so the prefix only counts as a provider if one with that name exists.
+        """
+        prefix, _, rest = spec.partition("/")
+        if rest and prefix in cls._providers:
+            return prefix, rest or None
+        if not rest and spec in cls._providers:
+            return spec, None
+        return default_provider, spec or None
+    
+    @staticmethod
+    def fallback_providers() -> List[Tuple[str, Optional[str]]]:
+        """Parse LLM_FALLBACK_PROVIDERS ("openai/gpt-4o-mini,anthropic") into (provider, model) pairs."""
+        pairs = []
+        for item in filter(None, (part.strip() for part in settings.LLM_FALLBACK_PROVIDERS.split(","))):
+            name, _, model = item.partition("/")
+            pairs.append((name, model or None))
+        return pairs
+    
+    @classmethod
+    def _is_configured(cls, provider: str) -> bool:
+        if provider not in cls._providers:
+            return False
+        key_attr = f"{provider.upper()}_API_KEY"
+        return not hasattr(settings, key_attr) or bool(getattr(settings, key_attr))
+    
+    @classmethod
+    def rate_limited(cls, provider: str, llm):
+        """Wrap a chat model with the process-wide limiter of its provider/model."""
+        model_name = cls._model_name(llm)
+        limits = parse_rate_limits(settings.LLM_RATE_LIMITS)
+        rpm, tpm = limits.get(f"{provider}/{model_name}") or limits.get(provider) or (0, 0)
+        return RateLimitedChatModel(
+            inner=llm,
+            provider=provider,
+            model_name=model_name,
+            limiter=get_rate_limiter(provider, model_name, rpm, tpm),
+            max_retries=settings.LLM_MAX_RETRIES,
+            backoff_base=settings.LLM_BACKOFF_BASE,
+            backoff_cap=settings.LLM_BACKOFF_CAP,
+        )
+    
+    @classmethod
+    def register_provider(cls, name: str, provider_class: Type[BaseLLMProvider]):
+        """Make an additional provider (e.g. a local fake for tests) available by name."""
+        cls._providers[name] = provider_class
     
     @classmethod
     def get_available_providers(cls) -> list:
@@ -7,37 +7,41 @@ from config.settings import settings
 
 class BaseLLMProvider(ABC):
     @abstractmethod
-    def get_llm(self, model: str = "qwen-qwq-32b", temperature: float = 0.7):
+    def get_llm(self, model: str = "qwen-qwq-32b", temperature: float = 0.7, **kwargs):
         pass
 
 class OpenAIProvider(BaseLLMProvider):
-    def get_llm(self, model: str = "gpt-4", temperature: float = 0.7):
+    def get_llm(self, model: str = "gpt-4", temperature: float = 0.7, **kwargs):
         return ChatOpenAI(
             api_key=settings.OPENAI_API_KEY,
             model=model,
-            temperature=temperature
+            temperature=temperature,
+            **kwargs
         )
 
 class AnthropicProvider(BaseLLMProvider):
-    def get_llm(self, model: str = "claude-3-haiku-20240307", temperature: float = 0.7):
+    def get_llm(self, model: str = "claude-3-haiku-20240307", temperature: float = 0.7, **kwargs):
         return ChatAnthropic(
             api_key=settings.ANTHROPIC_API_KEY,
             model=model,
-            temperature=temperature
+            temperature=temperature,
+            **kwargs
         )
 
 class GoogleProvider(BaseLLMProvider):
-    def get_llm(self, model: str = "gemini-flash-2.0", temperature: float = 0.7):
+    def get_llm(self, model: str = "gemini-flash-2.0", temperature: float = 0.7, **kwargs):
         return ChatGoogleGenerativeAI(
             google_api_key=settings.GOOGLE_API_KEY,
             model=model,
-            temperature=temperature
+            temperature=temperature,
+            **kwargs
         )
 
 class GroqProvider(BaseLLMProvider):
-    def get_llm(self, model: str = "qwen-qwq-32b", temperature: float = 0.7):
+    def get_llm(self, model: str = "qwen-qwq-32b", temperature: float = 0.7, **kwargs):
         return ChatGroq(
             groq_api_key=settings.GROQ_API_KEY,
             model_name=model,
-            temperature=temperature
+            temperature=temperature,
+            **kwargs
         )
\ No newline at end of file
@@ -0,0 +1,301 @@
+import asyncio
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import ConfigDict, Field
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations instead of blocking.
+
+    ``reserve`` always succeeds and returns how long the caller must wait
+    before using what it reserved. The level may go negative, which queues
+    later callers behind earlier ones instead of letting them race.
+    """
+
+    def __init__(self, capacity: float, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.rate = per_minute / 60.0
+        self.clock = clock
+        self.level = capacity
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        self._refill()
+        # A request larger than the bucket would never fit; let it through once the bucket is full.
+        amount = min(amount, self.capacity)
+        self.level -= amount
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def adjust(self, delta: float):
+        """Give back (negative) or charge extra (positive) tokens after the fact."""
+        self._refill()
+        self.level = min(self.capacity, self.level - delta)
+
+
+@dataclass
+class RateLimitMetrics:
+    requests: int = 0
+    tokens: int = 0
+    queued: int = 0                 # requests that had to wait for the bucket
+    queued_seconds: float = 0.0
+    throttled: int = 0              # 429 responses from the provider
+    throttled_seconds: float = 0.0  # time spent backing off after 429s
+    retried: int = 0                # 5xx, timeouts and dropped connections retried
+    retried_seconds: float = 0.0
+    failures: int = 0               # requests that still failed after all retries
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits for one provider/model.
+
+    ``rpm`` or ``tpm`` of 0 disables that limit. When the provider answers
+    with a 429, every caller sharing the limiter pauses until the
+    ``Retry-After`` time instead of retrying in lockstep.
+    """
+
+    def __init__(self, rpm: float = 0, tpm: float = 0, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.requests = TokenBucket(rpm, rpm, clock) if rpm else None
+        self.tokens = TokenBucket(tpm, tpm, clock) if tpm else None
+        self.blocked_until = 0.0
+        self.metrics = RateLimitMetrics()
+        self._lock = threading.Lock()
+
+    def reserve(self, estimated_tokens: int) -> float:
+        """Reserve one request and ``estimated_tokens``; returns the seconds to wait first."""
+        with self._lock:
+            wait = max(0.0, self.blocked_until - self.clock())
+            if self.requests:
+                wait = max(wait, self.requests.reserve(1))
+            if self.tokens:
+                wait = max(wait, self.tokens.reserve(estimated_tokens))
+            self.metrics.requests += 1
+            if wait > 0:
+                self.metrics.queued += 1
+                self.metrics.queued_seconds += wait
+            return wait
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        with self._lock:
+            used = actual_tokens if actual_tokens is not None else estimated_tokens
+            self.metrics.tokens += used
+            if self.tokens and actual_tokens is not None:
+                self.tokens.adjust(actual_tokens - estimated_tokens)
+
+    def record_throttle(self, delay: float):
+        """Pause all callers for ``delay`` seconds after a 429."""
+        with self._lock:
+            self.metrics.throttled += 1
+            self.metrics.throttled_seconds += delay
+            self.blocked_until = max(self.blocked_until, self.clock() + delay)
+
+    def record_retry(self, delay: float):
+        """Count a retry after a transient error; unlike a 429 it only delays its own caller."""
+        with self._lock:
+            self.metrics.retried += 1
+            self.metrics.retried_seconds += delay
+
+    def record_failure(self):
+        with self._lock:
+            self.metrics.failures += 1
+
+
+_limiters: Dict[Tuple[str, str], RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str, model: str, rpm: float = 0, tpm: float = 0) -> RateLimiter:
+    """Return the process-wide limiter for a provider/model, creating it on first use."""
+    with _limiters_lock:
+        limiter = _limiters.get((provider, model))
+        if limiter is None:
+            limiter = RateLimiter(rpm, tpm)
+            _limiters[(provider, model)] = limiter
+        return limiter
+
+
+def rate_limit_metrics() -> Dict[str, Dict[str, Any]]:
+    """Metrics of every limiter, keyed by ``provider/model``."""
+    with _limiters_lock:
+        return {f"{provider}/{model}": asdict(limiter.metrics) for (provider, model), limiter in _limiters.items()}
+
+
+def parse_rate_limits(spec: str) -> Dict[str, Tuple[float, float]]:
+    """Parse ``"groq=30:6000,openai/gpt-4o=500:30000"`` into {key: (rpm, tpm)}."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        key, _, values = item.partition("=")
+        rpm, _, tpm = values.partition(":")
+        limits[key.strip()] = (float(rpm or 0), float(tpm or 0))
+    return limits
+
+
+# ***************** 429 and transient error handling *****************
+
+# Exceptions of the provider SDKs (openai, anthropic and groq share these names,
+# google-api-core has its own), httpx and the standard library that mean the
+# request may succeed if sent again
+TRANSIENT_ERRORS = {
+    "APIConnectionError", "APITimeoutError", "InternalServerError", "ServiceUnavailable", "DeadlineExceeded",
+    "TimeoutException", "NetworkError", "RemoteProtocolError", "ConnectionError", "TimeoutError",
+}
+
+def _status_code(error: Exception) -> Optional[int]:
+    for candidate in (error, getattr(error, "response", None)):
+        code = getattr(candidate, "status_code", None) or getattr(candidate, "code", None)
+        if isinstance(code, int):
+            return code
+    return None
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    return _status_code(error) == 429 or type(error).__name__ in ("RateLimitError", "ResourceExhausted")
+
+
+def is_transient_error(error: Exception) -> bool:
+    """5xx, 408 and 409 answers, timeouts and connection errors: the ones the SDKs retry besides 429."""
+    code = _status_code(error)
+    if code is not None and (code >= 500 or code in (408, 409)):
+        return True
+    return any(cls.__name__ in TRANSIENT_ERRORS for cls in type(error).__mro__)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds from the ``Retry-After`` header of a 429 response, if present."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float, cap: float, hint: Optional[float] = None,
+                  rand: Callable[[float, float], float] = random.uniform) -> float:
+    """Full-jitter exponential backoff, never shorter than the server's ``Retry-After``."""
+    delay = rand(0, min(cap, base * (2 ** attempt)))
+    return max(delay, hint or 0.0)
+
+
+def estimate_tokens(messages: List[BaseMessage], completion_tokens: int = 512) -> int:
+    """Rough token count of a request (4 characters per token) plus room for the answer."""
+    chars = sum(len(str(message.content)) for message in messages)
+    return chars // 4 + completion_tokens
+
+
+class RateLimitedChatModel(BaseChatModel):
+    """Chat model wrapper that applies a shared RateLimiter and retries failed requests.
+
+    429s pause every caller of the limiter; 5xx answers, timeouts and
+    connection errors are retried with the same backoff by their caller
+    alone, since the SDK clients underneath are created without retries.
+    Tool binding is delegated to the wrapped model, so agents built with
+    ``create_tool_calling_agent`` work unchanged.
+    """
+
+    inner: BaseChatModel
+    provider: str
+    model_name: str = ""
+    limiter: Any = Field(default=None, exclude=True)
+    max_retries: int = 5
+    backoff_base: float = 1.0
+    backoff_cap: float = 60.0
+    sleep: Callable[[float], None] = Field(default=time.sleep, exclude=True)
+    async_sleep: Callable[[float], Any] = Field(default=asyncio.sleep, exclude=True)
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return f"rate-limited-{self.inner._llm_type}"
+
+    def bind_tools(self, tools, **kwargs):
+        bound = self.inner.bind_tools(tools, **kwargs)
+        return self.bind(**bound.kwargs)
+
+    @staticmethod
+    def _result(message: BaseMessage) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    @staticmethod
+    def _used_tokens(message: BaseMessage) -> Optional[int]:
+        usage = getattr(message, "usage_metadata", None)
+        return usage.get("total_tokens") if usage else None
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Seconds to back off before retrying after ``error``, or None to give up.
+
+        A 429 blocks the limiter, so that wait happens in the next ``reserve``;
+        other delays are slept by the caller.
+        """
+        rate_limited = is_rate_limit_error(error)
+        if attempt == self.max_retries or not (rate_limited or is_transient_error(error)):
+            self.limiter.record_failure()
+            return None
+        if rate_limited:
+            delay = backoff_delay(attempt, self.backoff_base, self.backoff_cap, retry_after(error))
+            self.limiter.record_throttle(delay)
+        else:
+            delay = backoff_delay(attempt, self.backoff_base, self.backoff_cap)
+            self.limiter.record_retry(delay)
+        return delay
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        estimated = estimate_tokens(messages)
+        for attempt in range(self.max_retries + 1):
+            wait = self.limiter.reserve(estimated)
+            if wait > 0:
+                self.sleep(wait)
+            try:
+                message: AIMessage = self.inner.invoke(messages, stop=stop, **kwargs)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                if not is_rate_limit_error(e):
+                    self.sleep(delay)
+                continue
+            self.limiter.record_usage(estimated, self._used_tokens(message))
+            return self._result(message)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        estimated = estimate_tokens(messages)
+        for attempt in range(self.max_retries + 1):
+            wait = self.limiter.reserve(estimated)
+            if wait > 0:
+                await self.async_sleep(wait)
+            try:
+                message: AIMessage = await self.inner.ainvoke(messages, stop=stop, **kwargs)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                if not is_rate_limit_error(e):
+                    await self.async_sleep(delay)
+                continue
+            self.limiter.record_usage(estimated, self._used_tokens(message))
+            return self._result(message)
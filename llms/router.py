@@ -0,0 +1,257 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import ConfigDict, Field
+
+
+class ProviderStats:
+    """Rolling latency and error record of one provider/model."""
+
+    def __init__(self, window: int = 50):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)   # True for success
+        self.hedges = 0       # times a hedge was sent because this provider was slow
+        self.hedge_wins = 0   # times a hedge to this provider answered first
+        self._lock = threading.Lock()
+
+    def record(self, latency: Optional[float], ok: bool):
+        with self._lock:
+            self.outcomes.append(ok)
+            if ok and latency is not None:
+                self.latencies.append(latency)
+
+    def count_hedge(self, won: bool = False):
+        with self._lock:
+            if won:
+                self.hedge_wins += 1
+            else:
+                self.hedges += 1
+
+    def p95(self, min_samples: int) -> Optional[float]:
+        with self._lock:
+            if len(self.latencies) < min_samples:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            return 0.0 if not self.outcomes else self.outcomes.count(False) / len(self.outcomes)
+
+    def snapshot(self, min_samples: int = 1) -> Dict[str, Any]:
+        return {
+            "requests": len(self.outcomes),
+            "error_rate": round(self.error_rate, 3),
+            "p95": self.p95(min_samples),
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+_stats: Dict[str, ProviderStats] = {}
+_stats_lock = threading.Lock()
+POOL_SIZE = 8
+_pool = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="llm-hedge")
+_pool_busy = 0  # requests submitted to _pool that have not finished, abandoned ones included
+_pool_lock = threading.Lock()
+
+
+def _submit(fn, *args) -> Future:
+    global _pool_busy
+    with _pool_lock:
+        _pool_busy += 1
+    future = _pool.submit(fn, *args)
+    future.add_done_callback(_release)
+    return future
+
+
+def _release(future: Future):
+    global _pool_busy
+    with _pool_lock:
+        _pool_busy -= 1
+
+
+def _pool_saturated() -> bool:
+    with _pool_lock:
+        return _pool_busy >= POOL_SIZE
+
+
+def get_provider_stats(key: str) -> ProviderStats:
+    with _stats_lock:
+        stats = _stats.get(key)
+        if stats is None:
+            stats = ProviderStats()
+            _stats[key] = stats
+        return stats
+
+
+def provider_metrics() -> Dict[str, Dict[str, Any]]:
+    with _stats_lock:
+        return {key: stats.snapshot() for key, stats in _stats.items()}
+
+
+class HedgedChatModel(BaseChatModel):
+    """Routes a request over several chat models in order of preference.
+
+    The healthiest model gets the request first. If it has not answered by
+    its rolling p95 latency, the same request goes to the next model, and
+    whichever answers first wins. In async mode the other request is
+    cancelled; in sync mode a running thread cannot be stopped, so its answer
+    is dropped and the thread keeps a pool slot until it finishes. Sync
+    requests therefore do not hedge while every slot is taken, so abandoned
+    calls cannot queue up behind each other. Errors fail over to the next
+    model.
+    """
+
+    models: List[BaseChatModel]
+    names: List[str]
+    # Per-model keyword arguments, e.g. tool schemas from bind_tools
+    model_kwargs: List[Dict[str, Any]] = Field(default_factory=list)
+    hedging: bool = True
+    min_samples: int = 20
+    default_delay: float = 15.0
+    max_error_rate: float = 0.5
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return "hedged"
+
+    def bind_tools(self, tools, **kwargs):
+        # Tool schemas differ between providers, so each model binds its own.
+        model_kwargs = [model.bind_tools(tools, **kwargs).kwargs for model in self.models]
+        return self.model_copy(update={"model_kwargs": model_kwargs})
+
+    def _order(self) -> List[int]:
+        """Model indexes, preferred order first, unhealthy providers last."""
+        healthy = [i for i, name in enumerate(self.names)
+                   if get_provider_stats(name).error_rate <= self.max_error_rate]
+        return healthy + [i for i in range(len(self.models)) if i not in healthy]
+
+    def _delay(self, index: int) -> float:
+        return get_provider_stats(self.names[index]).p95(self.min_samples) or self.default_delay
+
+    def _call(self, index: int, messages: List[BaseMessage], stop, kwargs) -> BaseMessage:
+        extra = self.model_kwargs[index] if self.model_kwargs else {}
+        started = time.monotonic()
+        try:
+            message = self.models[index].invoke(messages, stop=stop, **{**extra, **kwargs})
+        except Exception:
+            get_provider_stats(self.names[index]).record(None, False)
+            raise
+        get_provider_stats(self.names[index]).record(time.monotonic() - started, True)
+        return message
+
+    async def _acall(self, index: int, messages: List[BaseMessage], stop, kwargs) -> BaseMessage:
+        extra = self.model_kwargs[index] if self.model_kwargs else {}
+        started = time.monotonic()
+        try:
+            message = await self.models[index].ainvoke(messages, stop=stop, **{**extra, **kwargs})
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            get_provider_stats(self.names[index]).record(None, False)
+            raise
+        get_provider_stats(self.names[index]).record(time.monotonic() - started, True)
+        return message
+
+    @staticmethod
+    def _result(message: BaseMessage) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        queue = self._order()
+        running: Dict[Future, int] = {}
+        last_error: Optional[Exception] = None
+
+        def launch():
+            index = queue.pop(0)
+            running[_submit(self._call, index, messages, stop, kwargs)] = index
+            return index
+
+        primary = launch()
+        while running:
+            hedge_allowed = self.hedging and queue and len(running) == 1 and not _pool_saturated()
+            done, _ = wait(list(running), timeout=self._delay(primary) if hedge_allowed else None,
+                           return_when=FIRST_COMPLETED)
+            if not done:
+                # The current request is past its p95: hedge with the next provider.
+                get_provider_stats(self.names[primary]).count_hedge()
+                launch()
+                continue
+            for future in done:
+                index = running.pop(future)
+                try:
+                    message = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                if index != primary:
+                    get_provider_stats(self.names[index]).count_hedge(won=True)
+                for other in running:
+                    other.cancel()  # only stops requests still queued for a thread
+                return self._result(message)
+            if running:
+                primary = next(iter(running.values()))
+            elif queue:
+                # Every in-flight request failed: fail over to the next provider.
+                primary = launch()
+        raise last_error
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        queue = self._order()
+        running: Dict[asyncio.Task, int] = {}
+        last_error: Optional[Exception] = None
+
+        def launch():
+            index = queue.pop(0)
+            running[asyncio.ensure_future(self._acall(index, messages, stop, kwargs))] = index
+            return index
+
+        primary = launch()
+        try:
+            while running:
+                hedge_allowed = self.hedging and queue and len(running) == 1
+                done, _ = await asyncio.wait(list(running), timeout=self._delay(primary) if hedge_allowed else None,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    get_provider_stats(self.names[primary]).count_hedge()
+                    launch()
+                    continue
+                for task in done:
+                    index = running.pop(task)
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                        continue
+                    if index != primary:
+                        get_provider_stats(self.names[index]).count_hedge(won=True)
+                    return self._result(task.result())
+                if running:
+                    primary = next(iter(running.values()))
+                elif queue:
+                    primary = launch()
+            raise last_error
+        finally:
+            for task in running:
+                task.cancel()
@@ -1,12 +1,22 @@
 import click
+import duckdb
+import os
+import time
 import uuid
+from datetime import datetime, timedelta
 from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 from rich.prompt import Prompt, Confirm
-from agents.graph import HeraPheriGraph
+from agents.graph import HeraPheriGraph, parse_node_models
+from agents.memory import MemoryTracker, rss_bytes
+from agents.profiling import SessionProfiler
+from database import retention
 from database.storage import ConversationStorage
+from llms.cassette import Cassette, CassetteMismatch
 from llms.factory import LLMFactory
+from llms.ratelimit import rate_limit_metrics
+from llms.router import provider_metrics
 
 console = Console()
 VERSION = '1.0.0'
@@ -19,6 +29,10 @@ class HeraPheriCLI:
         self.settings = settings_instance  # Use the passed settings instance
         self.current_llm_provider = settings_instance.DEFAULT_LLM_PROVIDER
         self.current_model = settings_instance.DEFAULT_MODEL
+        self.node_models = {}
+        self.record = False
+        self.profile = False
+        self.memory = None  # MemoryTracker with --trace-memory
         
     def display_welcome(self):
         """Display the welcome message and instructions."""
@@ -28,6 +42,13 @@ class HeraPheriCLI:
         - `/sessions`: View conversation history
         - `/list-agents`: List all available agents
         - `/switch-llm`: Select an agent to interact with
+        - `/resume`: Continue an interrupted run of the current session
+        - `/rate-limits`: Show queued and throttled time per provider/model
+        - `/providers`: Show latency, errors and hedging per provider when fallbacks are configured
+        - `/node-stats`: Show latency and tokens per node and model (`/node-stats all` for every session)
+        - `/recall <query>`: Search earlier steps of all sessions (BM25)
+        - `/plans`: Show the plan library and how often plans were reused
+        - `/memory`: Show process memory and, with --trace-memory, allocations retained per node
         - `/new-session`: Start a new session with the selected agent
         - `/exit`: Exit the CLI
         - `/help`: Show this help message
@@ -76,21 +97,33 @@ class HeraPheriCLI:
         
         if provider != self.current_llm_provider:
             self.current_llm_provider = provider
+            # Model names are provider specific; fall back to the new provider's default
+            self.current_model = None
             # Restart agent with new provider
             if self.current_session_id:
-                self.current_agent = HeraPheriGraph(
-                    llm_provider=provider,
-                    session_id=self.current_session_id
-                )
+                self.current_agent = self._create_agent(self.current_session_id)
             self.console.print(f"✓ Switched to {provider}", style="green")
     
+    def _create_agent(self, session_id: str) -> HeraPheriGraph:
+        if self.current_agent:
+            # A provider switch keeps the session's shell and workspace; a new session releases them
+            self.current_agent.close(release_session=self.current_agent.session_id != session_id)
+        cassette = None
+        if self.record:
+            cassette = Cassette(os.path.join(self.settings.CASSETTE_DIR, f"{session_id}.jsonl"))
+        return HeraPheriGraph(
+            llm_provider=self.current_llm_provider,
+            session_id=session_id,
+            model=self.current_model,
+            node_models=self.node_models,
+            cassette=cassette,
+            memory=self.memory
+        )
+    
     def start_new_session(self):
         """Start a new conversation session"""
         self.current_session_id = str(uuid.uuid4())
-        self.current_agent = HeraPheriGraph(
-            llm_provider=self.current_llm_provider,
-            session_id=self.current_session_id
-        )
+        self.current_agent = self._create_agent(self.current_session_id)
         self.console.print(f"✓ Started new session: {self.current_session_id[:8]}...", style="green")
     
     def view_sessions(self):
@@ -125,10 +158,7 @@ class HeraPheriCLI:
             
             if matching_sessions:
                 self.current_session_id = matching_sessions[0]
-                self.current_agent = HeraPheriGraph(
-                    llm_provider=self.current_llm_provider,
-                    session_id=self.current_session_id
-                )
+                self.current_agent = self._create_agent(self.current_session_id)
                 self.console.print(f"✓ Loaded session: {self.current_session_id[:8]}...", style="green")
                 
                 # Show recent history
@@ -156,10 +186,303 @@ class HeraPheriCLI:
         """Process user message through the agent"""
         if not self.current_agent:
             self.start_new_session()
-            
+        if not self.profile:
+            self._run_agent(lambda: self.current_agent.process_input(user_input))
+            return
+        profiler = SessionProfiler(self.current_session_id, self.settings.PROFILE_DIR, self.settings.PROFILE_INTERVAL)
+        with profiler:
+            self._run_agent(lambda: self.current_agent.process_input(user_input))
+        self.show_profile(profiler)
+        
+    def show_profile(self, profiler: SessionProfiler):
+        """Save a finished profile and show where the time went"""
+        paths = profiler.save()
+        
+        table = Table(title=f"Profile: {profiler.wall:.1f}s wall")
+        table.add_column("Node / Tool", style="cyan")
+        table.add_column("CPU", style="green")
+        table.add_column("Wait", style="yellow")
+        for label, times in sorted(profiler.sampler.sections.items(), key=lambda item: -sum(item[1].values())):
+            table.add_row(label, f"{times['cpu']:.2f}s", f"{times['wait']:.2f}s")
+        self.console.print(table)
+        
+        table = Table(title="Top Self Time")
+        table.add_column("Self", style="magenta")
+        table.add_column("Calls", style="blue")
+        table.add_column("Category", style="yellow")
+        table.add_column("Function", style="cyan")
+        for row in profiler.hotspots(10):
+            table.add_row(f"{row['self']:.3f}s", str(row['calls']), row['category'], row['function'])
+        self.console.print(table)
+        self.console.print(f"📄 {paths['pstats']}\n📄 {paths['collapsed']}\n📄 {paths['summary']}", style="blue")
+        
+    def view_rate_limits(self):
+        """Show client-side rate limiter metrics for every provider/model used so far"""
+        metrics = rate_limit_metrics()
+        if not metrics:
+            self.console.print("No LLM requests made yet.", style="yellow")
+            return
+        
+        table = Table(title="LLM Rate Limits")
+        table.add_column("Provider/Model", style="cyan")
+        table.add_column("Requests", style="magenta")
+        table.add_column("Tokens", style="magenta")
+        table.add_column("Queued", style="yellow")
+        table.add_column("Throttled (429)", style="red")
+        table.add_column("Retried (5xx/timeout)", style="yellow")
+        table.add_column("Failures", style="red")
+        for key, m in metrics.items():
+            table.add_row(
+                key,
+                str(m['requests']),
+                str(m['tokens']),
+                f"{m['queued']} / {m['queued_seconds']:.1f}s",
+                f"{m['throttled']} / {m['throttled_seconds']:.1f}s",
+                f"{m['retried']} / {m['retried_seconds']:.1f}s",
+                str(m['failures'])
+            )
+        self.console.print(table)
+        
+    def recall(self, query: str):
+        """Show the past conversation steps that best match a query"""
+        if not query:
+            self.console.print("Usage: /recall <query>", style="yellow")
+            return
+        hits = self.storage.recall(query, k=self.settings.RECALL_TOP_K * 3)
+        if not hits:
+            self.console.print("No matching steps.", style="yellow")
+            return
+        
+        table = Table(title=f"Recall: {query}")
+        table.add_column("Score", style="magenta")
+        table.add_column("Session", style="cyan")
+        table.add_column("Node", style="blue")
+        table.add_column("When", style="green")
+        table.add_column("Step")
+        for hit in hits:
+            table.add_row(
+                f"{hit.score:.2f}",
+                hit.session_id[:8],
+                hit.node_type or "-",
+                hit.created_at.strftime("%Y-%m-%d %H:%M"),
+                hit.text(300).split("\n", 1)[-1]
+            )
+        self.console.print(table)
+        
+    def view_plans(self):
+        """Show recent plans, which were adapted from earlier ones, and the reuse rate"""
+        stats = self.storage.plans.stats()
+        if not stats['plans']:
+            self.console.print("No plans stored yet.", style="yellow")
+            return
+        
+        table = Table(title="Plan Library")
+        table.add_column("When", style="green")
+        table.add_column("Session", style="cyan")
+        table.add_column("Task")
+        table.add_column("Adapted From", style="blue")
+        table.add_column("Similarity", style="magenta")
+        table.add_column("Outcome", style="yellow")
+        for plan in self.storage.plans.recent():
+            table.add_row(
+                plan['created_at'].strftime("%Y-%m-%d %H:%M"),
+                plan['session_id'][:8],
+                plan['task'][:60],
+                (plan['reused_task'] or "-")[:60],
+                f"{plan['similarity']:.2f}" if plan['similarity'] is not None else "-",
+                plan['outcome'] or "-"
+            )
+        self.console.print(table)
+        status = "on" if self.settings.PLAN_REUSE else "off"
+        self.console.print(
+            f"{stats['reused']} of {stats['plans']} plans adapted from an earlier one ({stats['reuse_rate']:.0%}), "
+            f"mean similarity {stats['mean_similarity']:.2f} — reuse {status}, "
+            f"threshold {self.settings.PLAN_REUSE_THRESHOLD}"
+        )
+        
+    def view_node_stats(self, all_sessions: bool = False):
+        """Show latency and token usage per node and model"""
+        summary = self.storage.node_metrics_summary(None if all_sessions else self.current_session_id)
+        if not summary:
+            self.console.print("No node runs recorded yet.", style="yellow")
+            return
+        
+        table = Table(title="Node Metrics" + (" (all sessions)" if all_sessions else ""))
+        table.add_column("Node", style="cyan")
+        table.add_column("Model", style="blue")
+        table.add_column("Runs", style="magenta")
+        table.add_column("Avg / p95 Latency", style="green")
+        table.add_column("LLM Time", style="green")
+        table.add_column("LLM Calls", style="magenta")
+        table.add_column("Tokens In / Out", style="yellow")
+        table.add_column("Success", style="green")
+        for row in summary:
+            table.add_row(
+                row['node_type'],
+                row['model'] or "-",
+                str(row['runs']),
+                f"{row['avg_latency']:.1f}s / {row['p95_latency']:.1f}s",
+                f"{row['llm_seconds'] or 0:.1f}s",
+                str(row['llm_calls'] or 0),
+                f"{row['input_tokens'] or 0} / {row['output_tokens'] or 0}",
+                f"{row['success_rate']:.0%}"
+            )
+        self.console.print(table)
+        
+    def view_provider_routing(self):
+        """Show rolling latency, error rate and hedging counts per provider/model"""
+        metrics = provider_metrics()
+        if not metrics:
+            self.console.print("No provider fallbacks configured (set LLM_FALLBACK_PROVIDERS).", style="yellow")
+            return
+        
+        table = Table(title="Provider Routing")
+        table.add_column("Provider/Model", style="cyan")
+        table.add_column("Requests", style="magenta")
+        table.add_column("Error Rate", style="red")
+        table.add_column("p95", style="green")
+        table.add_column("Hedged / Won", style="yellow")
+        for key, m in metrics.items():
+            table.add_row(
+                key,
+                str(m['requests']),
+                f"{m['error_rate']:.0%}",
+                f"{m['p95']:.2f}s" if m['p95'] is not None else "-",
+                f"{m['hedges']} / {m['hedge_wins']}"
+            )
+        self.console.print(table)
+        
+    def view_memory(self):
+        """Show process memory and, when tracing, allocations retained per node"""
+        rss = rss_bytes()
+        self.console.print(f"Resident memory: {rss / 2**20:.1f} MB" if rss else "Resident memory: unavailable")
+        if not self.memory:
+            self.console.print("Start with --trace-memory (or TRACE_MEMORY=true) to track allocations per node.", style="yellow")
+            return
+        summary = self.memory.summary()
+        if not summary:
+            self.console.print("No node runs traced yet.", style="yellow")
+            return
+        
+        table = Table(title="Memory per Node (tracemalloc)")
+        table.add_column("Node", style="cyan")
+        table.add_column("Runs", style="magenta")
+        table.add_column("Retained Total", style="yellow")
+        table.add_column("Retained / Run", style="yellow")
+        table.add_column("Max Peak", style="green")
+        for row in summary:
+            table.add_row(
+                row['node_type'],
+                str(row['runs']),
+                f"{row['retained'] / 1024:.1f} KB",
+                f"{row['mean_retained'] / 1024:.1f} KB",
+                f"{row['max_peak'] / 1024:.1f} KB"
+            )
+        self.console.print(table)
+        last = self.memory.records[-1] if self.memory.records else None
+        if last and last.top:
+            self.console.print(f"Largest growth in the last run ({last.node_type}):")
+            for line in last.top:
+                self.console.print(f"  {line}", style="dim")
+        
+    def apply_scheduled_retention(self, protect=()):
+        """Archive and delete expired sessions if retention is configured and due"""
+        settings = self.settings
+        if settings.RETENTION_MAX_AGE_DAYS <= 0 and settings.RETENTION_KEEP_SESSIONS <= 0:
+            return
+        last = retention.last_run(self.storage.conn)
+        if last and datetime.now() - last < timedelta(hours=settings.RETENTION_INTERVAL_HOURS):
+            return
+        try:
+            run = retention.apply_retention(
+                self.storage.conn, settings.ARCHIVE_DIR,
+                max_age_days=settings.RETENTION_MAX_AGE_DAYS,
+                keep_sessions=settings.RETENTION_KEEP_SESSIONS,
+                protect=[session_id for session_id in protect if session_id],
+            )
+        except duckdb.Error as e:
+            self.console.print(f"⚠️ Retention failed, nothing was deleted: {str(e)}", style="yellow")
+            return
+        if run.sessions:
+            self.console.print(
+                f"🗄️ Archived {len(run.sessions)} old session(s) to {run.archive_dir} "
+                f"({sum(run.archived.values())} rows) in {run.seconds:.1f}s",
+                style="blue"
+            )
+        
+    def resume_run(self):
+        """Continue the current session's interrupted run from its last completed node"""
+        if not self.current_agent:
+            self.console.print("❌ No session loaded. Use --session or /sessions first.", style="red")
+            return
+        pending = self.current_agent.pending_node()
+        if not pending:
+            self.console.print("Nothing to resume: the last run of this session finished.", style="yellow")
+            return
+        self.console.print(f"↻ Resuming session {self.current_session_id[:8]}... at '{pending}'", style="blue")
+        self._run_agent(self.current_agent.resume)
+        
+    def replay_session(self, path: str, strict: bool = False) -> bool:
+        """Re-run a recorded session from its cassette, without calling any provider or tool"""
+        cassette = Cassette(path, mode="replay", strict=strict)
+        if not cassette.inputs:
+            self.console.print(f"❌ {path} has no recorded input to replay.", style="red")
+            return False
+        meta = cassette.meta
+        graph = HeraPheriGraph(
+            llm_provider=meta.get("llm_provider") or self.current_llm_provider,
+            session_id=f"replay-{uuid.uuid4()}",
+            model=meta.get("model"),
+            node_models=meta.get("node_models") or {},
+            cassette=cassette,
+            memory=self.memory
+        )
+        self.console.print(f"▶ Replaying {len(cassette.inputs)} input(s) of session {str(meta.get('session_id', '?'))[:8]}... "
+                           f"as {graph.session_id[:15]}...", style="blue")
+        
+        table = Table(title=f"Replay of {path}")
+        table.add_column("Input", style="cyan")
+        table.add_column("Outcome", style="green")
+        table.add_column("Time", style="magenta")
+        profiler = SessionProfiler(graph.session_id, self.settings.PROFILE_DIR, self.settings.PROFILE_INTERVAL) if self.profile else None
+        started_all = time.perf_counter()
+        if profiler:
+            profiler.start()
+        for task in cassette.inputs:
+            started = time.perf_counter()
+            try:
+                with self.console.status("[bold green]Replaying..."):
+                    result = graph.process_input(task)
+                outcome = result.get('retry_stats', {}).get('outcome', '-')
+            except CassetteMismatch as e:
+                outcome = f"diverged: {str(e)}"
+            except Exception as e:
+                outcome = f"failed: {str(e)}"
+            table.add_row(task if len(task) <= 60 else task[:57] + "...", outcome, f"{time.perf_counter() - started:.2f}s")
+        if profiler:
+            profiler.stop()
+        self.console.print(table)
+        if profiler:
+            self.show_profile(profiler)
+        
+        stats = cassette.stats()
+        self.console.print(
+            f"Replayed {stats['replayed']} recorded call(s) in {time.perf_counter() - started_all:.1f}s "
+            f"(originally {cassette.recorded_seconds:.1f}s in LLM calls and tools); "
+            f"{stats['mismatches']} mismatched request(s), {stats['remaining']} unused.",
+            style="green" if not (stats['mismatches'] or stats['remaining']) else "yellow"
+        )
+        for key, count in cassette.remaining().items():
+            self.console.print(f"  unused: {key} × {count}", style="yellow")
+        if self.memory:
+            self.view_memory()
+        graph.close()
+        return not (stats['mismatches'] or stats['remaining'])
+        
+    def _run_agent(self, run):
         with self.console.status("[bold green]Processing..."):
             try:
-                result = self.current_agent.process_input(user_input)
+                result = run()
                 
                 # Fix: Access dictionary keys instead of object attributes
                 success = result.get('success', False)
@@ -171,6 +494,25 @@ class HeraPheriCLI:
                 self.console.print(f"\n[{response_style}] Agent ({node_type}):[/{response_style}]")
                 self.console.print(Panel(response, border_style=response_style))
                 
+                retry_stats = result.get('retry_stats', {})
+                if retry_stats.get('total_failures'):
+                    self.console.print(
+                        f"🔁 {retry_stats['total_failures']} failed run(s), "
+                        f"{retry_stats['tasks_skipped']} task(s) skipped, "
+                        f"{retry_stats['backoff_seconds']:.1f}s backoff — {retry_stats['outcome']}",
+                        style="yellow"
+                    )
+                
+                plan_reuse = result.get('plan_reuse')
+                if plan_reuse:
+                    self.console.print(
+                        f"♻️  Plan adapted from an earlier task ({plan_reuse['similarity']:.0%} similar): "
+                        f"{plan_reuse['task'][:80]}",
+                        style="cyan"
+                    )
+                
+            except KeyboardInterrupt:
+                self.console.print("\n⏸ Interrupted. Progress up to the last completed step is saved; use /resume to continue.", style="yellow")
             except Exception as e:
                 self.console.print(f"❌ Error: {str(e)}", style="red")
                 
@@ -202,6 +544,20 @@ class HeraPheriCLI:
                         self.agent_list()
                     elif user_input == "/switch-llm":
                         self.switch_llm_provider()
+                    elif user_input == "/resume":
+                        self.resume_run()
+                    elif user_input == "/rate-limits":
+                        self.view_rate_limits()
+                    elif user_input == "/providers":
+                        self.view_provider_routing()
+                    elif user_input in ("/node-stats", "/node-stats all"):
+                        self.view_node_stats(all_sessions=user_input.endswith("all"))
+                    elif user_input == "/recall" or user_input.startswith("/recall "):
+                        self.recall(user_input[len("/recall"):].strip())
+                    elif user_input == "/plans":
+                        self.view_plans()
+                    elif user_input == "/memory":
+                        self.view_memory()
                     elif user_input == "/help":
                         self.display_welcome()
                     elif user_input == "/new-session":
@@ -222,13 +578,24 @@ class HeraPheriCLI:
             except Exception as e:
                 self.console.print(f"❌ Unexpected error: {str(e)}", style="red")
                 
-@click.command()
+@click.group(invoke_without_command=True)
 @click.version_option(version="1.0.0", message="HeraPheri CLI v{version}")
 @click.option("--provider", default=None, help="LLM provider to use")
 @click.option("--model", default=None, help="LLM model to use")
 @click.option("--session", default=None, help="Session ID to load")
-def main(provider, model, session):
+@click.option("--resume", is_flag=True, default=False, help="Continue the interrupted run of --session before prompting")
+@click.option("--node-model", multiple=True, help="Model for one node, e.g. raju_coder=openai/gpt-4o (repeatable)")
+@click.option("--record", is_flag=True, default=False, help="Record LLM calls and tool results to CASSETTE_DIR/<session>.jsonl")
+@click.option("--replay", type=click.Path(exists=True, dir_okay=False), default=None,
+              help="Re-run a recorded session from its cassette without network access, then exit")
+@click.option("--profile", is_flag=True, default=False, help="Profile each message and save pstats, flamegraph stacks and a summary to PROFILE_DIR")
+@click.option("--strict", is_flag=True, default=False, help="With --replay, stop at the first request that differs from the recording")
+@click.option("--trace-memory", is_flag=True, default=False, help="Snapshot allocations around every node with tracemalloc (see /memory)")
+@click.pass_context
+def main(ctx, provider, model, session, resume, node_model, record, replay, profile, strict, trace_memory):
     """Run the HeraPheri CLI."""
+    if ctx.invoked_subcommand is not None:
+        return
     from config.settings import Settings  # Import here to avoid circular imports
     import os
     
@@ -252,16 +619,192 @@ def main(provider, model, session):
     
     # Override if CLI args provided
     cli.current_llm_provider = provider or settings_instance.DEFAULT_LLM_PROVIDER
-    cli.current_model = model or settings_instance.DEFAULT_MODEL
+    # DEFAULT_MODEL belongs to DEFAULT_LLM_PROVIDER; other providers use their own default
+    if model:
+        cli.current_model = model
+    elif cli.current_llm_provider == settings_instance.DEFAULT_LLM_PROVIDER:
+        cli.current_model = settings_instance.DEFAULT_MODEL
+    else:
+        cli.current_model = None
+    try:
+        cli.node_models = parse_node_models(",".join(node_model))
+    except ValueError as e:
+        cli.console.print(f"❌ {str(e)}", style="red")
+        return
+    
+    cli.profile = profile
+    if trace_memory or settings_instance.TRACE_MEMORY:
+        cli.memory = MemoryTracker()
+        cli.memory.start()
+    if replay:
+        raise SystemExit(0 if cli.replay_session(replay, strict) else 1)
+    cli.record = record
+    cli.apply_scheduled_retention(protect=[session])
     
     if session:
         cli.current_session_id = session
-        cli.current_agent = HeraPheriGraph(
-            llm_provider=cli.current_llm_provider,
-            session_id=session
-        )
+        cli.current_agent = cli._create_agent(session)
+        pending = cli.current_agent.pending_node()
+        if resume:
+            cli.resume_run()
+        elif pending:
+            cli.console.print(f"ℹ️ This session has an interrupted run waiting at '{pending}'. Use /resume to continue it.", style="yellow")
+    elif resume:
+        cli.console.print("❌ --resume needs --session.", style="red")
+        return
     
     cli.run()
+
+
+def _format_cell(value) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    if isinstance(value, list):
+        return " / ".join(_format_cell(item) for item in value)
+    if hasattr(value, "strftime"):
+        return value.strftime("%Y-%m-%d %H:%M")
+    text = str(value)
+    return text if len(text) <= 60 else text[:59] + "…"
+
+
+def _connect_source(source: str):
+    """A read-only connection to a database file, or views over a Parquet export directory."""
+    from database.analytics import connect_export
+    if os.path.isdir(source):
+        return connect_export(source)
+    return duckdb.connect(source, read_only=True)
+
+
+@main.command()
+@click.option("--output", "output_dir", default="exports", show_default=True, help="Directory to write the Parquet files to")
+@click.option("--db", "db_path", default=None, help="Database to export (default: DB_PATH)")
+@click.option("--since", type=click.DateTime(formats=["%Y-%m-%d"]), default=None,
+              help="Only export days from this date on (YYYY-MM-DD); those partitions are rewritten")
+@click.option("--compression", type=click.Choice(["zstd", "snappy", "gzip", "uncompressed"]), default="zstd", show_default=True)
+def export(output_dir, db_path, since, compression):
+    """Export conversations and node metrics to Parquet, partitioned by date and provider."""
+    from config.settings import settings
+    from database.analytics import export_parquet
+    
+    started = time.perf_counter()
+    try:
+        conn = _connect_source(db_path or settings.DB_PATH)
+        try:
+            exported = export_parquet(conn, output_dir, since=since.date() if since else None, compression=compression)
+        finally:
+            conn.close()
+    except duckdb.Error as e:
+        console.print(f"❌ Export failed: {str(e)}", style="red")
+        raise SystemExit(1)
+    for table, rows in exported.items():
+        console.print(f"📦 {table}: {rows} rows → {os.path.join(output_dir, table)}", style="green")
+    console.print(f"Exported in {time.perf_counter() - started:.2f}s")
+
+
+@main.command()
+@click.argument("name", type=click.Choice(["steps", "failure-loops", "latency"]))
+@click.option("--source", default=None, help="Database file or `herapheri export` directory (default: DB_PATH)")
+@click.option("--session", default=None, help="Only this session")
+@click.option("--limit", type=int, default=20, show_default=True, help="Rows to show (steps, failure-loops)")
+@click.option("--json", "as_json", is_flag=True, default=False, help="Print the rows as JSON")
+def query(name, source, session, limit, as_json):
+    """Run a built-in analytics query: steps per session, failure loops per task or node latency."""
+    import json
+    from config.settings import settings
+    from database.analytics import QUERIES
+    
+    kwargs = {"session_id": session} if name == "latency" else {"session_id": session, "limit": limit}
+    try:
+        conn = _connect_source(source or settings.DB_PATH)
+        try:
+            rows = QUERIES[name](conn, **kwargs)
+        finally:
+            conn.close()
+    except duckdb.Error as e:
+        console.print(f"❌ Query failed: {str(e)}", style="red")
+        raise SystemExit(1)
+    if as_json:
+        click.echo(json.dumps(rows, indent=2, default=str))
+        return
+    if not rows:
+        console.print("No rows.", style="yellow")
+        return
+    table = Table(title=f"{name} ({source or settings.DB_PATH})")
+    for key in rows[0]:
+        table.add_column(key.replace("_", " ").title())
+    for row in rows:
+        table.add_row(*(_format_cell(value) for value in row.values()))
+    console.print(table)
+
+
+
+@main.command("retention")
+@click.option("--db", "db_path", default=None, help="Database to clean up (default: DB_PATH)")
+@click.option("--max-age-days", type=int, default=None, help="Archive sessions inactive for longer (default: RETENTION_MAX_AGE_DAYS)")
+@click.option("--keep-sessions", type=int, default=None, help="Archive all but the newest N sessions (default: RETENTION_KEEP_SESSIONS)")
+@click.option("--archive-dir", default=None, help="Where the Parquet archive goes (default: ARCHIVE_DIR)")
+@click.option("--keep", "protect", multiple=True, help="Session ID that is never archived (repeatable)")
+@click.option("--dry-run", is_flag=True, default=False, help="Only show what would be archived")
+@click.option("--compact", "then_compact", is_flag=True, default=False, help="Rewrite the database afterwards to shrink the file")
+def retention_command(db_path, max_age_days, keep_sessions, archive_dir, protect, dry_run, then_compact):
+    """Archive old sessions to zstd Parquet, delete them from the database and CHECKPOINT it."""
+    from config.settings import settings
+    
+    db_path = db_path or settings.DB_PATH
+    max_age_days = settings.RETENTION_MAX_AGE_DAYS if max_age_days is None else max_age_days
+    keep_sessions = settings.RETENTION_KEEP_SESSIONS if keep_sessions is None else keep_sessions
+    archive_dir = archive_dir or settings.ARCHIVE_DIR
+    if max_age_days <= 0 and keep_sessions <= 0:
+        console.print("❌ No retention limit: pass --max-age-days or --keep-sessions, or set RETENTION_MAX_AGE_DAYS / "
+                      "RETENTION_KEEP_SESSIONS.", style="red")
+        raise SystemExit(1)
+    
+    try:
+        conn = duckdb.connect(db_path)
+        try:
+            run = retention.apply_retention(conn, archive_dir, max_age_days, keep_sessions, protect, dry_run=dry_run)
+        finally:
+            conn.close()
+    except duckdb.Error as e:
+        console.print(f"❌ Retention failed, nothing was deleted: {str(e)}", style="red")
+        raise SystemExit(1)
+    
+    if not run.sessions:
+        console.print("No sessions past the retention limits.", style="green")
+    else:
+        verb = "Would archive" if dry_run else "Archived"
+        console.print(f"🗄️ {verb} {len(run.sessions)} session(s) to {archive_dir}: "
+                      + ", ".join(f"{rows} {table}" for table, rows in run.archived.items()), style="blue")
+        if run.deleted:
+            console.print("Deleted " + ", ".join(f"{rows} {table}" for table, rows in run.deleted.items() if rows)
+                          + f" in {run.seconds:.1f}s")
+    if then_compact and not dry_run:
+        _compact(db_path)
+    elif run.sessions and not dry_run:
+        console.print(f"Database is {retention.database_size(db_path) / 2**20:.1f} MB; the freed blocks are reused "
+                      "for new rows, `herapheri compact` shrinks the file.")
+
+
+def _compact(db_path: str):
+    started = time.perf_counter()
+    try:
+        sizes = retention.compact(db_path)
+    except duckdb.Error as e:
+        console.print(f"❌ Compaction failed, the database is unchanged: {str(e)}", style="red")
+        raise SystemExit(1)
+    console.print(f"🗜️ Compacted {db_path}: {sizes['before'] / 2**20:.1f} MB → {sizes['after'] / 2**20:.1f} MB "
+                  f"in {time.perf_counter() - started:.1f}s", style="green")
+
+
+@main.command()
+@click.option("--db", "db_path", default=None, help="Database to compact (default: DB_PATH)")
+def compact(db_path):
+    """Rewrite the database into a new file to reclaim the space of deleted rows (close the CLI first)."""
+    from config.settings import settings
+    _compact(db_path or settings.DB_PATH)
+
     
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,5 @@
+import os
+
+# config.settings prompts for missing keys on import; the tests never reach a provider.
+os.environ.setdefault("TAVILY_API_KEY", "offline")
+os.environ.setdefault("GROQ_API_KEY", "offline")
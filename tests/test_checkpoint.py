@@ -0,0 +1,28 @@
+import duckdb
+from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+
+from database.checkpoint import DuckDBCheckpointSaver
+
+CONFIG = {"configurable": {"thread_id": "t", "checkpoint_ns": ""}}
+
+
+def put(saver, config, step, values):
+    checkpoint = create_checkpoint(empty_checkpoint(), None, step)
+    checkpoint["channel_values"] = values
+    checkpoint["channel_versions"] = {channel: str(step) for channel in values}
+    return saver.put(config, checkpoint, {"step": step}, checkpoint["channel_versions"])
+
+
+def test_checkpoint_and_pending_writes_round_trip():
+    saver = DuckDBCheckpointSaver(duckdb.connect())
+    config = put(saver, CONFIG, 1, {"plan": "write tests", "messages": ["Input: hi", "Output: hello"]})
+    saver.put_writes(config, [("messages", ["Output: done"]), ("__error__", "first"), ("success", True)], "task")
+    saver.put_writes(config, [("__error__", "second")], "task")
+
+    loaded = saver.get_tuple(CONFIG)
+    assert loaded.checkpoint["channel_values"] == {"plan": "write tests", "messages": ["Input: hi", "Output: hello"]}
+    assert loaded.metadata["step"] == 1
+    assert loaded.pending_writes == [("task", "__error__", "second"), ("task", "messages", ["Output: done"]),
+                                     ("task", "success", True)]
+    assert saver.conn.execute("SELECT count(*) FROM checkpoint_writes").fetchone()[0] == 2
+
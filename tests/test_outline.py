@@ -0,0 +1,9 @@
+from agents.outline import OutlineIndex
+
+
+def test_outline_lines_match_ast_line_numbers(tmp_path):
+    path = tmp_path / "module.py"
+    path.write_text("x = 1  # \x0c page break\n\n\ndef f():\n    return 2\n")
+    symbols, lines = OutlineIndex().outline(str(path))
+    f = next(symbol for symbol in symbols if symbol.name == "f")
+    assert lines[f.start_line - 1:f.end_line] == ["def f():", "    return 2"]
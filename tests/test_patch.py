@@ -0,0 +1,61 @@
+import subprocess
+
+from agents.patch import apply_hunks, parse_unified_diff, replace_line_range, split_lines
+
+
+def test_split_lines_only_breaks_on_newline():
+    assert split_lines("a\x0cb\nc\x0bd e\r\nf") == ["a\x0cb", "c\x0bd e", "f"]
+    assert split_lines("a\nb\n", keepends=True) == ["a\n", "b\n"]
+    assert split_lines("") == []
+
+
+def test_apply_hunks_keeps_form_feed():
+    diff = "@@ -1,2 +1,2 @@\n a\x0cb\n-c\n+C\n"
+    hunks = parse_unified_diff(diff)[0].hunks
+    assert apply_hunks("a\x0cb\nc\n", hunks) == "a\x0cb\nC\n"
+
+
+def test_apply_hunks_keeps_crlf():
+    hunks = parse_unified_diff("@@ -1,2 +1,2 @@\n x\n-y\n+Y\n")[0].hunks
+    assert apply_hunks("x\r\ny\r\n", hunks) == "x\r\nY\r\n"
+
+
+def test_replace_line_range_appends_after_unterminated_last_line():
+    assert replace_line_range("foo\nbar", 3, 2, "baz") == "foo\nbar\nbaz"
+    assert replace_line_range("foo\nbar\n", 3, 2, "baz") == "foo\nbar\nbaz\n"
+
+
+def test_replace_line_range_keeps_form_feed_lines():
+    assert replace_line_range("a\x0cb\nc\n", 2, 2, "C") == "a\x0cb\nC\n"
+
+
+def unified_diff(tmp_path, old, new, *options):
+    """The hunks ``diff`` itself writes for ``old`` -> ``new``."""
+    (tmp_path / "old").write_text(old)
+    (tmp_path / "new").write_text(new)
+    result = subprocess.run(["diff", *options, "old", "new"], cwd=tmp_path, capture_output=True, text=True)
+    return result.stdout
+
+
+def test_apply_hunks_inserts_zero_context_hunk_after_its_line(tmp_path):
+    diff = unified_diff(tmp_path, "a\nb\nc\nd\n", "a\nb\nNEW\nc\nd\n", "-U0")
+    assert "@@ -2,0 +3 @@" in diff
+    assert apply_hunks("a\nb\nc\nd\n", parse_unified_diff(diff)[0].hunks) == "a\nb\nNEW\nc\nd\n"
+
+
+def test_blank_line_between_file_sections_ends_the_hunk():
+    diff = ("--- a/x.py\n+++ b/x.py\n@@ -1,2 +1,2 @@\n a\n-b\n+B\n\n"
+            "--- a/y.py\n+++ b/y.py\n@@ -1,2 +1,2 @@\n c\n-d\n+D\n")
+    patches = parse_unified_diff(diff)
+    assert [patch.path for patch in patches] == ["x.py", "y.py"]
+    assert apply_hunks("a\nb\n", patches[0].hunks) == "a\nB\n"
+    assert apply_hunks("c\nd\n", patches[1].hunks) == "c\nD\n"
+
+
+def test_apply_hunks_respects_no_newline_at_end_of_file(tmp_path):
+    removed = unified_diff(tmp_path, "a\nb\n", "a\nb", "-u")
+    assert apply_hunks("a\nb\n", parse_unified_diff(removed)[0].hunks) == "a\nb"
+    added = unified_diff(tmp_path, "a\nb", "a\nb\n", "-u")
+    assert apply_hunks("a\nb", parse_unified_diff(added)[0].hunks) == "a\nb\n"
+    changed = unified_diff(tmp_path, "a\nb", "a\nc", "-u")
+    assert apply_hunks("a\nb", parse_unified_diff(changed)[0].hunks) == "a\nc"
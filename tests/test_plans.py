@@ -0,0 +1,19 @@
+import duckdb
+
+from database.plans import PlanLibrary
+
+
+def test_tasks_without_shingles_are_not_stored_or_matched():
+    plans = PlanLibrary(duckdb.connect())
+    assert plans.add("s1", "Do it", "1. guess") is None
+    assert plans.add("s1", "!!!", "1. guess") is None
+    assert plans.find("Do this for me", threshold=0.0) is None
+    assert plans.stats()["plans"] == 0
+
+
+def test_similar_task_finds_earlier_plan():
+    plans = PlanLibrary(duckdb.connect())
+    plan_id = plans.add("s1", "Build a REST endpoint for users with pagination", "1. model 2. route")
+    match = plans.find("Build a REST endpoint for orders with pagination", threshold=0.3)
+    assert match is not None and match.plan_id == plan_id
+    assert plans.find("Build a REST endpoint for orders with pagination", exclude_session="s1") is None
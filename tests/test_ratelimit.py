@@ -0,0 +1,64 @@
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from llms.ratelimit import RateLimitedChatModel, RateLimiter, is_transient_error
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+class APITimeoutError(Exception):
+    pass
+
+
+class FlakyModel(BaseChatModel):
+    errors: list
+
+    @property
+    def _llm_type(self) -> str:
+        return "flaky"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.errors:
+            raise self.errors.pop(0)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="ok"))])
+
+
+def wrap(errors, max_retries=5):
+    sleeps = []
+    model = RateLimitedChatModel(inner=FlakyModel(errors=errors), provider="fake", limiter=RateLimiter(),
+                                 max_retries=max_retries, backoff_base=0.01, sleep=sleeps.append)
+    return model, sleeps
+
+
+def test_transient_errors():
+    assert is_transient_error(StatusError(503))
+    assert is_transient_error(APITimeoutError())
+    assert is_transient_error(ConnectionResetError())
+    assert not is_transient_error(StatusError(400))
+    assert not is_transient_error(ValueError())
+
+
+def test_retries_server_errors_and_timeouts():
+    model, sleeps = wrap([StatusError(503), APITimeoutError()])
+    assert model.invoke([HumanMessage(content="hi")]).content == "ok"
+    assert len(sleeps) == 2
+    assert model.limiter.metrics.retried == 2
+    assert model.limiter.metrics.throttled == 0
+    assert model.limiter.blocked_until == 0.0
+
+
+def test_gives_up_on_client_errors_and_after_max_retries():
+    model, sleeps = wrap([StatusError(400)])
+    with pytest.raises(StatusError):
+        model.invoke([HumanMessage(content="hi")])
+    assert sleeps == []
+    model, sleeps = wrap([StatusError(500)] * 3, max_retries=2)
+    with pytest.raises(StatusError):
+        model.invoke([HumanMessage(content="hi")])
+    assert len(sleeps) == 2 and model.limiter.metrics.failures == 1
@@ -0,0 +1,17 @@
+from agents.reader import CHUNK_SIZE, MappedFile
+
+
+def test_lines_keeps_form_feed_inside_its_line(tmp_path):
+    path = tmp_path / "data.txt"
+    path.write_bytes(b"one\x0ctwo\nthree\nfour\n")
+    with MappedFile(str(path)) as mapped:
+        assert mapped.line_count == 3
+        assert mapped.lines(1, 2) == ["one\x0ctwo", "three"]
+
+
+def test_line_number_at_end_of_file_that_fills_whole_chunks(tmp_path):
+    path = tmp_path / "data.txt"
+    path.write_bytes(b"x" * (CHUNK_SIZE - 1) + b"\n")
+    with MappedFile(str(path)) as mapped:
+        assert mapped.line_number_at(0) == 1
+        assert mapped.line_number_at(mapped.size) == 2
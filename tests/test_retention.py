@@ -0,0 +1,103 @@
+import os
+from datetime import datetime, timedelta
+
+import duckdb
+import pytest
+from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+
+from database import retention
+from database.checkpoint import DuckDBCheckpointSaver
+from database.models import Conversation, NodeMetric
+from database.storage import ConversationStorage
+
+
+def make_storage(tmp_path):
+    return ConversationStorage(str(tmp_path / "recall.db"))
+
+
+def add_session(storage, session_id, days_old):
+    created_at = datetime.now() - timedelta(days=days_old)
+    storage.create(Conversation(session_id=session_id, messages=[f"Input: task of {session_id}"],
+                                node_type="RajuCoderNode", llm_provider="groq", created_at=created_at))
+    storage.save_metric(NodeMetric(session_id=session_id, node_type="RajuCoderNode", model="groq/llama",
+                                   latency=1.0, created_at=created_at))
+
+
+def sessions(storage):
+    return sorted(storage.get_all_sessions())
+
+
+def test_sessions_expire_by_age_and_count(tmp_path):
+    with make_storage(tmp_path) as storage:
+        for session_id, days_old in (("oldest", 30), ("old", 10), ("recent", 2), ("current", 0)):
+            add_session(storage, session_id, days_old)
+        assert retention.expired_sessions(storage.conn, max_age_days=7) == ["oldest", "old"]
+        assert retention.expired_sessions(storage.conn, keep_sessions=3) == ["oldest"]
+        assert retention.expired_sessions(storage.conn, max_age_days=7, keep_sessions=1) == ["oldest", "old", "recent"]
+        assert retention.expired_sessions(storage.conn, keep_sessions=1, protect=["old"]) == ["oldest", "recent"]
+        assert retention.expired_sessions(storage.conn) == []
+
+
+def test_expired_sessions_are_archived_then_deleted(tmp_path):
+    archive_dir = str(tmp_path / "archive")
+    with make_storage(tmp_path) as storage:
+        add_session(storage, "old", 30)
+        add_session(storage, "current", 0)
+        saver = DuckDBCheckpointSaver(storage.conn)
+        checkpoint = create_checkpoint(empty_checkpoint(), None, 1)
+        saver.put({"configurable": {"thread_id": "old", "checkpoint_ns": ""}}, checkpoint, {"step": 1}, {})
+
+        run = retention.apply_retention(storage.conn, archive_dir, max_age_days=7)
+        assert run.sessions == ["old"]
+        assert run.archived == {"conversations": 1, "node_metrics": 1}
+        assert run.deleted["checkpoints"] == 1
+        assert sessions(storage) == ["current"]
+        assert storage.recall("task", exclude_session="current") == []
+        archived = storage.conn.execute(
+            f"SELECT session_id FROM read_parquet('{archive_dir}/conversations/**/*.parquet')").fetchall()
+        assert archived == [("old",)]
+        assert retention.last_run(storage.conn) == run.ran_at
+
+
+def test_dry_run_counts_without_archiving_or_deleting(tmp_path):
+    archive_dir = str(tmp_path / "archive")
+    with make_storage(tmp_path) as storage:
+        add_session(storage, "old", 30)
+        add_session(storage, "current", 0)
+        run = retention.apply_retention(storage.conn, archive_dir, max_age_days=7, dry_run=True)
+        assert run.sessions == ["old"]
+        assert run.archived == {"conversations": 1, "node_metrics": 1}
+        assert run.deleted == {}
+        assert sessions(storage) == ["current", "old"]
+        assert not os.path.exists(archive_dir)
+
+
+def test_failed_run_rolls_back_every_delete(tmp_path):
+    with make_storage(tmp_path) as storage:
+        add_session(storage, "old", 30)
+        # A retention_runs table of the wrong shape makes the run's last statement fail
+        storage.conn.execute("CREATE TABLE retention_runs (id TEXT)")
+        with pytest.raises(duckdb.Error):
+            retention.apply_retention(storage.conn, str(tmp_path / "archive"), max_age_days=7)
+        assert sessions(storage) == ["old"]
+        assert storage.conn.execute("SELECT count(*) FROM node_metrics").fetchone()[0] == 1
+
+
+def test_compact_swaps_in_a_smaller_copy(tmp_path):
+    path = str(tmp_path / "recall.db")
+    with make_storage(tmp_path) as storage:
+        add_session(storage, "current", 0)
+        storage.conn.execute("""
+            INSERT INTO conversations
+            SELECT 'bulk-' || i, 'bulk', repeat(md5(i::VARCHAR), 50), now(), now(), 'RajuCoderNode', 'groq'
+            FROM range(10000) t(i)
+        """)
+        storage.conn.execute("CHECKPOINT")
+        storage.conn.execute("DELETE FROM conversations WHERE session_id = 'bulk'")
+        storage.conn.execute("CHECKPOINT")
+
+    sizes = retention.compact(path)
+    assert sizes["after"] == retention.database_size(path) < sizes["before"]
+    assert sorted(os.listdir(tmp_path)) == ["recall.db"]
+    with make_storage(tmp_path) as storage:
+        assert sessions(storage) == ["current"]
@@ -0,0 +1,38 @@
+from database.models import Conversation
+from database.retrieval import ConversationIndex
+from database.storage import ConversationStorage
+
+
+def make_storage(tmp_path):
+    return ConversationStorage(str(tmp_path / "recall.db"))
+
+
+def test_buffered_conversations_are_searchable(tmp_path):
+    with make_storage(tmp_path) as storage:
+        convo = Conversation(session_id="old", messages=["Input: parse the config file"], node_type="RajuCoderNode", llm_provider="groq")
+        storage.create(convo)
+        storage.create(Conversation(session_id="old", messages=["Input: deploy the service"], node_type="RajuCoderNode", llm_provider="groq"))
+        storage.append_message(convo.id, "Output: wrote a yaml loader")
+        hits = storage.recall("yaml loader", exclude_session="new")
+        assert [hit.doc_id for hit in hits] == [convo.id]
+        assert storage.index.stats()["documents"] == 2
+
+
+def test_sync_catches_up_rows_written_behind_its_back(tmp_path):
+    with make_storage(tmp_path) as storage:
+        convo = Conversation(session_id="s", messages=["Input: resize images"], node_type="RajuCoderNode", llm_provider="groq")
+        storage.create(convo)
+        storage.recall("images")
+        storage.conn.execute("""
+            INSERT INTO conversations
+            SELECT 'bulk-' || i, 'bulk', '["Input: rotate thumbnails"]', now(), now(), 'RajuCoderNode', 'groq'
+            FROM range(3) t(i)
+        """)
+        storage.conn.execute("UPDATE conversations SET messages = '[\"Input: crop videos\"]', updated_at = now() "
+                             "WHERE id = ?", (convo.id,))
+        index = ConversationIndex(storage.conn)
+        assert index.sync() == 4
+        assert index.sync() == 0
+        assert len(index.search("thumbnails")) == 3
+        assert [hit.doc_id for hit in index.search("videos")] == [convo.id]
+        assert index.search("images") == []
@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from llms import router
+from llms.router import HedgedChatModel, get_provider_stats
+
+
+class SlowModel(BaseChatModel):
+    reply: str
+    delay: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+
+def hedged(names):
+    # The first model hangs past the hedge delay; the second answers at once.
+    return HedgedChatModel(models=[SlowModel(reply="slow", delay=0.5), SlowModel(reply="fast")],
+                           names=names, default_delay=0.05)
+
+
+def test_slow_request_is_hedged_and_the_hedge_wins():
+    model = hedged(["sync-slow", "sync-fast"])
+    assert model.invoke([HumanMessage(content="hi")]).content == "fast"
+    assert get_provider_stats("sync-slow").hedges == 1
+    assert get_provider_stats("sync-fast").hedge_wins == 1
+
+
+def test_async_slow_request_is_hedged_and_the_hedge_wins():
+    model = hedged(["async-slow", "async-fast"])
+    assert asyncio.run(model.ainvoke([HumanMessage(content="hi")])).content == "fast"
+    assert get_provider_stats("async-slow").hedges == 1
+    assert get_provider_stats("async-fast").hedge_wins == 1
+
+
+def test_sync_request_does_not_hedge_while_the_pool_is_saturated(monkeypatch):
+    monkeypatch.setattr(router, "_pool_busy", router.POOL_SIZE)
+    model = hedged(["busy-slow", "busy-fast"])
+    assert model.invoke([HumanMessage(content="hi")]).content == "slow"
+    assert get_provider_stats("busy-slow").hedges == 0
+    assert not get_provider_stats("busy-fast").outcomes
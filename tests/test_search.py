@@ -0,0 +1,21 @@
+from agents.search import CodeSearchIndex, required_literals
+
+
+def test_required_literals_plain_runs():
+    assert required_literals(r"foo[a-z]bar1") == ["foo", "bar1"]
+    assert required_literals(r"foo|bar") == []
+
+
+def test_required_literals_escaped_bracket_in_class():
+    # The class ends at the unescaped "]"; "b]" is part of it, not a required literal
+    assert required_literals(r"[a\]b]xyz") == ["xyz"]
+    assert required_literals(r"[]ab]cdef") == ["cdef"]
+    assert required_literals(r"[^\]]+hello") == ["hello"]
+
+
+def test_search_finds_match_with_escaped_bracket_class(tmp_path):
+    (tmp_path / "a.py").write_text("value = x]xyz\n")
+    (tmp_path / "b.py").write_text("nothing here\n")
+    index = CodeSearchIndex(str(tmp_path), index_path=str(tmp_path / "index.json.gz"))
+    matches, _ = index.search(r"[a\]b]xyz", regex=True)
+    assert [(path, number) for path, number, _ in matches] == [("a.py", 1)]
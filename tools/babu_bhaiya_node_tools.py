@@ -1,7 +1,7 @@
-from agents.tool import execute_terminal_command, change_directory, get_system_info, list_directory
+from agents.tool import execute_terminal_command, change_directory, get_system_info, list_directory, run_commands_parallel
 from pydantic import BaseModel
 from langchain.tools import BaseTool
-from typing import Type, Optional
+from typing import List, Type, Optional
 
 class BabuBhaiyaNodeToolInput(BaseModel):
     """Input for the BabuBhaiyaNodeTool."""
@@ -11,10 +11,25 @@ class BabuBhaiyaNodeToolInput(BaseModel):
     capture_output: Optional[bool] = True
     shell: Optional[bool] = True
     
+class ChangeDirectoryToolInput(BaseModel):
+    """Input for the ChangeDirectoryNodeTool."""
+    working_directory: str
+    
+class SystemInfoToolInput(BaseModel):
+    """Input for the SystemInfoNodeTool."""
+    detailed: Optional[bool] = False
+    
+class ParallelCmdToolInput(BaseModel):
+    """Input for the ParallelCmdNodeTool."""
+    commands: List[str]
+    working_directory: Optional[str] = None
+    timeout: Optional[int] = 30
+    
 class TerminalCmdNodeTool(BaseTool):
     name: str = "terminal_command"
-    description: str = "Executes a terminal command and returns the output."
+    description: str = "Executes a terminal command and returns the output. The shell persists between calls, so `cd`, exported variables and activated virtualenvs carry over."
     args_schema: Type[BaseModel] = BabuBhaiyaNodeToolInput
+    session_id: Optional[str] = None
     
     def _run(self, command: str, working_directory: Optional[str] = None, 
              timeout: Optional[int] = 30, capture_output: Optional[bool] = True, 
@@ -32,7 +47,7 @@ class TerminalCmdNodeTool(BaseTool):
         Returns:
             str: Command output or error message.
         """
-        return execute_terminal_command(command, working_directory, timeout, capture_output, shell)
+        return execute_terminal_command(command, working_directory, timeout, capture_output, shell, self.session_id)
     
     async def _arun(self, command: str, working_directory: Optional[str] = None, 
                     timeout: Optional[int] = 30, capture_output: Optional[bool] = True, 
@@ -40,10 +55,37 @@ class TerminalCmdNodeTool(BaseTool):
         return self._run(command, working_directory, timeout, capture_output, shell)
     
     
+class ParallelCmdNodeTool(BaseTool):
+    name: str = "parallel_terminal_commands"
+    description: str = "Runs several independent terminal commands at the same time and returns a JSON list with the exit code, duration and output of each. Use it only for commands that do not depend on each other; they do not share shell state."
+    args_schema: Type[BaseModel] = ParallelCmdToolInput
+    session_id: Optional[str] = None
+    
+    def _run(self, commands: List[str], working_directory: Optional[str] = None,
+             timeout: Optional[int] = 30) -> str:
+        """
+        Run independent terminal commands in parallel.
+        
+        Args:
+            commands (List[str]): The commands to execute.
+            working_directory (Optional[str]): Directory to run the commands in.
+            timeout (Optional[int]): Maximum time to wait for each command.
+        
+        Returns:
+            str: JSON list of structured command results.
+        """
+        return run_commands_parallel(commands, working_directory, timeout, self.session_id)
+    
+    async def _arun(self, commands: List[str], working_directory: Optional[str] = None,
+                    timeout: Optional[int] = 30) -> str:
+        return self._run(commands, working_directory, timeout)
+    
+    
 class ChangeDirectoryNodeTool(BaseTool):
     name: str = "change_directory"
     description: str = "Changes the current working directory."
-    args_schema: Type[BaseModel] = BabuBhaiyaNodeToolInput
+    args_schema: Type[BaseModel] = ChangeDirectoryToolInput
+    session_id: Optional[str] = None
     
     def _run(self, working_directory: str) -> str:
         """
@@ -55,24 +97,28 @@ class ChangeDirectoryNodeTool(BaseTool):
         Returns:
             str: Confirmation message or error.
         """
-        return change_directory(working_directory)
+        return change_directory(working_directory, self.session_id)
     
     async def _arun(self, working_directory: str) -> str:
         return self._run(working_directory)
     
 class SystemInfoNodeTool(BaseTool):
     name: str = "system_info"
-    description: str = "Retrieves system information."
-    args_schema: Type[BaseModel] = BabuBhaiyaNodeToolInput
+    description: str = "Retrieves a compact summary of the system: OS, Python, current directory, active virtualenv and available tool versions. Pass detailed=true only if you need tool paths and environment variables."
+    args_schema: Type[BaseModel] = SystemInfoToolInput
+    session_id: Optional[str] = None
     
-    def _run(self) -> str:
+    def _run(self, detailed: Optional[bool] = False) -> str:
         """
         Retrieve system information.
         
+        Args:
+            detailed (Optional[bool]): Whether to include the full probe.
+        
         Returns:
             str: System information.
         """
-        return get_system_info()
+        return get_system_info(bool(detailed), self.session_id)
     
-    async def _arun(self) -> str:
-        return self._run()
\ No newline at end of file
+    async def _arun(self, detailed: Optional[bool] = False) -> str:
+        return self._run(detailed)
\ No newline at end of file
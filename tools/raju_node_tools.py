@@ -1,17 +1,47 @@
-from agents.tool import create_file, update_file
+from agents.tool import create_file, update_file, apply_patch, replace_in_file, replace_lines, write_files
 from pydantic import BaseModel
 from langchain.tools import BaseTool
-from typing import Type, Optional
+from typing import List, Type, Optional
 
 class RajuNodeToolInput(BaseModel):
     """Input for the RajuNodeTool."""
     content: Optional[str] = None
     filepath: str
     
+class FileContent(BaseModel):
+    """A single file for the WriteFilesTool."""
+    filepath: str
+    content: str
+    
+class WriteFilesToolInput(BaseModel):
+    """Input for the WriteFilesTool."""
+    files: List[FileContent]
+    
+class ApplyPatchToolInput(BaseModel):
+    """Input for the ApplyPatchTool."""
+    diff: str
+    filepath: Optional[str] = None
+    
+class SearchReplaceToolInput(BaseModel):
+    """Input for the SearchReplaceTool."""
+    filepath: str
+    search: str
+    replace: str
+    expected_count: Optional[int] = 1
+    
+class ReplaceLinesToolInput(BaseModel):
+    """Input for the ReplaceLinesTool."""
+    filepath: str
+    start_line: int
+    end_line: int
+    content: str
+    expected: Optional[str] = None
+    
 class CreateFileTool(BaseTool):
     name: str = "create_file"
     description: str = "Creates a file with the specified content."
     args_schema: Type[BaseModel] = RajuNodeToolInput
+    session_id: Optional[str] = None
     
     def _run(self, filepath: str, content: str) -> str:
         """
@@ -24,7 +54,7 @@ class CreateFileTool(BaseTool):
         Returns:
             str: Confirmation message.
         """
-        return create_file(filepath, content)
+        return create_file(filepath, content, self.session_id)
     
     async def _arun(self, filepath: str, content: str) -> str:
         return self._run(filepath, content)
@@ -33,6 +63,7 @@ class UpdateFileTool(BaseTool):
     name: str = "update_file"
     description: str = "Updates a file with the specified content."
     args_schema: Type[BaseModel] = RajuNodeToolInput
+    session_id: Optional[str] = None
     
     def _run(self, filepath: str, content: str) -> str:
         """
@@ -45,7 +76,102 @@ class UpdateFileTool(BaseTool):
         Returns:
             str: Confirmation message.
         """
-        return update_file(filepath, content)
+        return update_file(filepath, content, self.session_id)
     
     async def _arun(self, filepath: str, content: str) -> str:
-        return self._run(filepath, content)
\ No newline at end of file
+        return self._run(filepath, content)
+    
+class WriteFilesTool(BaseTool):
+    name: str = "write_files"
+    description: str = "Creates or overwrites several files in a single call. Either all files are written or none are; files whose content is unchanged are left untouched."
+    args_schema: Type[BaseModel] = WriteFilesToolInput
+    session_id: Optional[str] = None
+    
+    def _run(self, files: List[FileContent]) -> str:
+        """
+        Write several files at once.
+        
+        Args:
+            files (List[FileContent]): The files and their full contents.
+        
+        Returns:
+            str: Summary of written and unchanged files.
+        """
+        entries = [f.model_dump() if isinstance(f, BaseModel) else dict(f) for f in files]
+        return write_files(entries, self.session_id)
+    
+    async def _arun(self, files: List[FileContent]) -> str:
+        return self._run(files)
+    
+class ApplyPatchTool(BaseTool):
+    name: str = "apply_patch"
+    description: str = "Applies a unified diff to existing files. Context lines must match the current file exactly; if any hunk does not apply, nothing is written and the mismatch is reported."
+    args_schema: Type[BaseModel] = ApplyPatchToolInput
+    session_id: Optional[str] = None
+    
+    def _run(self, diff: str, filepath: Optional[str] = None) -> str:
+        """
+        Apply a unified diff.
+        
+        Args:
+            diff (str): The unified diff to apply.
+            filepath (Optional[str]): Target file when the diff has no file headers.
+        
+        Returns:
+            str: Confirmation message or the reason the patch was rejected.
+        """
+        return apply_patch(diff, filepath, self.session_id)
+    
+    async def _arun(self, diff: str, filepath: Optional[str] = None) -> str:
+        return self._run(diff, filepath)
+    
+class SearchReplaceTool(BaseTool):
+    name: str = "replace_in_file"
+    description: str = "Replaces an exact snippet of a file with new text. The snippet must appear exactly expected_count times (default once)."
+    args_schema: Type[BaseModel] = SearchReplaceToolInput
+    session_id: Optional[str] = None
+    
+    def _run(self, filepath: str, search: str, replace: str, expected_count: Optional[int] = 1) -> str:
+        """
+        Replace a snippet in a file.
+        
+        Args:
+            filepath (str): The file to edit.
+            search (str): The exact text to replace.
+            replace (str): The replacement text.
+            expected_count (Optional[int]): Required number of occurrences.
+        
+        Returns:
+            str: Confirmation message or the reason the edit was rejected.
+        """
+        return replace_in_file(filepath, search, replace, expected_count or 1, self.session_id)
+    
+    async def _arun(self, filepath: str, search: str, replace: str, expected_count: Optional[int] = 1) -> str:
+        return self._run(filepath, search, replace, expected_count)
+    
+class ReplaceLinesTool(BaseTool):
+    name: str = "replace_lines"
+    description: str = "Replaces lines start_line..end_line (1-based, inclusive) of a file with new content. Pass the current text of those lines as expected to guard against stale line numbers."
+    args_schema: Type[BaseModel] = ReplaceLinesToolInput
+    session_id: Optional[str] = None
+    
+    def _run(self, filepath: str, start_line: int, end_line: int, content: str,
+             expected: Optional[str] = None) -> str:
+        """
+        Replace a range of lines in a file.
+        
+        Args:
+            filepath (str): The file to edit.
+            start_line (int): First line to replace.
+            end_line (int): Last line to replace.
+            content (str): The replacement text.
+            expected (Optional[str]): Current text of the lines, if known.
+        
+        Returns:
+            str: Confirmation message or the reason the edit was rejected.
+        """
+        return replace_lines(filepath, start_line, end_line, content, expected, self.session_id)
+    
+    async def _arun(self, filepath: str, start_line: int, end_line: int, content: str,
+                    expected: Optional[str] = None) -> str:
+        return self._run(filepath, start_line, end_line, content, expected)
\ No newline at end of file
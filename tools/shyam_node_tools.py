@@ -1,12 +1,19 @@
-from agents.tool import web_search
+from agents.tool import web_search, project_tree
 from pydantic import BaseModel
 from langchain.tools import BaseTool
-from typing import Type
+from typing import Optional, Type
 
 class ShyamNodeToolInput(BaseModel):
     """Input for the ShyamNodeTool."""
     content: str
     
+class ProjectTreeToolInput(BaseModel):
+    """Input for the ProjectTreeTool."""
+    path: Optional[str] = None
+    max_depth: Optional[int] = 4
+    max_entries: Optional[int] = 200
+    show_hidden: Optional[bool] = False
+    
 class WebSearchTool(BaseTool):
     name: str = "web_search"
     description: str = "Performs a web search to find relevant URLs and returns a formatted string of the top results. Use this to research topics, find documentation, or get code examples."
@@ -25,4 +32,30 @@ class WebSearchTool(BaseTool):
         return web_search(content)
     
     async def _arun(self, content: str) -> str:
-        return self._run(content)
\ No newline at end of file
+        return self._run(content)
+    
+class ProjectTreeTool(BaseTool):
+    name: str = "project_tree"
+    description: str = "Returns a tree view of the project directory, skipping .gitignore'd files and build/cache folders. Use it to fill in the project structure instead of guessing."
+    args_schema: Type[BaseModel] = ProjectTreeToolInput
+    session_id: Optional[str] = None
+    
+    def _run(self, path: Optional[str] = None, max_depth: Optional[int] = 4,
+             max_entries: Optional[int] = 200, show_hidden: Optional[bool] = False) -> str:
+        """
+        Render the project tree.
+        
+        Args:
+            path (Optional[str]): Directory to summarize.
+            max_depth (Optional[int]): How many levels to descend.
+            max_entries (Optional[int]): Maximum number of entries to return.
+            show_hidden (Optional[bool]): Whether to include hidden entries.
+        
+        Returns:
+            str: Tree view of the directory.
+        """
+        return project_tree(path, max_depth or 4, max_entries or 200, bool(show_hidden), self.session_id)
+    
+    async def _arun(self, path: Optional[str] = None, max_depth: Optional[int] = 4,
+                    max_entries: Optional[int] = 200, show_hidden: Optional[bool] = False) -> str:
+        return self._run(path, max_depth, max_entries, show_hidden)
\ No newline at end of file
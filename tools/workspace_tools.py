@@ -0,0 +1,134 @@
+from agents.tool import code_search, read_file, file_outline, symbol_source
+from pydantic import BaseModel
+from langchain.tools import BaseTool
+from typing import Type, Optional
+
+class CodeSearchToolInput(BaseModel):
+    """Input for the CodeSearchTool."""
+    query: str
+    regex: Optional[bool] = False
+    case_sensitive: Optional[bool] = False
+    path_glob: Optional[str] = None
+    max_results: Optional[int] = 50
+    
+class ReadFileToolInput(BaseModel):
+    """Input for the ReadFileTool."""
+    filepath: str
+    start_line: Optional[int] = None
+    end_line: Optional[int] = None
+    pattern: Optional[str] = None
+    context: Optional[int] = 3
+    byte_offset: Optional[int] = None
+    byte_length: Optional[int] = None
+    
+class FileOutlineToolInput(BaseModel):
+    """Input for the FileOutlineTool."""
+    target: str
+    
+class SymbolSourceToolInput(BaseModel):
+    """Input for the SymbolSourceTool."""
+    name: str
+    path: Optional[str] = None
+    
+class CodeSearchTool(BaseTool):
+    name: str = "code_search"
+    description: str = "Searches the workspace files for text or a regular expression and returns matching lines as path:line: text. Use it to find where symbols are defined or used instead of guessing file contents."
+    args_schema: Type[BaseModel] = CodeSearchToolInput
+    session_id: Optional[str] = None
+    
+    def _run(self, query: str, regex: Optional[bool] = False, case_sensitive: Optional[bool] = False,
+             path_glob: Optional[str] = None, max_results: Optional[int] = 50) -> str:
+        """
+        Search the workspace.
+        
+        Args:
+            query (str): Text or regular expression to search for.
+            regex (Optional[bool]): Whether the query is a regular expression.
+            case_sensitive (Optional[bool]): Whether to match case exactly.
+            path_glob (Optional[str]): Glob restricting which files are searched.
+            max_results (Optional[int]): Maximum number of matching lines.
+        
+        Returns:
+            str: Matching lines or a message that nothing matched.
+        """
+        return code_search(query, bool(regex), bool(case_sensitive), path_glob, max_results or 50, self.session_id)
+    
+    async def _arun(self, query: str, regex: Optional[bool] = False, case_sensitive: Optional[bool] = False,
+                    path_glob: Optional[str] = None, max_results: Optional[int] = 50) -> str:
+        return self._run(query, regex, case_sensitive, path_glob, max_results)
+
+    
+class ReadFileTool(BaseTool):
+    name: str = "read_file"
+    description: str = "Reads part of a file: a line range (default the first 200 lines), lines matching a regex pattern with surrounding context, or a byte range. Always reports the file size and line count first, so large files can be read piece by piece."
+    args_schema: Type[BaseModel] = ReadFileToolInput
+    session_id: Optional[str] = None
+    
+    def _run(self, filepath: str, start_line: Optional[int] = None, end_line: Optional[int] = None,
+             pattern: Optional[str] = None, context: Optional[int] = 3,
+             byte_offset: Optional[int] = None, byte_length: Optional[int] = None) -> str:
+        """
+        Read part of a file.
+        
+        Args:
+            filepath (str): The file to read.
+            start_line (Optional[int]): First line to return.
+            end_line (Optional[int]): Last line to return.
+            pattern (Optional[str]): Regex whose matching lines should be returned.
+            context (Optional[int]): Lines of context around each match.
+            byte_offset (Optional[int]): Start of a raw byte range.
+            byte_length (Optional[int]): Length of the raw byte range.
+        
+        Returns:
+            str: File header followed by the requested content.
+        """
+        return read_file(filepath, start_line, end_line, pattern, context if context is not None else 3,
+                         byte_offset, byte_length, session_id=self.session_id)
+    
+    async def _arun(self, filepath: str, start_line: Optional[int] = None, end_line: Optional[int] = None,
+                    pattern: Optional[str] = None, context: Optional[int] = 3,
+                    byte_offset: Optional[int] = None, byte_length: Optional[int] = None) -> str:
+        return self._run(filepath, start_line, end_line, pattern, context, byte_offset, byte_length)
+    
+class FileOutlineTool(BaseTool):
+    name: str = "file_outline"
+    description: str = "Lists the classes, functions and methods of a file or dotted module with their signatures and line ranges, without the bodies. Use it to understand a module before reading code."
+    args_schema: Type[BaseModel] = FileOutlineToolInput
+    session_id: Optional[str] = None
+    
+    def _run(self, target: str) -> str:
+        """
+        Outline a file or module.
+        
+        Args:
+            target (str): File path or dotted module name.
+        
+        Returns:
+            str: One line per symbol with its signature and line range.
+        """
+        return file_outline(target, self.session_id)
+    
+    async def _arun(self, target: str) -> str:
+        return self._run(target)
+    
+class SymbolSourceTool(BaseTool):
+    name: str = "symbol_source"
+    description: str = "Returns the source code of a single class, function or method by name (e.g. 'HeraPheriGraph._build_graph'), optionally limited to a file, module or directory."
+    args_schema: Type[BaseModel] = SymbolSourceToolInput
+    session_id: Optional[str] = None
+    
+    def _run(self, name: str, path: Optional[str] = None) -> str:
+        """
+        Fetch the body of a symbol.
+        
+        Args:
+            name (str): Symbol name, optionally qualified with its class.
+            path (Optional[str]): File, module or directory to search.
+        
+        Returns:
+            str: Source of each matching definition.
+        """
+        return symbol_source(name, path, self.session_id)
+    
+    async def _arun(self, name: str, path: Optional[str] = None) -> str:
+        return self._run(name, path)
\ No newline at end of file